@@ -27,10 +27,17 @@ __version__ = '0.0.1'
 __rights__ = 'Copyright (c) 2017 Paul Ross'
 
 import collections
+import dataclasses
+import heapq
+import itertools
+import logging
 import typing
 
+import pprune.common.phrase_index
 import pprune.common.thread_struct
 
+logger = logging.getLogger(__file__)
+
 
 def filter_counter(
         word_counter: collections.Counter,
@@ -44,6 +51,59 @@ def filter_counter(
     return wc
 
 
+def _count_words(
+        encoded: pprune.common.thread_struct.EncodedThread,
+        keep: bytearray,
+        freq_ge: int,
+) -> collections.Counter:
+    """Returns a Counter of {word : count} of all the words in the thread where keep[token_id] is set."""
+    words = encoded.vocabulary.words
+    token_counter = collections.Counter(
+        {token_id: count for token_id, count in encoded.token_counts.items() if keep[token_id]}
+    )
+    return collections.Counter({words[k]: v for k, v in filter_counter(token_counter, freq_ge).items()})
+
+
+def _non_cap_words_keep(
+        encoded: pprune.common.thread_struct.EncodedThread,
+        common_words: typing.FrozenSet[str],
+        all_users: typing.Set[pprune.common.thread_struct.User],
+) -> bytearray:
+    return encoded.vocabulary.ids_where(
+        lambda word:
+        # Eliminate common words.
+        word.lower() not in common_words
+        # And eliminate words in users.
+        and word not in all_users
+        # And eliminate all capital words.
+        and word.upper() != word
+    )
+
+
+def _significant_words_keep(
+        encoded: pprune.common.thread_struct.EncodedThread,
+        common_words: typing.FrozenSet[str],
+) -> bytearray:
+    # Equivalent to Post.significant_words()
+    return encoded.vocabulary.ids_where(lambda word: word.lower() not in common_words)
+
+
+def _all_caps_keep(encoded: pprune.common.thread_struct.EncodedThread, min_size: int) -> bytearray:
+    # Equivalent to Post.cap_words()
+    return encoded.vocabulary.ids_where(lambda word: word.upper() == word and len(word) >= min_size)
+
+
+def _decode_phrases(
+        encoded: pprune.common.thread_struct.EncodedThread,
+        phrase_counter: collections.Counter,
+        freq_ge: int,
+) -> collections.Counter:
+    phrase_counter = filter_counter(phrase_counter, freq_ge)
+    return collections.Counter(
+        {tuple(encoded.vocabulary.decode(phrase)): v for phrase, v in phrase_counter.items()}
+    )
+
+
 def count_non_cap_words(
         thread: pprune.common.thread_struct.Thread,
         common_words: typing.Sequence[str],
@@ -54,20 +114,10 @@ def count_non_cap_words(
     This also ignores all uppercase words and usernames in the text.
     The case of the return word(s) is lowercase.
     It returns a dict of {word : count}."""
-    word_counter = collections.Counter()
-    all_users = thread.all_users
-    for post in thread.posts:
-        trimmed_words = [
-            word for word in post.words
-            # Eliminate common words.
-            if word.lower() not in common_words
-               # And eliminate words in users.
-               and word not in all_users
-               # And eliminate all capital words.
-               and word.upper() != word
-        ]
-        word_counter.update(trimmed_words)
-    return filter_counter(word_counter, freq_ge)
+    encoded = thread.encoded()
+    # common_words may be a list, such as from words.read_common_words_file()
+    keep = _non_cap_words_keep(encoded, frozenset(common_words), thread.all_users)
+    return _count_words(encoded, keep, freq_ge)
 
 
 def count_phrases(
@@ -80,17 +130,12 @@ def count_phrases(
     This also ignores all uppercase words and usernames in the text.
     The case of the return word(s) is lowercase.
     It returns a dict of {phrase : count}."""
+    encoded = thread.encoded()
+    keep = _significant_words_keep(encoded, frozenset(common_words))
     phrase_counter = collections.Counter()
-    for post in thread.posts:
-        trimmed_words = post.significant_words(common_words)
-        phrases = []
-        for i in range(len(trimmed_words) - (phrase_length - 1)):
-            phrase = tuple(trimmed_words[i:i + phrase_length])
-            # if all([len(w) > 1 for w in phrase]):
-            #     phrases.append(phrase)
-            phrases.append(phrase)
-        phrase_counter.update(phrases)
-    return filter_counter(phrase_counter, freq_ge)
+    for trimmed_ids in encoded.filtered(keep):
+        phrase_counter.update(zip(*[trimmed_ids[i:] for i in range(phrase_length)]))
+    return _decode_phrases(encoded, phrase_counter, freq_ge)
 
 
 def count_all_caps(
@@ -99,11 +144,208 @@ def count_all_caps(
         freq_ge: int,
 ) -> typing.Dict[typing.Hashable, int]:
     """Returns a dict of {word : count} for all thd uppercase words in the thread."""
-    word_counter = collections.Counter()
-    for post in thread.posts:
-        words = post.cap_words(min_size)
-        word_counter.update(words)
-    return filter_counter(word_counter, freq_ge)
+    encoded = thread.encoded()
+    return _count_words(encoded, _all_caps_keep(encoded, min_size), freq_ge)
+
+
+class SpaceSaving:
+    """The Space-Saving summary of the most frequent items of a stream using at most capacity counters.
+    See Metwally, Agrawal and El Abbadi "Efficient Computation of Frequent and Top-k Elements in Data Streams" (2005).
+
+    For every item that is monitored count(item) - error(item) <= true count <= count(item).
+    Any item that is not monitored has a true count <= min_count() <= total / capacity so every item with a true count
+    greater than min_count() is monitored.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f'Capacity must be >= 1 not {capacity}')
+        self.capacity = capacity
+        # The number of items added.
+        self.total = 0
+        # Map of {item : count, ...} of the monitored items.
+        self.counts: typing.Dict[typing.Hashable, int] = {}
+        # Map of {item : maximum over estimate of the count, ...} of the monitored items.
+        self.errors: typing.Dict[typing.Hashable, int] = {}
+        # A min heap of (count, sequence, item) with one entry for each monitored item.
+        # Increments do not update the heap so an entry may have a count that is less than the count of the item,
+        # these are corrected when they reach the top of the heap.
+        self._heap: typing.List[typing.Tuple[int, int, typing.Hashable]] = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _pop_min(self) -> typing.Tuple[int, typing.Hashable]:
+        """Removes the item with the minimum count from the heap and returns (count, item)."""
+        heap = self._heap
+        while True:
+            count, _sequence, item = heap[0]
+            current = self.counts[item]
+            if current == count:
+                heapq.heappop(heap)
+                return count, item
+            heapq.heapreplace(heap, (current, next(self._sequence), item))
+
+    def min_count(self) -> int:
+        """The minimum count of the monitored items, 0 if fewer than capacity items are monitored.
+        No item that is not monitored has a true count greater than this."""
+        if len(self.counts) < self.capacity:
+            return 0
+        count, item = self._pop_min()
+        heapq.heappush(self._heap, (count, next(self._sequence), item))
+        return count
+
+    def update(self, items: typing.Iterable[typing.Hashable]) -> None:
+        """Adds each of the items."""
+        counts = self.counts
+        for item in items:
+            self.total += 1
+            count = counts.get(item)
+            if count is not None:
+                counts[item] = count + 1
+            elif len(counts) < self.capacity:
+                counts[item] = 1
+                self.errors[item] = 0
+                heapq.heappush(self._heap, (1, next(self._sequence), item))
+            else:
+                # Replace the item with the minimum count, the new item may have occurred that many times.
+                min_count, min_item = self._pop_min()
+                del counts[min_item]
+                del self.errors[min_item]
+                counts[item] = min_count + 1
+                self.errors[item] = min_count
+                heapq.heappush(self._heap, (min_count + 1, next(self._sequence), item))
+
+
+def count_phrases_streaming(
+        thread: pprune.common.thread_struct.Thread,
+        common_words: typing.Sequence[str],
+        phrase_length: int,
+        freq_ge: int,
+        capacity: int,
+) -> typing.Dict[typing.Hashable, int]:
+    """This is count_phrases() with the memory bounded by capacity rather than by the number of distinct phrases.
+
+    The first pass over the posts finds the candidate phrases with a SpaceSaving summary of capacity phrases, the
+    second pass counts the candidates exactly so all the counts in the result are exact.
+    If freq_ge is greater than the minimum count of the summary, which is at most the number of phrases / capacity,
+    then the result is identical to count_phrases() otherwise phrases with a count close to freq_ge may be absent and
+    a warning is logged.
+    For the top k phrases use result.most_common(k) with capacity several times k."""
+    encoded = thread.encoded()
+    trimmed = encoded.filtered(_significant_words_keep(encoded, frozenset(common_words)))
+    summary = SpaceSaving(capacity)
+    for trimmed_ids in trimmed:
+        summary.update(zip(*[trimmed_ids[i:] for i in range(phrase_length)]))
+    min_count = summary.min_count()
+    if freq_ge <= min_count:
+        logger.warning(
+            'count_phrases_streaming(): phrase length %d freq_ge %d <= %d, the minimum count of %d phrases,'
+            ' phrases with a count <= %d may be missing. Increase the capacity for an exact result.',
+            phrase_length, freq_ge, min_count, capacity, min_count,
+        )
+    candidates = {phrase for phrase, count in summary.counts.items() if count >= freq_ge}
+    del summary
+    # The exact counts of the candidates in the order of their first appearance, the same as count_phrases().
+    phrase_counter = collections.Counter()
+    for trimmed_ids in trimmed:
+        phrase_counter.update(
+            [phrase for phrase in zip(*[trimmed_ids[i:] for i in range(phrase_length)]) if phrase in candidates]
+        )
+    return _decode_phrases(encoded, phrase_counter, freq_ge)
+
+
+def count_repeated_phrases(
+        thread: pprune.common.thread_struct.Thread,
+        common_words: typing.Sequence[str],
+        freq_ge: int,
+        min_length: int = 2,
+        max_length: typing.Optional[int] = None,
+        maximal: bool = True,
+) -> typing.Dict[typing.Hashable, int]:
+    """Returns a dict of {phrase : count} of the phrases of every length from min_length to max_length that occur
+    freq_ge times or more, freq_ge must be >= 2.
+    The words are those of count_phrases() and, for any length, the counts are the same as count_phrases().
+    If maximal is True then only the phrases that can not be extended by a word to the left or right without reducing
+    the count are included.
+    This builds a pprune.common.phrase_index.PhraseIndex once rather than counting each phrase length separately."""
+    encoded = thread.encoded()
+    index = pprune.common.phrase_index.PhraseIndex(
+        encoded.filtered(_significant_words_keep(encoded, frozenset(common_words))), len(encoded.vocabulary),
+    )
+    phrase_counter = collections.Counter(
+        {
+            tuple(encoded.vocabulary.decode(token_ids)): count
+            for token_ids, count in index.repeated_phrases(freq_ge, min_length, max_length, maximal)
+        }
+    )
+    # Order by count then by phrase length, longest first.
+    return collections.Counter(
+        dict(sorted(phrase_counter.items(), key=lambda item: (-item[1], -len(item[0]))))
+    )
+
+
+@dataclasses.dataclass
+class ResearchCounts:
+    """The results of count_research(), a report that was not requested is None or, for phrases, absent."""
+    # The result of count_non_cap_words().
+    non_cap_words: typing.Optional[collections.Counter] = None
+    # The result of count_all_caps().
+    all_caps: typing.Optional[collections.Counter] = None
+    # Map of {phrase_length : result of count_phrases(), ...}
+    phrases: typing.Dict[int, collections.Counter] = dataclasses.field(default_factory=dict)
+
+
+def count_research(
+        thread: pprune.common.thread_struct.Thread,
+        common_words: typing.Sequence[str],
+        freq_ge: int,
+        non_cap_words: bool = False,
+        all_caps_min_size: typing.Optional[int] = None,
+        phrase_lengths: typing.Iterable[int] = (),
+        phrase_capacity: int = 0,
+) -> ResearchCounts:
+    """Computes all the requested counts together, the results are identical to calling count_non_cap_words(),
+    count_all_caps() if all_caps_min_size is not None and count_phrases() for each of phrase_lengths.
+    If phrase_capacity is > 0 then count_phrases_streaming() is used for the phrases with that capacity.
+
+    The word counts come from the token counts of the whole thread, the filters are computed from the vocabulary
+    without any string operations and the posts are filtered once for all the phrase lengths.
+    Counting every phrase length in a single walk of the posts was measured to be slower than this, the interleaved
+    updates of several large Counters cost more than walking the filtered token IDs again."""
+    encoded = thread.encoded()
+    vocabulary = encoded.vocabulary
+    # The vocabulary records the lower case token ID and whether each word is all caps so the filters of the
+    # separate functions can be computed together without calling word.lower() and word.upper().
+    common_ids = {vocabulary.get_id(word) for word in common_words}
+    # Equivalent to Post.significant_words()
+    significant = bytearray(lower_id not in common_ids for lower_id in vocabulary.lower_ids)
+    result = ResearchCounts()
+    if non_cap_words:
+        all_users = thread.all_users
+        keep = bytearray(
+            significant[token_id] and not vocabulary.all_caps[token_id] and word not in all_users
+            for token_id, word in enumerate(vocabulary.words)
+        )
+        result.non_cap_words = _count_words(encoded, keep, freq_ge)
+    if all_caps_min_size is not None:
+        keep = bytearray(
+            vocabulary.all_caps[token_id] and len(word) >= all_caps_min_size
+            for token_id, word in enumerate(vocabulary.words)
+        )
+        result.all_caps = _count_words(encoded, keep, freq_ge)
+    for phrase_length in phrase_lengths:
+        if phrase_capacity > 0:
+            result.phrases[phrase_length] = count_phrases_streaming(
+                thread, common_words, phrase_length, freq_ge, phrase_capacity
+            )
+            continue
+        phrase_counter = collections.Counter()
+        for trimmed_ids in encoded.filtered(significant):
+            phrase_counter.update(zip(*[trimmed_ids[i:] for i in range(phrase_length)]))
+        result.phrases[phrase_length] = _decode_phrases(encoded, phrase_counter, freq_ge)
+    return result
 
 
 def match_words(post, common_words, word_map) -> typing.Set[str]:
@@ -133,3 +375,122 @@ def match_phrases(post, common_words, phrase_length, phrase_map):
         except KeyError:
             pass
     return result
+
+
+class SubjectMatcher:
+    """Matches the words, all capital words and phrases of a publication map against the words of a post in a single
+    pass using an Aho-Corasick automaton where each symbol is a word.
+
+    match() gives the same result as the union of match_words(), match_all_caps() and match_phrases() for every
+    phrase length but without creating the trimmed word lists and the phrase tuples for every post.
+
+    Usage::
+
+        matcher = SubjectMatcher.from_publication_map(publication_map, common_words)
+        for post in thread.posts:
+            subjects = matcher.match(post.words)
+    """
+
+    def __init__(
+            self,
+            common_words: typing.Iterable[str],
+            word_map: typing.Dict[str, str],
+            caps_map: typing.Dict[str, str],
+            phrase_maps: typing.Dict[int, typing.Dict[typing.Tuple[str, ...], str]],
+    ):
+        self.common_words = frozenset(common_words)
+        self.caps_map = caps_map
+        # The automaton. State 0 is the root.
+        self._goto: typing.List[typing.Dict[str, int]] = [{}]
+        self._fail: typing.List[int] = [0]
+        self._output: typing.List[typing.Set[str]] = [set()]
+        for word, subject in word_map.items():
+            self._add_pattern((word,), subject)
+        for phrase_length, phrase_map in phrase_maps.items():
+            for phrase, subject in phrase_map.items():
+                # match_phrases() looks up tuples of phrase_length words so nothing else can match.
+                if isinstance(phrase, tuple) and 0 < len(phrase) == phrase_length:
+                    self._add_pattern(phrase, subject)
+        self._add_failure_links()
+        # Map of {word : (automaton_word, caps_subject), ...}
+        # automaton_word is the word as used by match_words() and match_phrases() or None if it is a common word.
+        # caps_subject is the subject from match_all_caps() or None.
+        self._word_map: typing.Dict[str, typing.Tuple[typing.Optional[str], typing.Optional[str]]] = {}
+
+    @classmethod
+    def from_publication_map(cls, publication_map, common_words: typing.Iterable[str]) -> 'SubjectMatcher':
+        """Create a matcher from a publication_maps.PublicationMap."""
+        return cls(
+            common_words,
+            publication_map.get_lowercase_word_to_subject_map(),
+            publication_map.get_uppercase_word_to_subject_map(),
+            {
+                phrase_length: publication_map.get_phrases_to_subject_map(phrase_length)
+                for phrase_length in publication_map.get_phrase_lengths()
+            },
+        )
+
+    def _add_pattern(self, words: typing.Tuple[str, ...], subject: str) -> None:
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(subject)
+
+    def _add_failure_links(self) -> None:
+        """Breadth first through the automaton setting the failure links and merging the outputs of the
+        failure states."""
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and word not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                fail_state = self._goto[fail_state].get(word, 0)
+                self._fail[next_state] = fail_state
+                self._output[next_state] |= self._output[fail_state]
+
+    def _add_word(self, word: str) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+        is_all_caps = word.upper() == word
+        # As Post.words_removed(common_words, True)
+        automaton_word = word if is_all_caps else word.lower()
+        if automaton_word in self.common_words:
+            automaton_word = None
+        # As Post.words_removed(common_words, False) then match_all_caps()
+        caps_subject = None
+        if is_all_caps and len(word) > 1 and word not in self.common_words and word in self.caps_map:
+            caps_subject = self.caps_map[word]
+        result = automaton_word, caps_subject
+        self._word_map[word] = result
+        return result
+
+    def match(self, words: typing.Iterable[str]) -> typing.Set[str]:
+        """Returns the set of subjects that match the words of a post."""
+        subjects = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        word_map = self._word_map
+        state = 0
+        for word in words:
+            word_info = word_map.get(word)
+            if word_info is None:
+                word_info = self._add_word(word)
+            automaton_word, caps_subject = word_info
+            if caps_subject is not None:
+                subjects.add(caps_subject)
+            if automaton_word is not None:
+                while state and automaton_word not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(automaton_word, 0)
+                if output[state]:
+                    subjects |= output[state]
+        return subjects
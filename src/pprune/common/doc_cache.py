@@ -0,0 +1,166 @@
+# MIT License
+#
+# Copyright (c) 2025 Paul Ross https://github.com/paulross
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+A persistent cache of the spaCy annotations of each post, used by research_nlp.py.
+
+The text of an archived post does not change so once a post has been annotated the Doc is kept in a spaCy DocBin.
+The cache has one file per model and set of enabled pipeline components, this contains the spaCy version and, for
+each post, the permalink and the SHA256 of the text that was annotated along with the DocBin of all the Docs.
+The cache file is a zlib compressed pickle of plain Python types, the DocBin is stored as bytes.
+
+A post is annotated again only if its permalink is not in the cache or the SHA256 of its text has changed.
+If the spaCy version or CACHE_VERSION differ then the whole cache is discarded.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import typing
+import zlib
+
+import spacy
+from spacy.tokens import Doc, DocBin
+
+import pprune.common.thread_struct
+
+logger = logging.getLogger(__file__)
+
+#: Increment this if the way that the posts are annotated changes, this invalidates all existing cache entries.
+CACHE_VERSION = 1
+CACHE_FILE_EXTENSION = '.docs'
+
+
+def text_sha256(text: str) -> str:
+    """Returns the SHA256 hex digest of the text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class DocCache:
+    """A persistent cache of the Docs of the posts annotated by a spaCy pipeline.
+
+    Usage::
+
+        nlp = spacy.load('en_core_web_sm')
+        cache = DocCache('path/to/cache', nlp)
+        for post, doc in zip(thread.posts, cache.annotate(thread)):
+            ...
+    """
+
+    def __init__(self, cache_directory: str, nlp: spacy.language.Language):
+        self.cache_directory = cache_directory
+        os.makedirs(self.cache_directory, exist_ok=True)
+        self.nlp = nlp
+        self.hits = 0
+        self.misses = 0
+        # Map of {permalink: (text_sha256, Doc), ...}, None until loaded.
+        self._docs: typing.Optional[typing.Dict[str, typing.Tuple[str, Doc]]] = None
+
+    def __str__(self):
+        return f'DocCache("{self.cache_path()}") hits: {self.hits} misses: {self.misses}'
+
+    def cache_path(self) -> str:
+        """The path to the cache file for the model and its enabled pipeline components."""
+        meta = self.nlp.meta
+        key = f'{meta.get("lang")}_{meta.get("name")}_{meta.get("version")}:{",".join(self.nlp.pipe_names)}'
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_directory, name + CACHE_FILE_EXTENSION)
+
+    def _read_entry(self, cache_path: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        try:
+            with open(cache_path, 'rb') as file:
+                return pickle.loads(zlib.decompress(file.read()))
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warning('Ignoring corrupt cache file %s Error: %s', cache_path, err)
+        return None
+
+    def _write_entry(self, cache_path: str, entry: typing.Dict[str, typing.Any]) -> None:
+        """Writes the entry atomically so that an interrupted run can not leave a partial cache file."""
+        data = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self) -> None:
+        """Loads the Docs from the cache file, if the cache file is absent or invalid the cache is empty."""
+        self._docs = {}
+        entry = self._read_entry(self.cache_path())
+        if entry is not None \
+                and entry['version'] == CACHE_VERSION \
+                and entry['spacy_version'] == spacy.__version__ \
+                and entry['pipe_names'] == self.nlp.pipe_names:
+            docs = DocBin().from_bytes(entry['doc_bin']).get_docs(self.nlp.vocab)
+            for (permalink, sha256), doc in zip(entry['keys'], docs):
+                self._docs[permalink] = (sha256, doc)
+        logger.info('Loaded %d Docs from %s', len(self._docs), self.cache_path())
+
+    def save(self) -> None:
+        """Saves all the Docs to the cache file."""
+        doc_bin = DocBin(store_user_data=False)
+        keys = []
+        for permalink, (sha256, doc) in self._docs.items():
+            keys.append((permalink, sha256))
+            doc_bin.add(doc)
+        entry = {
+            'version': CACHE_VERSION,
+            'spacy_version': spacy.__version__,
+            'pipe_names': self.nlp.pipe_names,
+            'keys': keys,
+            'doc_bin': doc_bin.to_bytes(),
+        }
+        self._write_entry(self.cache_path(), entry)
+
+    def annotate(
+            self, thread: pprune.common.thread_struct.Thread, batch_size: int = 256, n_process: int = 1,
+    ) -> typing.List[Doc]:
+        """Returns the Doc of every post in the thread in order.
+        Only the posts that are not in the cache, or whose text has changed, are run through nlp.pipe(), these are
+        then saved to the cache file."""
+        if self._docs is None:
+            self.load()
+        texts = [post.text_stripped_without_quoted_message for post in thread.posts]
+        keys = [(post.permalink, text_sha256(text)) for post, text in zip(thread.posts, texts)]
+        result: typing.List[typing.Optional[Doc]] = [None] * len(texts)
+        missing = []
+        for p, (permalink, sha256) in enumerate(keys):
+            cached = self._docs.get(permalink)
+            if cached is not None and cached[0] == sha256:
+                result[p] = cached[1]
+            else:
+                missing.append(p)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            docs = self.nlp.pipe((texts[p] for p in missing), batch_size=batch_size, n_process=n_process)
+            for p, doc in zip(missing, docs):
+                result[p] = doc
+                self._docs[keys[p][0]] = (keys[p][1], doc)
+            self.save()
+        logger.info('%s', self)
+        return result
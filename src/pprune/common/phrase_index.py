@@ -0,0 +1,178 @@
+# MIT License
+#
+# Copyright (c) 2025 Paul Ross https://github.com/paulross
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+A suffix array and LCP array of the token IDs of every post in a thread for finding every repeated phrase, of any
+length, in one build.
+
+The posts are concatenated with a unique separator after each post so that no phrase spans two posts.
+Every repeated phrase is the common prefix of a contiguous range of the suffix array, an LCP interval, and the
+number of occurrences of the phrase is the size of the interval. This counts overlapping occurrences so the counts of
+the phrases of length n are the same as counting the n-grams of every post.
+
+A maximal phrase is one that can not be extended to the right or to the left without reducing its count, for example
+if "Quote Originally Posted by" occurs 50 times and its sub-phrases only occur within it then only that phrase is
+maximal.
+
+Usage::
+
+    index = PhraseIndex(encoded.post_token_ids, len(encoded.vocabulary))
+    for token_ids, count in index.repeated_phrases(freq_ge=5, min_length=2, maximal=True):
+        print(encoded.vocabulary.decode(token_ids), count)
+"""
+import logging
+import typing
+
+import numpy as np
+
+logger = logging.getLogger(__file__)
+
+# Values of the left token of an LCP interval when it has no positions yet or when the positions are preceded by
+# different tokens.
+_LEFT_UNSET = -1
+_LEFT_DIVERSE = -2
+
+
+def suffix_array(text: np.ndarray) -> np.ndarray:
+    """Returns the suffix array of the non-negative integers in text by prefix doubling."""
+    n = len(text)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = text.astype(np.int64)
+    k = 1
+    while True:
+        second = np.full(n, -1, dtype=np.int64)
+        if k < n:
+            second[:n - k] = rank[k:]
+        # Sort by (rank, second), lexsort sorts by the last key first.
+        sa = np.lexsort((second, rank))
+        rank_sorted = rank[sa]
+        second_sorted = second[sa]
+        changed = (rank_sorted[1:] != rank_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[sa] = np.concatenate(([0], np.cumsum(changed)))
+        rank = new_rank
+        if rank_sorted.size and new_rank[sa[-1]] == n - 1:
+            return sa
+        k *= 2
+
+
+def lcp_array(text: typing.Sequence[int], sa: typing.Sequence[int]) -> typing.List[int]:
+    """Returns the LCP array by Kasai's algorithm, lcp[i] is the length of the common prefix of the suffixes sa[i - 1]
+    and sa[i], lcp[0] is 0."""
+    n = len(text)
+    rank = [0] * n
+    for i, position in enumerate(sa):
+        rank[position] = i
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        r = rank[i]
+        if r > 0:
+            j = sa[r - 1]
+            while i + h < n and j + h < n and text[i + h] == text[j + h]:
+                h += 1
+            lcp[r] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
+    return lcp
+
+
+def _merge_left(a: int, b: int) -> int:
+    if a == _LEFT_UNSET:
+        return b
+    if b == _LEFT_UNSET or a == b:
+        return a
+    return _LEFT_DIVERSE
+
+
+class PhraseIndex:
+    """The suffix array and LCP array of the token IDs of the posts.
+    vocabulary_size must be greater than every token ID, the post separators are vocabulary_size, vocabulary_size + 1
+    and so on."""
+
+    def __init__(self, posts_token_ids: typing.Iterable[typing.Sequence[int]], vocabulary_size: int):
+        text: typing.List[int] = []
+        separator = vocabulary_size
+        for token_ids in posts_token_ids:
+            text.extend(token_ids)
+            text.append(separator)
+            separator += 1
+        self.vocabulary_size = vocabulary_size
+        self.text = text
+        self.sa: typing.List[int] = suffix_array(np.array(text, dtype=np.int64)).tolist()
+        self.lcp = lcp_array(self.text, self.sa)
+        logger.debug('PhraseIndex of %d tokens', len(self.text))
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def _left_token(self, position: int) -> int:
+        """The token before the position, the separators are unique so a phrase at the start of a post is always
+        left maximal."""
+        if position == 0:
+            return _LEFT_DIVERSE
+        return self.text[position - 1]
+
+    def repeated_phrases(
+            self,
+            freq_ge: int,
+            min_length: int = 1,
+            max_length: typing.Optional[int] = None,
+            maximal: bool = False,
+    ) -> typing.Iterator[typing.Tuple[typing.Tuple[int, ...], int]]:
+        """Yields (token_ids, count) for every phrase of min_length to max_length tokens that occurs >= freq_ge times.
+        If maximal is True then only the maximal phrases are yielded.
+        The phrases are in the lexicographic order of their token IDs, an LCP interval is yielded after the intervals
+        that it contains."""
+        if freq_ge < 2:
+            raise ValueError(f'freq_ge must be >= 2 not {freq_ge}')
+        text = self.text
+        sa = self.sa
+        lcp = self.lcp
+        n = len(text)
+        # Each entry is [lcp, left bound, left token].
+        stack = [[0, 0, _LEFT_UNSET]]
+        for i in range(1, n + 1):
+            current = lcp[i] if i < n else 0
+            left_bound = i - 1
+            left = self._left_token(sa[i - 1])
+            while current < stack[-1][0]:
+                interval_lcp, left_bound, interval_left = stack.pop()
+                left = _merge_left(interval_left, left)
+                count = i - left_bound
+                if count >= freq_ge:
+                    parent_lcp = max(current, stack[-1][0])
+                    start = sa[left_bound]
+                    if maximal:
+                        if left == _LEFT_DIVERSE and min_length <= interval_lcp \
+                                and (max_length is None or interval_lcp <= max_length):
+                            yield tuple(text[start:start + interval_lcp]), count
+                    else:
+                        longest = interval_lcp if max_length is None else min(interval_lcp, max_length)
+                        for length in range(max(parent_lcp + 1, min_length), longest + 1):
+                            yield tuple(text[start:start + length]), count
+            if current > stack[-1][0]:
+                stack.append([current, left_bound, left])
+            else:
+                stack[-1][2] = _merge_left(stack[-1][2], left)
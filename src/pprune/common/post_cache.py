@@ -0,0 +1,183 @@
+# MIT License
+#
+# Copyright (c) 2025 Paul Ross https://github.com/paulross
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+A persistent cache of the posts extracted from each archived page.
+
+Each page has a cache file that contains the file path, size, modification time and SHA256 of the archived page
+along with the PostRecords extracted from it.
+The cache file is a zlib compressed pickle of plain Python types.
+
+A cache entry is valid if the path, size and modification time match, if the size matches but the modification time
+does not (for example the file has been copied) then the SHA256 is checked.
+Otherwise the page is re-parsed and the cache entry replaced.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import typing
+import zlib
+
+import pprune.common.read_html
+import pprune.common.thread_struct
+
+logger = logging.getLogger(__file__)
+
+#: Increment this if the PostRecord or the way it is extracted changes, this invalidates all existing cache entries.
+CACHE_VERSION = 1
+CACHE_FILE_EXTENSION = '.posts'
+
+
+def file_sha256(file_path: str) -> str:
+    """Returns the SHA256 hex digest of the file content."""
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _user_to_tuple(
+        user: typing.Optional[pprune.common.thread_struct.User]
+) -> typing.Optional[typing.Tuple[str, str]]:
+    if user is None:
+        return None
+    return user.href, user.name
+
+
+def _user_from_tuple(
+        user_tuple: typing.Optional[typing.Tuple[str, str]]
+) -> typing.Optional[pprune.common.thread_struct.User]:
+    if user_tuple is None:
+        return None
+    return pprune.common.thread_struct.User(*user_tuple)
+
+
+def post_record_to_tuple(record: pprune.common.read_html.PostRecord) -> tuple:
+    """Converts a PostRecord to a tuple of plain Python types."""
+    return (
+        record.timestamp,
+        record.permalink,
+        _user_to_tuple(record.user),
+        record.post_html,
+        record.sequence_num,
+        [_user_to_tuple(user) for user in record.liked_by_users],
+        record.node_name,
+        record.node_attrs,
+    )
+
+
+def post_record_from_tuple(record_tuple: tuple) -> pprune.common.read_html.PostRecord:
+    """Converts a tuple from post_record_to_tuple() back to a PostRecord."""
+    timestamp, permalink, user, post_html, sequence_num, liked_by_users, node_name, node_attrs = record_tuple
+    return pprune.common.read_html.PostRecord(
+        timestamp=timestamp,
+        permalink=permalink,
+        user=_user_from_tuple(user),
+        post_html=post_html,
+        sequence_num=sequence_num,
+        liked_by_users=[_user_from_tuple(u) for u in liked_by_users],
+        node_name=node_name,
+        node_attrs=node_attrs,
+    )
+
+
+class PostRecordCache:
+    """A persistent cache of PostRecords for each archived page.
+
+    Usage::
+
+        cache = PostRecordCache('path/to/cache')
+        records = cache.load(file_path)
+        if records is None:
+            records = read_html.get_post_records_from_file_path(file_path)
+            cache.save(file_path, records)
+    """
+
+    def __init__(self, cache_directory: str):
+        self.cache_directory = cache_directory
+        os.makedirs(self.cache_directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        return f'PostRecordCache("{self.cache_directory}") hits: {self.hits} misses: {self.misses}'
+
+    def cache_path(self, file_path: str) -> str:
+        """The path to the cache file for the archived page."""
+        name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_directory, name + CACHE_FILE_EXTENSION)
+
+    def _read_entry(self, cache_path: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        try:
+            with open(cache_path, 'rb') as file:
+                return pickle.loads(zlib.decompress(file.read()))
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warning('Ignoring corrupt cache file %s Error: %s', cache_path, err)
+        return None
+
+    def _write_entry(self, cache_path: str, entry: typing.Dict[str, typing.Any]) -> None:
+        """Writes the entry atomically so that an interrupted run can not leave a partial cache file."""
+        data = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, file_path: str) -> typing.Optional[typing.List[pprune.common.read_html.PostRecord]]:
+        """Returns the cached PostRecords for the archived page or None if there is no valid cache entry."""
+        cache_path = self.cache_path(file_path)
+        entry = self._read_entry(cache_path)
+        stat = os.stat(file_path)
+        if entry is not None \
+                and entry['version'] == CACHE_VERSION \
+                and entry['file_path'] == os.path.abspath(file_path) \
+                and entry['size'] == stat.st_size:
+            if entry['mtime_ns'] != stat.st_mtime_ns:
+                if entry['sha256'] != file_sha256(file_path):
+                    entry = None
+                else:
+                    # Same content, update the modification time so that the hash is not needed next time.
+                    entry['mtime_ns'] = stat.st_mtime_ns
+                    self._write_entry(cache_path, entry)
+            if entry is not None:
+                self.hits += 1
+                return [post_record_from_tuple(t) for t in entry['records']]
+        self.misses += 1
+        return None
+
+    def save(self, file_path: str, records: typing.List[pprune.common.read_html.PostRecord]) -> None:
+        """Saves the PostRecords for the archived page."""
+        stat = os.stat(file_path)
+        entry = {
+            'version': CACHE_VERSION,
+            'file_path': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(file_path),
+            'records': [post_record_to_tuple(record) for record in records],
+        }
+        self._write_entry(self.cache_path(file_path), entry)
@@ -27,21 +27,40 @@ __version__ = '0.0.1'
 __rights__ = 'Copyright (c) 2017 Paul Ross'
 
 import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
 import datetime
+import functools
+import gzip
+import hashlib
+import json
 import logging
 import os
 import re
 import string
 import sys
+import tempfile
+import threading
 import time
 import typing
 from urllib.parse import urlparse, ParseResult
 
 import bs4
 import dateparser
+import lxml.etree
+import lxml.html
 import requests
+import requests.adapters
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
 
 import pprune.common.log_config
+import pprune.common.stage_profile
 import pprune.common.thread_struct
 
 logger = logging.getLogger(__file__)
@@ -51,10 +70,30 @@ logger = logging.getLogger(__file__)
 # Thread two is more awkward, for example:
 # '666581-air-india-ahmedabad-accident-12th-june-2025-part-2-a.html'
 # '666581-air-india-ahmedabad-accident-12th-june-2025-part-2-a-20.html'
-RE_FILENAME = re.compile(r'(\d+)(\S+?)(\d+)?\.html')
+# Archived pages may be compressed, for example '423988-concorde-question-2.html.gz'.
+RE_FILENAME = re.compile(r'(\d+)(\S+?)(\d+)?\.html(?:\.gz|\.zst)?$')
 DIGITS_TABLE = str.maketrans({key: None for key in string.digits})
 
 
+#: Map of {compression: file extension, ...} of the compressed archived pages.
+ARCHIVE_COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+def open_archive_file(file_path: str, mode: str = 'r', **kwargs) -> typing.TextIO:
+    """Opens an archived page as text, it is decompressed or compressed according to the file extension.
+    mode is 'r' or 'w', kwargs are passed to open(), for example errors='backslashreplace'."""
+    if file_path.endswith(ARCHIVE_COMPRESSION_EXTENSIONS['gzip']):
+        return gzip.open(file_path, mode + 't', encoding='utf-8', **kwargs)
+    if file_path.endswith(ARCHIVE_COMPRESSION_EXTENSIONS['zstd']):
+        if zstandard is None:
+            raise ValueError(f'Can not open {file_path} as the zstandard package is not installed.')
+        return zstandard.open(file_path, mode + 't', encoding='utf-8', **kwargs)
+    return open(file_path, mode, **kwargs)
+
+
 def get_url_text(url: str) -> str:
     """Gets a URL as text.
     This SO question is useful:
@@ -82,6 +121,19 @@ def get_url_text(url: str) -> str:
     return response.text
 
 
+def get_url_response(url: str, headers: typing.Optional[typing.Dict[str, str]] = None) -> requests.Response:
+    """Gets a URL with optional request headers.
+    The response status is 200 or, for a conditional request, 304 (Not Modified)."""
+    logger.info('Requesting URL %s', url)
+    try:
+        response = requests.get(url, headers=headers)
+    except requests.exceptions.ConnectionError as err:  # pragma: no cover
+        raise ValueError(f'URP request {url} raised: {err}')
+    if response.status_code not in (200, 304):
+        raise ValueError(f'URP request {url} failed: {response.status_code}')
+    return response
+
+
 def parse_url_to_beautiful_soup(url: str) -> bs4.BeautifulSoup:
     """Parses a URL."""
     response_text = get_url_text(url)
@@ -100,14 +152,15 @@ def parse_str_to_beautiful_soup(content: str) -> bs4.BeautifulSoup:
 
 def get_post_nodes_from_file_path(file_path) -> typing.List[bs4.element.Tag]:
     # doctext = open('423988-concorde-question-1.html', errors='backslashreplace').read()
-    with open(file_path, errors='backslashreplace') as f:
+    with open_archive_file(file_path, errors='backslashreplace') as f:
         return get_post_nodes_from_file(f)
 
 
 def get_post_nodes_from_file(file: typing.TextIO) -> typing.List[bs4.element.Tag]:
     """Returns a list of posts as HTML nodes from a file object."""
     file.seek(0)
-    doc = bs4.BeautifulSoup(file.read(), 'html.parser')
+    with pprune.common.stage_profile.stage('HTML parse'):
+        doc = bs4.BeautifulSoup(file.read(), 'html.parser')
     return get_post_nodes_from_parsed_doc(doc)
 
 
@@ -170,8 +223,52 @@ def html_node_date(node: bs4.element.Tag) -> datetime.datetime:
     #                         <!-- / status icon and date -->
     # </div>
     date_node = node.find('div', **{"class": "tcell"})
-    text = date_node.text
-    ret = dateparser.parse(text.strip())
+    return date_from_text(date_node.text)
+
+
+#: Matches the dates of posts, for example '20th Feb 2021, 22:20' or '11th June 2025 | 20:57'.
+#: Groups are (day, month name, year, hour, minute).
+RE_POST_DATE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\.?,?\s+(\d{4})\s*[,|]\s*(\d{1,2}):(\d{2})')
+_MONTH_NAMES = (
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+)
+#: Map of {lower case month name or abbreviation: month number, ...}
+MONTH_NUMBERS: typing.Dict[str, int] = {}
+for _month_number, _month_name in enumerate(_MONTH_NAMES, 1):
+    MONTH_NUMBERS[_month_name] = MONTH_NUMBERS[_month_name[:3]] = _month_number
+MONTH_NUMBERS['sept'] = 9
+
+
+def _parse_post_date(text: str) -> typing.Optional[datetime.datetime]:
+    """Parses the date formats that pprune uses, see RE_POST_DATE.
+    Returns None if the text is not in one of these formats."""
+    match = RE_POST_DATE.fullmatch(text)
+    if match is None:
+        return None
+    day, month_name, year, hour, minute = match.groups()
+    month = MONTH_NUMBERS.get(month_name.lower())
+    if month is None:
+        return None
+    try:
+        return datetime.datetime(int(year), month, int(day), int(hour), int(minute))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _dateparser_parse(text: str) -> typing.Optional[datetime.datetime]:
+    return dateparser.parse(text)
+
+
+@pprune.common.stage_profile.staged('date parsing')
+def date_from_text(text: str) -> typing.Optional[datetime.datetime]:
+    """Returns the date from the text of the date node, for example '20th Feb 2021, 22:20'.
+    The usual formats are parsed directly, anything else is parsed by dateparser which is much slower."""
+    text = text.strip()
+    ret = _parse_post_date(text)
+    if ret is None:
+        ret = _dateparser_parse(text)
     # For some weird reason the date from a file obtained by curl is 12 hours behind the display date.
     # For example, from curl: 11th June 2025 | 20:57
     # But in the browser/show page source: 12th June 2025 | 08:57
@@ -266,8 +363,14 @@ def html_node_like_usernames(node: bs4.element.Tag) -> typing.List[pprune.common
     return ret
 
 
-def post_from_html_node(node: bs4.element.Tag) -> typing.Optional[pprune.common.thread_struct.Post]:
-    """Returns a Post object from an HTML node."""
+@pprune.common.stage_profile.staged('post extraction')
+def post_from_html_node(
+        node: bs4.element.Tag,
+        detach: bool = False,
+) -> typing.Optional[pprune.common.thread_struct.Post]:
+    """Returns a Post object from an HTML node.
+    If detach is True the post content node is removed from the parse tree of the page so that the Post does not
+    keep the whole page in memory."""
     timestamp = html_node_date(node)
     permalink = html_node_permalink(node)
     if permalink is None:
@@ -279,10 +382,194 @@ def post_from_html_node(node: bs4.element.Tag) -> typing.Optional[pprune.common.
     sequence_number = html_node_post_number(node)
     liked_by_users = html_node_like_usernames(node)
     if sequence_number is not None:
+        if detach and post_node is not None:
+            post_node.extract()
         post = pprune.common.thread_struct.Post(timestamp, permalink, user, post_node, sequence_number, liked_by_users)
         return post
 
 
+@dataclasses.dataclass(frozen=True)
+class PostRecord:
+    """The data extracted from a post node in a form that can be pickled.
+    This does not reference the parse tree of the page, the post content node
+    (``<div class="tcell alt1" id="td_post_10994338">``) is held as serialised HTML.
+    This is what is passed back from worker processes, see update_whole_thread()."""
+    timestamp: typing.Optional[datetime.datetime]
+    permalink: typing.Optional[str]
+    user: typing.Optional[pprune.common.thread_struct.User]
+    post_html: typing.Optional[str]
+    sequence_num: typing.Optional[int]
+    liked_by_users: typing.List[pprune.common.thread_struct.User]
+    # The name and attributes of the original node, these are only used for logging.
+    node_name: str
+    node_attrs: typing.Dict[str, typing.Any]
+
+
+@pprune.common.stage_profile.staged('post extraction')
+def post_record_from_html_node(node: bs4.element.Tag) -> PostRecord:
+    """Returns a PostRecord from an HTML node. See also post_from_html_node()."""
+    post_node = html_node_post_node(node)
+    return PostRecord(
+        timestamp=html_node_date(node),
+        permalink=html_node_permalink(node),
+        user=html_node_user(node),
+        post_html=str(post_node) if post_node is not None else None,
+        sequence_num=html_node_post_number(node),
+        liked_by_users=html_node_like_usernames(node),
+        node_name=node.name,
+        node_attrs=dict(node.attrs),
+    )
+
+
+def get_post_records_from_file_path(file_path: str) -> typing.List[PostRecord]:
+    """Returns a list of PostRecord from an archived page.
+    This is suitable for running in a separate process.
+    This may raise ValueError, for example if there are no posts in the page."""
+    return [post_record_from_html_node(node) for node in get_post_nodes_from_file_path(file_path)]
+
+
+# The following functions are the equivalents of the html_node_...() functions above
+# but use lxml and XPath rather than BeautifulSoup. This is much faster for extracting the posts from a page.
+# See get_post_records_from_string_lxml().
+
+
+def _xpath_has_class(class_name: str) -> str:
+    """Returns an XPath predicate that is true if the class attribute contains class_name.
+    This is the equivalent of BeautifulSoup's find(class_=class_name)."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+def _lxml_find(node: lxml.html.HtmlElement, xpath: str, **variables) -> typing.Optional[lxml.html.HtmlElement]:
+    """Returns the first element in document order that matches the XPath or None."""
+    result = node.xpath(f'({xpath})[1]', **variables)
+    if result:
+        return result[0]
+
+
+def get_post_nodes_from_lxml_doc(doc: lxml.html.HtmlElement) -> typing.List[lxml.html.HtmlElement]:
+    """The equivalent of get_post_nodes_from_parsed_doc()."""
+    posts = _lxml_find(doc, '//div[@id="posts"]')
+    if posts is None:
+        raise ValueError('No posts found')
+    # Miss out the last one: <div id="lastpost"></div>
+    ret = [c for c in posts.iterchildren('div') if c.attrib['id'] != 'lastpost']
+    return ret
+
+
+def lxml_node_post_number(node: lxml.html.HtmlElement) -> typing.Optional[int]:
+    """The equivalent of html_node_post_number()."""
+    m = RE_POST_ID_TO_POST_NUMBER.match(node.attrib['id'])
+    if m:
+        return int(m.group(1))
+
+
+def lxml_node_date(node: lxml.html.HtmlElement) -> typing.Optional[datetime.datetime]:
+    """The equivalent of html_node_date()."""
+    date_node = _lxml_find(node, f'.//div[{_xpath_has_class("tcell")}]')
+    return date_from_text(date_node.text_content())
+
+
+def lxml_node_permalink(node: lxml.html.HtmlElement) -> typing.Optional[str]:
+    """The equivalent of html_node_permalink()."""
+    permalink_node = _lxml_find(node, './/a[@title="Link to this Post"]')
+    if permalink_node is not None:
+        return permalink_node.attrib['href']
+
+
+def lxml_node_user(node: lxml.html.HtmlElement) -> typing.Optional[pprune.common.thread_struct.User]:
+    """The equivalent of html_node_user()."""
+    user_node = _lxml_find(node, f'.//a[{_xpath_has_class("bigusername")}]')
+    if user_node is not None:
+        return pprune.common.thread_struct.User(user_node.attrib['href'], user_node.text_content().strip())
+
+
+def lxml_node_post_html(node: lxml.html.HtmlElement, post_id: int) -> typing.Optional[str]:
+    """Returns the serialised HTML of the node containing the post content.
+    See html_node_post_node()."""
+    post_node = _lxml_find(node, './/div[@class="tcell alt1" and @id=$node_id]', node_id=f'td_post_{post_id}')
+    if post_node is not None:
+        return lxml.html.tostring(post_node, encoding='unicode', with_tail=False)
+
+
+def lxml_node_like_usernames(node: lxml.html.HtmlElement, post_id: int) -> typing.List[pprune.common.thread_struct.User]:
+    """The equivalent of html_node_like_usernames()."""
+    ret = []
+    post_thanks_box_node = _lxml_find(node, './/div[@id=$node_id]', node_id=f'post_thanks_box_{post_id}')
+    if post_thanks_box_node is not None:
+        # Old style pprune thread.
+        for node_a in post_thanks_box_node.iter('a'):
+            ret.append(pprune.common.thread_struct.User(node_a.attrib['href'], node_a.text_content().strip()))
+    else:
+        # New style pprune thread, we can only get the number of likes.
+        post_thanks_box_node = _lxml_find(node, './/span[@id=$node_id]', node_id=f'post_thanks_button_likes_{post_id}')
+        if post_thanks_box_node is not None:
+            for i in range(int(post_thanks_box_node.text_content())):
+                ret.append(pprune.common.thread_struct.User(str(i), f'Mock_user_{i}'))
+    return ret
+
+
+@pprune.common.stage_profile.staged('post extraction')
+def post_record_from_lxml_node(node: lxml.html.HtmlElement) -> PostRecord:
+    """The equivalent of post_record_from_html_node()."""
+    sequence_num = lxml_node_post_number(node)
+    return PostRecord(
+        timestamp=lxml_node_date(node),
+        permalink=lxml_node_permalink(node),
+        user=lxml_node_user(node),
+        post_html=lxml_node_post_html(node, sequence_num),
+        sequence_num=sequence_num,
+        liked_by_users=lxml_node_like_usernames(node, sequence_num),
+        node_name=node.tag,
+        node_attrs=dict(node.attrib),
+    )
+
+
+def get_post_records_from_string_lxml(content: str) -> typing.List[PostRecord]:
+    """Returns a list of PostRecord from the HTML of a page using lxml.
+    This produces the same records as get_post_records_from_file_path() but much faster.
+    This may raise ValueError, for example if there are no posts in the page."""
+    try:
+        with pprune.common.stage_profile.stage('HTML parse'):
+            doc = lxml.html.fromstring(content)
+    except lxml.etree.ParserError as err:
+        # For example an empty file, BeautifulSoup is fine with that but then finds no posts.
+        raise ValueError(f'No posts found: {err}')
+    return [post_record_from_lxml_node(node) for node in get_post_nodes_from_lxml_doc(doc)]
+
+
+def get_post_records_from_file_path_lxml(file_path: str) -> typing.List[PostRecord]:
+    """Returns a list of PostRecord from an archived page using lxml.
+    This is suitable for running in a separate process."""
+    with open_archive_file(file_path, errors='backslashreplace') as f:
+        return get_post_records_from_string_lxml(f.read())
+
+
+#: Map of {engine_name : function(file_path) -> list of PostRecord, ...}
+POST_RECORD_ENGINES: typing.Dict[str, typing.Callable[[str], typing.List[PostRecord]]] = {
+    'bs4': get_post_records_from_file_path,
+    'lxml': get_post_records_from_file_path_lxml,
+}
+
+
+def post_from_record(record: PostRecord) -> typing.Optional[pprune.common.thread_struct.Post]:
+    """Returns a Post object from a PostRecord. This is the equivalent of post_from_html_node().
+    The post node is a SerialisedNode that is only parsed when needed."""
+    if record.permalink is None:
+        logger.warning(f'No permalink extracted from node <{record.node_name} {record.node_attrs}>')
+    if record.user is None:
+        logger.warning(f'No user extracted from node <{record.node_name} {record.node_attrs}>')
+    if record.sequence_num is not None:
+        post = pprune.common.thread_struct.Post(
+            record.timestamp,
+            record.permalink,
+            record.user,
+            pprune.common.thread_struct.SerialisedNode(record.post_html) if record.post_html is not None else None,
+            record.sequence_num,
+            record.liked_by_users,
+        )
+        return post
+
+
 # def read_common_words(filename, n):
 #     """Reads file_path and returns the set of n words."""
 #     print('Reading words file: {}'.format(filename))
@@ -297,9 +584,13 @@ def post_from_html_node(node: bs4.element.Tag) -> typing.Optional[pprune.common.
 
 
 def read_files(directory_name: str) -> typing.Dict[int, str]:
-    """Returns a dict of {ordinal : file_abspath, ...} of the files in a directory that match RE_FILENAME."""
+    """Returns a dict of {ordinal : file_abspath, ...} of the files in a directory that match RE_FILENAME.
+    Hidden files are ignored."""
     files = {}
     for name in os.listdir(directory_name):
+        if name.startswith('.'):
+            # For example the ArchiveManifest.
+            continue
         m = RE_FILENAME.match(name)
         if m is not None:
             if m.group(3) is not None:
@@ -316,29 +607,64 @@ def read_files(directory_name: str) -> typing.Dict[int, str]:
     return files
 
 
-def read_whole_thread(directory_name: str, count: int = -1) -> pprune.common.thread_struct.Thread:
+def read_whole_thread(
+        directory_name: str,
+        count: int = -1,
+        jobs: int = 1,
+        engine: str = 'bs4',
+        cache: typing.Optional['pprune.common.post_cache.PostRecordCache'] = None,
+) -> pprune.common.thread_struct.Thread:
     """Reads a directory of HTML and creates a Thread object."""
     thread = pprune.common.thread_struct.Thread()
-    update_whole_thread(directory_name, thread, count)
+    update_whole_thread(directory_name, thread, count, jobs, engine, cache)
     return thread
 
 
-def update_whole_thread(directory_name: str, thread: pprune.common.thread_struct.Thread, count: int = -1) -> None:
+def update_whole_thread(
+        directory_name: str,
+        thread: pprune.common.thread_struct.Thread,
+        count: int = -1,
+        jobs: int = 1,
+        engine: str = 'bs4',
+        cache: typing.Optional['pprune.common.post_cache.PostRecordCache'] = None,
+) -> None:
     """Reads a directory of HTML and updates the Thread object.
     This allows the accumulation of multiple threads.
+    If jobs > 1 then the pages are parsed by that number of processes.
+    The posts are added to the thread in page order regardless of jobs.
+    engine is a key in POST_RECORD_ENGINES, 'lxml' is much faster than the default 'bs4'.
+    cache is an optional pprune.common.post_cache.PostRecordCache, pages that are in the cache and have not changed
+    are not parsed at all.
     See also read_whole_thread().
     """
+    if engine not in POST_RECORD_ENGINES:
+        raise ValueError(f'Unknown engine "{engine}", must be one of {sorted(POST_RECORD_ENGINES.keys())}')
     t_start = time.perf_counter()
-    files = read_files(directory_name)
-    file_count = 0
-    for file_number in sorted(files.keys()):
-        if 0 <= count <= file_count:
-            break
+    with pprune.common.stage_profile.stage('file listing'):
+        files = read_files(directory_name)
+    file_paths = [files[file_number] for file_number in sorted(files.keys())]
+    if count >= 0:
+        file_paths = file_paths[:count]
+    if jobs <= 1 and engine == 'bs4' and cache is None:
+        _update_whole_thread_from_file_paths(file_paths, thread)
+    else:
+        _update_whole_thread_from_post_records(file_paths, thread, jobs, engine, cache)
+    if cache is not None:
+        logger.info('update_whole_thread(): %s', cache)
+    logger.info('update_whole_thread(): Read %d posts in %.3f (s)' % (len(thread.posts), time.perf_counter() - t_start))
+
+
+def _update_whole_thread_from_file_paths(
+        file_paths: typing.List[str],
+        thread: pprune.common.thread_struct.Thread,
+) -> None:
+    """Parses the pages one at a time and adds the posts to the thread in the order of file_paths."""
+    for file_path in file_paths:
         post_count = 0
         try:
-            for post_node in get_post_nodes_from_file_path(files[file_number]):
+            for post_node in get_post_nodes_from_file_path(file_path):
                 # print('Post: %d' % i)
-                post = post_from_html_node(post_node)
+                post = post_from_html_node(post_node, detach=True)
                 if post is not None:
                     thread.add_post(post)
                     post_count += 1
@@ -347,10 +673,70 @@ def update_whole_thread(directory_name: str, thread: pprune.common.thread_struct
         except ValueError as err:
             # Have seen the first page say that the lat page is 71 but when curl'ing that the file is empty and
             # we get this error. Ignore it.
-            logger.warning('Can not read post from file %s Error: %s', files[file_number], err)
-        logger.info('Read: {:s} posts: {:d}'.format(os.path.basename(files[file_number]), post_count))
-        file_count += 1
-    logger.info('update_whole_thread(): Read %d posts in %.3f (s)' % (len(thread.posts), time.perf_counter() - t_start))
+            logger.warning('Can not read post from file %s Error: %s', file_path, err)
+        logger.info('Read: {:s} posts: {:d}'.format(os.path.basename(file_path), post_count))
+
+
+def _update_whole_thread_from_post_records(
+        file_paths: typing.List[str],
+        thread: pprune.common.thread_struct.Thread,
+        jobs: int,
+        engine: str,
+        cache: typing.Optional['pprune.common.post_cache.PostRecordCache'],
+) -> None:
+    """Gets the PostRecords for each page from the cache, if possible, otherwise from the engine.
+    If jobs > 1 the pages are parsed in a process pool.
+    The posts are added to the thread in the order of file_paths."""
+    get_post_records = POST_RECORD_ENGINES[engine]
+    with contextlib.ExitStack() as exit_stack:
+        executor = None
+        if jobs > 1:
+            executor = exit_stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=jobs))
+
+        def post_records_getter(file_path: str) -> typing.Callable[[], typing.List[PostRecord]]:
+            if cache is not None:
+                cached_records = cache.load(file_path)
+                if cached_records is not None:
+                    return lambda: cached_records
+            if executor is not None:
+                get_records = executor.submit(get_post_records, file_path).result
+            else:
+                get_records = functools.partial(get_post_records, file_path)
+            if cache is None:
+                return get_records
+
+            def get_records_and_save() -> typing.List[PostRecord]:
+                records = get_records()
+                cache.save(file_path, records)
+                return records
+
+            return get_records_and_save
+
+        # NOTE: A list so that all the pages are submitted to the executor before we wait on any of them.
+        _add_post_records_to_thread(file_paths, [post_records_getter(p) for p in file_paths], thread)
+
+
+def _add_post_records_to_thread(
+        file_paths: typing.List[str],
+        get_post_records: typing.Iterable[typing.Callable[[], typing.List[PostRecord]]],
+        thread: pprune.common.thread_struct.Thread,
+) -> None:
+    """For each file path get_post_records gives a callable that returns the PostRecords for that file.
+    The posts are added to the thread in the order of file_paths.
+    Errors are handled in the same way as _update_whole_thread_from_file_paths()."""
+    for file_path, get_records in zip(file_paths, get_post_records):
+        post_count = 0
+        try:
+            for record in get_records():
+                post = post_from_record(record)
+                if post is not None:
+                    thread.add_post(post)
+                    post_count += 1
+                else:
+                    logger.warning('Can not read post from node <%s %s>', record.node_name, record.node_attrs)
+        except ValueError as err:
+            logger.warning('Can not read post from file %s Error: %s', file_path, err)
+        logger.info('Read: {:s} posts: {:d}'.format(os.path.basename(file_path), post_count))
 
 
 def last_url_from_html_page(html_page: bs4.BeautifulSoup) -> str:
@@ -421,39 +807,357 @@ def update_whole_thread_from_url(url_first: str, thread: pprune.common.thread_st
             thread.add_post(post)
 
 
+def archive_destination(offline_directory: str, url: str, compression: typing.Optional[str] = None) -> str:
+    """The path of the archived page for the URL.
+    compression is None or a key in ARCHIVE_COMPRESSION_EXTENSIONS."""
+    parsed_url: ParseResult = urlparse(url)
+    destination = os.path.join(offline_directory, os.path.basename(parsed_url.path))
+    if compression is not None:
+        if compression not in ARCHIVE_COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                f'Unknown compression "{compression}", must be one of {sorted(ARCHIVE_COMPRESSION_EXTENSIONS.keys())}'
+            )
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError('zstd compression requires the zstandard package.')
+        destination += ARCHIVE_COMPRESSION_EXTENSIONS[compression]
+    return destination
+
+
+class ArchiveManifest:
+    """A sidecar file in the archive directory that has the ETag, Last-Modified, length and SHA256 of each archived URL.
+    This is used to make conditional requests for pages that are already archived and to only rewrite pages whose
+    content has changed."""
+    FILE_NAME = '.archive_manifest.json'
+    #: Increment this if the manifest format changes, this invalidates all existing manifests.
+    VERSION = 1
+
+    def __init__(self, entries: typing.Optional[typing.Dict[str, typing.Dict[str, typing.Any]]] = None):
+        # Map of {url: {'etag': ..., 'last_modified': ..., 'length': ..., 'sha256': ...}, ...}
+        self.entries: typing.Dict[str, typing.Dict[str, typing.Any]] = entries if entries is not None else {}
+        self.written = 0
+        self.not_modified = 0
+        self.unchanged = 0
+
+    def __str__(self):
+        return (
+            f'ArchiveManifest written: {self.written} not modified: {self.not_modified} unchanged: {self.unchanged}'
+        )
+
+    @classmethod
+    def load(cls, offline_directory: str) -> 'ArchiveManifest':
+        """Returns the manifest from the archive directory, this is empty if there is no valid manifest."""
+        manifest_path = os.path.join(offline_directory, cls.FILE_NAME)
+        try:
+            with open(manifest_path) as file:
+                content = json.load(file)
+            if content['version'] == cls.VERSION:
+                return cls(content['entries'])
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warning('Ignoring corrupt archive manifest %s Error: %s', manifest_path, err)
+        return cls()
+
+    def save(self, offline_directory: str) -> None:
+        """Saves the manifest atomically so that an interrupted run can not leave a partial manifest."""
+        file_descriptor, temp_path = tempfile.mkstemp(dir=offline_directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump({'version': self.VERSION, 'entries': self.entries}, file, indent=1, sort_keys=True)
+            os.replace(temp_path, os.path.join(offline_directory, self.FILE_NAME))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def request_headers(self, destination: str, url: str) -> typing.Dict[str, str]:
+        """The conditional request headers for the URL archived at destination.
+        These are empty if the page is not archived."""
+        headers = {}
+        entry = self.entries.get(url)
+        if entry is not None and os.path.exists(destination):
+            if entry['etag'] is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified'] is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _is_unchanged(self, destination: str, url: str, text: str, sha256: str) -> bool:
+        if not os.path.exists(destination):
+            return False
+        entry = self.entries.get(url)
+        if entry is not None:
+            return entry['length'] == len(text) and entry['sha256'] == sha256
+        # Archived before there was a manifest.
+        with open_archive_file(destination) as file:
+            return file.read() == text
+
+    def archive(self, destination: str, url: str, response: requests.Response) -> bool:
+        """Writes the page from the response to the archive at destination if it has changed and updates the
+        manifest. Returns True if the page was written."""
+        if response.status_code == 304:
+            logger.info('Not modified URL %s', url)
+            self.not_modified += 1
+            return False
+        text = response.text
+        sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        unchanged = self._is_unchanged(destination, url, text, sha256)
+        self.entries[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'length': len(text),
+            'sha256': sha256,
+        }
+        if unchanged:
+            logger.info('Unchanged URL %s', url)
+            self.unchanged += 1
+            return False
+        with open_archive_file(destination, 'w') as file:
+            file.write(text)
+        self.written += 1
+        return True
+
+
 def archive_thread_offline(
         url_first: str,
         offline_directory: str,
         page_count: int,
         force: bool,
+        refresh: bool = False,
+        compression: typing.Optional[str] = None,
 ) -> typing.Tuple[int, int]:
     """Given a URL of the first page of the thread archive all the pages limited by page_count.
-    If page count is -1 then all pages are downloaded.
+    If page count is -1 then all pages are requested.
     If force is True then all pages are downloaded, if False then only URLs not in the archive are downloaded.
-    This returns the (number of pages, bytes) archived offline."""
+    If refresh is True then the URLs in the archive are requested conditionally using the ArchiveManifest.
+    In all cases a page is only rewritten if its content has changed.
+    compression is None or a key in ARCHIVE_COMPRESSION_EXTENSIONS, the pages are written compressed.
+    This returns the (number of pages, bytes) written to the archive, the bytes are before any compression."""
     logger.info('Archiving thread from URL %s ', url_first)
-    url_count = byte_count = 0
+    # Raises ValueError if the compression is not available.
+    archive_destination(offline_directory, url_first, compression)
+    url_count = byte_count = request_count = 0
     os.makedirs(offline_directory, exist_ok=True)
+    manifest = ArchiveManifest.load(offline_directory)
     # NOTE: We read the first page twice, simplified code and all that.
     all_urls = all_page_urls_from_url(url_first)
     logger.info('Discovered %d URLs from the first page.', len(all_urls))
     for url in all_urls:
-        if page_count != -1 and url_count >= page_count:
+        if page_count != -1 and request_count >= page_count:
             break
-        parsed_url: ParseResult = urlparse(url)
-        destination = os.path.join(offline_directory, os.path.basename(parsed_url.path))
-        if not os.path.exists(destination) or force:
-            text = get_url_text(url)
-            with open(destination, 'w') as file:
-                file.write(text)
-            url_count += 1
-            byte_count += len(text)
+        destination = archive_destination(offline_directory, url, compression)
+        if not os.path.exists(destination) or force or refresh:
+            headers = {} if force else manifest.request_headers(destination, url)
+            response = get_url_response(url, headers)
+            request_count += 1
+            if manifest.archive(destination, url, response):
+                url_count += 1
+                byte_count += len(response.text)
         else:
             logger.info('Ignoring existing URL %s ', url)
-    logger.info('Read a total of %d bytes from URL %s ', byte_count, url_first)
+    manifest.save(offline_directory)
+    logger.info('Read a total of %d bytes from URL %s %s', byte_count, url_first, manifest)
     return url_count, byte_count
 
 
+#: HTTP status codes that are retried by the asynchronous archiver, these are usually transient.
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class HostLimiter:
+    """Politeness limits for a single host, at most concurrency requests at a time and at least interval seconds
+    between the start of each request."""
+
+    def __init__(self, concurrency: int, interval: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._last_start = -float('inf')
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            async with self._lock:
+                delay = self._last_start + self.interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._last_start = time.monotonic()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.semaphore.release()
+
+
+class ThreadSessions:
+    """A pooled requests.Session for each thread that makes a request.
+    requests.Session is not documented as thread safe so each worker thread of an executor has its own Session, with
+    its own connection pool, rather than sharing one. The sessions are closed on exit."""
+
+    def __init__(self, pool_maxsize: int):
+        self.pool_maxsize = pool_maxsize
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions: typing.List[requests.Session] = []
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def session(self) -> requests.Session:
+        """Returns the Session of the current thread, this is created on first use."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """requests.Session.get() with the Session of the current thread."""
+        return self.session().get(url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+
+class AsyncArchiver:
+    """Downloads the pages of a thread concurrently with a pooled requests.Session in each worker thread.
+    The blocking requests are made in a thread pool of size concurrency, each host is limited by a HostLimiter and
+    failed requests are retried with exponential backoff.
+
+    Usage::
+
+        url_count, byte_count = asyncio.run(AsyncArchiver(concurrency=4).archive(url_first, offline_directory))
+    """
+
+    def __init__(
+            self,
+            concurrency: int = 4,
+            per_host: int = 2,
+            interval: float = 0.0,
+            retries: int = 3,
+            backoff: float = 1.0,
+            timeout: float = 60.0,
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.interval = interval
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._host_limiters: typing.Dict[str, HostLimiter] = {}
+        self.request_count = 0
+        self.retry_count = 0
+
+    def _host_limiter(self, url: str) -> HostLimiter:
+        host = urlparse(url).netloc
+        if host not in self._host_limiters:
+            self._host_limiters[host] = HostLimiter(self.per_host, self.interval)
+        return self._host_limiters[host]
+
+    async def get_response(
+            self,
+            sessions: ThreadSessions,
+            executor: concurrent.futures.ThreadPoolExecutor,
+            url: str,
+            headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> requests.Response:
+        """Gets a URL, the equivalent of get_url_response() with retries.
+        The response status is 200 or, for a conditional request, 304 (Not Modified)."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retry_count += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            async with self._host_limiter(url):
+                logger.info('Requesting URL %s', url)
+                self.request_count += 1
+                try:
+                    response = await loop.run_in_executor(
+                        executor, functools.partial(sessions.get, url, headers=headers, timeout=self.timeout)
+                    )
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+                    if attempt == self.retries:
+                        raise ValueError(f'URP request {url} raised: {err}')
+                    logger.warning('URP request %s raised: %s, retrying.', url, err)
+                    continue
+            if response.status_code in (200, 304):
+                return response
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                raise ValueError(f'URP request {url} failed: {response.status_code}')
+            logger.warning('URP request %s failed: %d, retrying.', url, response.status_code)
+        raise ValueError(f'URP request {url} failed after {self.retries} retries.')  # pragma: no cover
+
+    async def archive(
+            self,
+            url_first: str,
+            offline_directory: str,
+            page_count: int = -1,
+            force: bool = False,
+            refresh: bool = False,
+            compression: typing.Optional[str] = None,
+    ) -> typing.Tuple[int, int]:
+        """The asynchronous equivalent of archive_thread_offline().
+        The first page is downloaded once, it is used to discover the URLs and is archived without a second request.
+        This returns the (number of pages, bytes) written to the archive."""
+        logger.info('Archiving thread from URL %s ', url_first)
+        # Raises ValueError if the compression is not available.
+        archive_destination(offline_directory, url_first, compression)
+        os.makedirs(offline_directory, exist_ok=True)
+        manifest = ArchiveManifest.load(offline_directory)
+        with contextlib.ExitStack() as exit_stack:
+            sessions = exit_stack.enter_context(ThreadSessions(pool_maxsize=self.concurrency))
+            executor = exit_stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency))
+            first_response = await self.get_response(sessions, executor, url_first)
+            all_urls = all_page_urls_from_page(url_first, parse_str_to_beautiful_soup(first_response.text))
+            logger.info('Discovered %d URLs from the first page.', len(all_urls))
+            urls = []
+            for url in all_urls:
+                if page_count != -1 and len(urls) >= page_count:
+                    break
+                if not os.path.exists(archive_destination(offline_directory, url, compression)) or force or refresh:
+                    urls.append(url)
+                else:
+                    logger.info('Ignoring existing URL %s ', url)
+            download_semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def archive_url(url: str) -> int:
+                """Returns the number of bytes written."""
+                destination = archive_destination(offline_directory, url, compression)
+                if url == url_first:
+                    response = first_response
+                else:
+                    headers = {} if force else manifest.request_headers(destination, url)
+                    async with download_semaphore:
+                        response = await self.get_response(sessions, executor, url, headers)
+                if manifest.archive(destination, url, response):
+                    return len(response.text)
+                return 0
+
+            byte_counts = await asyncio.gather(*[archive_url(url) for url in urls])
+        manifest.save(offline_directory)
+        byte_count = sum(byte_counts)
+        logger.info(
+            'Read a total of %d bytes from URL %s with %d requests and %d retries %s',
+            byte_count, url_first, self.request_count, self.retry_count, manifest,
+        )
+        return manifest.written, byte_count
+
+
 def main() -> int:  # pragma: no cover
     DEFAULT_OPT_LOG_FORMAT_VERBOSE = (
         '%(asctime)s - %(filename)24s#%(lineno)-4d - %(process)5d - (%(threadName)-10s) - %(levelname)-8s - %(message)s'
@@ -494,6 +1198,53 @@ def main() -> int:  # pragma: no cover
             " [default: %(default)s]"
         )
     )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help=(
+            "Request the URLs that exist in the archive with a conditional request"
+            " and only rewrite the pages that have changed."
+            " [default: %(default)s]"
+        )
+    )
+    parser.add_argument(
+        "--compression",
+        choices=sorted(ARCHIVE_COMPRESSION_EXTENSIONS.keys()),
+        default=None,
+        help=(
+            "Write the pages compressed, these are read transparently by read_whole_thread()."
+            " zstd requires the zstandard package. [default: uncompressed]"
+        )
+    )
+    parser.add_argument(
+        "-j",
+        "--concurrency",
+        type=int,
+        default=0,
+        help=(
+            "Download this number of pages concurrently with a pooled connection."
+            " 0 downloads the pages one at a time. [default: %(default)d]"
+        ),
+    )
+    parser.add_argument(
+        "--per-host",
+        dest="per_host",
+        type=int,
+        default=2,
+        help="With --concurrency the maximum number of concurrent requests to a host. [default: %(default)d]",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="With --concurrency the minimum interval in seconds between requests to a host. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="With --concurrency the number of retries of a failed request, with backoff. [default: %(default)d]",
+    )
     parser.add_argument(
         "-l",
         "--log-level",
@@ -510,7 +1261,17 @@ def main() -> int:  # pragma: no cover
     )
 
     t_start = time.perf_counter()
-    url_count, byte_count = archive_thread_offline(args.url, args.archive, args.url_count, args.force)
+    if args.concurrency > 0:
+        archiver = AsyncArchiver(
+            concurrency=args.concurrency, per_host=args.per_host, interval=args.interval, retries=args.retries,
+        )
+        url_count, byte_count = asyncio.run(
+            archiver.archive(args.url, args.archive, args.url_count, args.force, args.refresh, args.compression)
+        )
+    else:
+        url_count, byte_count = archive_thread_offline(
+            args.url, args.archive, args.url_count, args.force, args.refresh, args.compression
+        )
     t_elapsed = time.perf_counter() - t_start
     logger.info('Read %d URLs and %d bytes in %.3f (s) at %.3f (kb/s)', url_count, byte_count, t_elapsed,
                 byte_count / t_elapsed / 1024)
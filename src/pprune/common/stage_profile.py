@@ -0,0 +1,214 @@
+# MIT License
+#
+# Copyright (c) 2025 Paul Ross https://github.com/paulross
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Records the wall time, CPU time, peak RSS and call count of each stage of a run, for example main.py --profile.
+
+The code marks its stages with::
+
+    with stage_profile.stage('pass_one'):
+        ...
+
+Or a function that is always a stage is decorated with @stage_profile.staged('date parsing').
+These do nothing unless a StageProfiler has been enabled::
+
+    profiler = stage_profile.StageProfiler(pstats_directory='profile')
+    stage_profile.enable(profiler)
+    ...
+    stage_profile.disable()
+    profiler.write_report('profile.json')
+
+Stages can be nested, the times of a stage include the times of any stages nested within it.
+If pstats_directory is given each stage is also profiled with cProfile and written to <stage>.pstats, these exclude
+the nested stages.
+Stages in worker processes, for example read_html with --jobs > 1, are not recorded.
+"""
+import contextlib
+import cProfile
+import dataclasses
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import time
+import typing
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows.
+    resource = None
+
+logger = logging.getLogger(__file__)
+
+#: Version of the report written by StageProfiler.write_report().
+REPORT_VERSION = 1
+
+
+def peak_rss() -> int:
+    """The peak resident set size of this process in bytes, 0 if this is not available."""
+    if resource is None:  # pragma: no cover
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+@dataclasses.dataclass
+class StageRecord:
+    """The accumulated measurements of all the calls of a stage."""
+    name: str
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    # The peak RSS of the process when the stage last finished.
+    peak_rss: int = 0
+    # The total increase in the peak RSS of the process during the calls of this stage.
+    peak_rss_increase: int = 0
+
+
+class StageProfiler:
+    """Accumulates a StageRecord for each stage name in the order that the stages are first entered."""
+
+    def __init__(self, pstats_directory: typing.Optional[str] = None):
+        self.pstats_directory = pstats_directory
+        self.records: typing.Dict[str, StageRecord] = {}
+        # Map of {stage name: cProfile.Profile, ...}, only if pstats_directory is given.
+        self._profiles: typing.Dict[str, cProfile.Profile] = {}
+        # The profiles of the stages that are currently entered, innermost last.
+        self._active_profiles: typing.List[cProfile.Profile] = []
+        self._t_start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> typing.Iterator[StageRecord]:
+        """Measures the enclosed code as a call of the named stage."""
+        record = self.records.get(name)
+        if record is None:
+            record = self.records[name] = StageRecord(name)
+        profile = None
+        if self.pstats_directory is not None:
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = cProfile.Profile()
+            # Only one profiler can be enabled at a time so the outer stage is paused.
+            if self._active_profiles:
+                self._active_profiles[-1].disable()
+            self._active_profiles.append(profile)
+            profile.enable()
+        rss_start = peak_rss()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_time += time.perf_counter() - wall_start
+            record.cpu_time += time.process_time() - cpu_start
+            record.peak_rss = peak_rss()
+            record.peak_rss_increase += record.peak_rss - rss_start
+            record.calls += 1
+            if profile is not None:
+                profile.disable()
+                self._active_profiles.pop()
+                if self._active_profiles:
+                    self._active_profiles[-1].enable()
+
+    def report(self) -> typing.Dict[str, typing.Any]:
+        """The measurements of every stage as a dict that can be written as JSON."""
+        return {
+            'version': REPORT_VERSION,
+            'wall_time': time.perf_counter() - self._t_start,
+            'peak_rss': peak_rss(),
+            'stages': [dataclasses.asdict(record) for record in self.records.values()],
+        }
+
+    def write_report(self, file_path: str) -> None:
+        """Writes the report as JSON."""
+        with open(file_path, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+        logger.info('Wrote stage profile report to %s', file_path)
+
+    def write_pstats(self) -> typing.List[str]:
+        """Writes the cProfile statistics of each stage to <pstats_directory>/<stage>.pstats.
+        These can be read with pstats.Stats(file_path). Returns the list of file paths."""
+        file_paths = []
+        if self.pstats_directory is None:
+            return file_paths
+        os.makedirs(self.pstats_directory, exist_ok=True)
+        for name, profile in self._profiles.items():
+            file_path = os.path.join(self.pstats_directory, re.sub(r'\W+', '_', name) + '.pstats')
+            profile.dump_stats(file_path)
+            file_paths.append(file_path)
+        logger.info('Wrote %d cProfile statistics files to %s', len(file_paths), self.pstats_directory)
+        return file_paths
+
+    def log_report(self, level: int = logging.INFO) -> None:
+        """Logs a table of the stages."""
+        logger.log(
+            level, '%-24s %8s %12s %12s %12s %12s',
+            'Stage', 'Calls', 'Wall (s)', 'CPU (s)', 'Peak RSS', 'RSS +',
+        )
+        for record in self.records.values():
+            logger.log(
+                level, '%-24s %8d %12.3f %12.3f %10.1fMB %10.1fMB',
+                record.name, record.calls, record.wall_time, record.cpu_time,
+                record.peak_rss / 1024 ** 2, record.peak_rss_increase / 1024 ** 2,
+            )
+
+
+#: The enabled StageProfiler, if any.
+_profiler: typing.Optional[StageProfiler] = None
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def enable(profiler: StageProfiler) -> None:
+    """Records the stages with this profiler until disable() is called."""
+    global _profiler
+    _profiler = profiler
+
+
+def disable() -> None:
+    global _profiler
+    _profiler = None
+
+
+def stage(name: str) -> typing.ContextManager:
+    """Measures the enclosed code as a call of the named stage if a profiler is enabled, otherwise this does nothing."""
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name)
+
+
+def staged(name: str) -> typing.Callable[[typing.Callable], typing.Callable]:
+    """Decorator that measures every call of the function as a call of the named stage, see stage()."""
+
+    def decorator(function: typing.Callable) -> typing.Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with _profiler.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,375 @@
+# MIT License
+#
+# Copyright (c) 2025 Paul Ross https://github.com/paulross
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+A SQLite database of a parsed thread with a full text search index.
+
+The database has the posts, users, likes and, optionally, the subjects of each post from write_html.pass_one().
+The text of each post without any quoted message is indexed with FTS5 so that ad-hoc questions can be answered without
+re-reading the archived HTML, for example::
+
+    python src/pprune/common/thread_db.py AI171.sqlite 'RAT' --after 2025-07-12
+
+read_thread() rebuilds a Thread from the database, the text of each post is read from the database so the post HTML is
+only parsed if it is needed, for example when writing the HTML pages.
+"""
+import argparse
+import dataclasses
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import typing
+
+import pprune.common.log_config
+import pprune.common.thread_struct
+
+logger = logging.getLogger(__file__)
+
+#: Increment this if the schema changes, read_thread() rejects databases with a different version.
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY,
+    href TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (href, name)
+);
+CREATE TABLE posts (
+    post_index INTEGER PRIMARY KEY,
+    sequence_num INTEGER NOT NULL,
+    permalink TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL REFERENCES users (user_id),
+    timestamp TEXT,
+    html TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    text TEXT NOT NULL,
+    text_stripped_without_quoted_message TEXT NOT NULL
+);
+CREATE INDEX posts_user_id ON posts (user_id);
+CREATE INDEX posts_timestamp ON posts (timestamp);
+CREATE TABLE likes (
+    post_index INTEGER NOT NULL REFERENCES posts (post_index),
+    position INTEGER NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users (user_id),
+    PRIMARY KEY (post_index, position)
+);
+CREATE TABLE subjects (
+    post_index INTEGER NOT NULL REFERENCES posts (post_index),
+    subject TEXT NOT NULL,
+    PRIMARY KEY (post_index, subject)
+);
+CREATE INDEX subjects_subject ON subjects (subject);
+CREATE VIRTUAL TABLE posts_fts USING fts5(
+    text_stripped_without_quoted_message,
+    content='posts',
+    content_rowid='post_index'
+);
+"""
+
+
+def _timestamp_to_text(timestamp: typing.Optional[datetime.datetime]) -> typing.Optional[str]:
+    if timestamp is None:
+        return None
+    return timestamp.isoformat()
+
+
+def _timestamp_from_text(text: typing.Optional[str]) -> typing.Optional[datetime.datetime]:
+    if text is None:
+        return None
+    return datetime.datetime.fromisoformat(text)
+
+
+def write_thread(
+        database_path: str,
+        thread: pprune.common.thread_struct.Thread,
+        post_subject_map: typing.Optional[typing.Dict[int, typing.Set[str]]] = None,
+) -> None:
+    """Writes the thread to a new SQLite database, replacing any existing database.
+    post_subject_map is optional, it is a map of {post_sequence_number: {subject, ...}, ...} such as
+    write_html.PassOneResult.post_subject_map.
+    The database is written atomically so that an interrupted run can not leave a partial database."""
+    logger.info('Writing %d posts to %s', len(thread), database_path)
+    t_start = time.perf_counter()
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(database_path)), suffix='.tmp'
+    )
+    os.close(file_descriptor)
+    try:
+        connection = sqlite3.connect(temp_path)
+        try:
+            _write_thread(connection, thread, post_subject_map)
+        finally:
+            connection.close()
+        os.replace(temp_path, database_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    logger.info('Wrote %d posts to %s in %.3f (s)', len(thread), database_path, time.perf_counter() - t_start)
+
+
+def _write_thread(
+        connection: sqlite3.Connection,
+        thread: pprune.common.thread_struct.Thread,
+        post_subject_map: typing.Optional[typing.Dict[int, typing.Set[str]]],
+) -> None:
+    with connection:
+        connection.executescript(SCHEMA)
+        connection.execute("INSERT INTO metadata VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        # Map of {User: user_id, ...}
+        user_ids: typing.Dict[pprune.common.thread_struct.User, int] = {}
+
+        def user_id(user: pprune.common.thread_struct.User) -> int:
+            if user not in user_ids:
+                user_ids[user] = len(user_ids)
+                connection.execute('INSERT INTO users VALUES (?, ?, ?)', (user_ids[user], user.href, user.name))
+            return user_ids[user]
+
+        for post_index, post in enumerate(thread.posts):
+            connection.execute(
+                'INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    post_index,
+                    post.sequence_num,
+                    post.permalink,
+                    user_id(post.user),
+                    _timestamp_to_text(post.timestamp),
+                    str(post.node),
+                    post.subject,
+                    post.text,
+                    post.text_stripped_without_quoted_message,
+                ),
+            )
+            connection.executemany(
+                'INSERT INTO likes VALUES (?, ?, ?)',
+                [(post_index, position, user_id(user)) for position, user in enumerate(post.liked_by_users)],
+            )
+            if post_subject_map is not None:
+                connection.executemany(
+                    'INSERT INTO subjects VALUES (?, ?)',
+                    [(post_index, subject) for subject in sorted(post_subject_map.get(post.sequence_num, ()))],
+                )
+        connection.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def connect(database_path: str) -> sqlite3.Connection:
+    """Opens an existing database, raises ValueError if it does not exist or has a different schema version."""
+    if not os.path.exists(database_path):
+        raise ValueError(f'Database {database_path} does not exist.')
+    connection = sqlite3.connect(database_path)
+    try:
+        row = connection.execute("SELECT value FROM metadata WHERE key = 'schema_version'").fetchone()
+    except sqlite3.DatabaseError as err:
+        connection.close()
+        raise ValueError(f'Database {database_path} is not a thread database: {err}')
+    if row is None or int(row[0]) != SCHEMA_VERSION:
+        connection.close()
+        raise ValueError(f'Database {database_path} schema version {row} is not {SCHEMA_VERSION}')
+    return connection
+
+
+def read_thread(database_path: str) -> pprune.common.thread_struct.Thread:
+    """Rebuilds a Thread from the database.
+    The post nodes are SerialisedNode objects and the text of each post is taken from the database."""
+    logger.info('Reading thread from %s', database_path)
+    t_start = time.perf_counter()
+    connection = connect(database_path)
+    try:
+        users = {
+            user_id: pprune.common.thread_struct.User(href, name)
+            for user_id, href, name in connection.execute('SELECT user_id, href, name FROM users')
+        }
+        # Map of {post_index: [User, ...], ...}
+        likes: typing.Dict[int, typing.List[pprune.common.thread_struct.User]] = {}
+        for post_index, user_id in connection.execute(
+                'SELECT post_index, user_id FROM likes ORDER BY post_index, position'
+        ):
+            likes.setdefault(post_index, []).append(users[user_id])
+        thread = pprune.common.thread_struct.Thread()
+        for (
+                post_index, sequence_num, permalink, user_id, timestamp, html, subject, text,
+                text_stripped_without_quoted_message,
+        ) in connection.execute(
+            'SELECT post_index, sequence_num, permalink, user_id, timestamp, html, subject, text,'
+            ' text_stripped_without_quoted_message FROM posts ORDER BY post_index'
+        ):
+            post = pprune.common.thread_struct.Post(
+                _timestamp_from_text(timestamp),
+                permalink,
+                users[user_id],
+                pprune.common.thread_struct.SerialisedNode(html),
+                sequence_num,
+                likes.get(post_index, []),
+            )
+            post.prime_cache(
+                subject=subject,
+                text=text,
+                text_stripped_without_quoted_message=text_stripped_without_quoted_message,
+            )
+            thread.add_post(post)
+    finally:
+        connection.close()
+    logger.info('Read %d posts from %s in %.3f (s)', len(thread), database_path, time.perf_counter() - t_start)
+    return thread
+
+
+def read_post_subject_map(database_path: str) -> typing.Dict[int, typing.Set[str]]:
+    """Returns the map of {post_sequence_number: {subject, ...}, ...} that was given to write_thread().
+    Posts with no subjects are included with an empty set."""
+    connection = connect(database_path)
+    try:
+        post_subject_map: typing.Dict[int, typing.Set[str]] = {
+            sequence_num: set() for (sequence_num,) in connection.execute('SELECT sequence_num FROM posts')
+        }
+        for sequence_num, subject in connection.execute(
+                'SELECT posts.sequence_num, subjects.subject FROM subjects'
+                ' JOIN posts ON posts.post_index = subjects.post_index'
+        ):
+            post_subject_map[sequence_num].add(subject)
+    finally:
+        connection.close()
+    return post_subject_map
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchResult:
+    """A post that matches a search."""
+    post_index: int
+    sequence_num: int
+    permalink: str
+    user_name: str
+    timestamp: typing.Optional[datetime.datetime]
+    snippet: str
+
+
+def search(
+        connection: sqlite3.Connection,
+        query: str,
+        subject: typing.Optional[str] = None,
+        user_name: typing.Optional[str] = None,
+        after: typing.Optional[datetime.datetime] = None,
+        before: typing.Optional[datetime.datetime] = None,
+        limit: int = -1,
+        rank: bool = False,
+) -> typing.List[SearchResult]:
+    """Search the text of the posts without quoted messages.
+    query is a FTS5 query, for example 'RAT' or '"fuel cutoff" OR "fuel switches"'.
+    The results can be limited to a subject, a user name and a time range, after is inclusive and before is exclusive.
+    The results are in post order unless rank is True when the best matches are first."""
+    sql = [
+        'SELECT posts.post_index, posts.sequence_num, posts.permalink, users.name, posts.timestamp,'
+        " snippet(posts_fts, 0, '[', ']', '...', 16)"
+        ' FROM posts_fts'
+        ' JOIN posts ON posts.post_index = posts_fts.rowid'
+        ' JOIN users ON users.user_id = posts.user_id'
+        ' WHERE posts_fts MATCH ?'
+    ]
+    parameters: typing.List[typing.Any] = [query]
+    if subject is not None:
+        sql.append(' AND posts.post_index IN (SELECT post_index FROM subjects WHERE subject = ?)')
+        parameters.append(subject)
+    if user_name is not None:
+        sql.append(' AND users.name = ?')
+        parameters.append(user_name)
+    if after is not None:
+        sql.append(' AND posts.timestamp >= ?')
+        parameters.append(_timestamp_to_text(after))
+    if before is not None:
+        sql.append(' AND posts.timestamp < ?')
+        parameters.append(_timestamp_to_text(before))
+    sql.append(' ORDER BY rank' if rank else ' ORDER BY posts.post_index')
+    sql.append(' LIMIT ?')
+    parameters.append(limit)
+    try:
+        rows = connection.execute(''.join(sql), parameters).fetchall()
+    except sqlite3.OperationalError as err:
+        raise ValueError(f'Can not search for "{query}": {err}')
+    return [
+        SearchResult(post_index, sequence_num, permalink, name, _timestamp_from_text(timestamp), snippet)
+        for post_index, sequence_num, permalink, name, timestamp, snippet in rows
+    ]
+
+
+def main() -> int:  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Search a thread database written by thread_db.write_thread().')
+    parser.add_argument('database', type=str, help='Path to the SQLite database.')
+    parser.add_argument(
+        'query',
+        type=str,
+        help='FTS5 query, for example \'RAT\' or \'"fuel cutoff" OR "fuel switches"\'.',
+    )
+    parser.add_argument("--subject", type=str, default=None, help="Only posts on this subject.")
+    parser.add_argument("--user", type=str, default=None, help="Only posts by this user name.")
+    parser.add_argument(
+        "--after",
+        type=datetime.datetime.fromisoformat,
+        default=None,
+        help="Only posts at or after this ISO date/time, for example 2025-07-12.",
+    )
+    parser.add_argument(
+        "--before",
+        type=datetime.datetime.fromisoformat,
+        default=None,
+        help="Only posts before this ISO date/time, for example 2025-07-12T08:00.",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=-1, help="Maximum number of results, -1 is all. [default: %(default)d]",
+    )
+    parser.add_argument("--rank", action="store_true", help="Order by relevance rather than by post order.")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        dest="log_level",
+        type=int,
+        default=30,
+        help="Log level. [default: %(default)d]",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=args.log_level,
+        format=pprune.common.log_config.DEFAULT_OPT_LOG_FORMAT_NO_PROCESS,
+        stream=sys.stdout,
+    )
+    connection = connect(args.database)
+    try:
+        results = search(
+            connection, args.query, subject=args.subject, user_name=args.user, after=args.after,
+            before=args.before, limit=args.limit, rank=args.rank,
+        )
+    finally:
+        connection.close()
+    for result in results:
+        print(f'{result.timestamp} {result.user_name} {result.permalink}')
+        print(f'    {result.snippet}')
+    print(f'Found {len(results)} posts.')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
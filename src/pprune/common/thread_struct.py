@@ -1,11 +1,15 @@
+import array
+import collections
 import dataclasses
 import datetime
+import functools
 import re
 import string
 import typing
 import urllib.parse
 
 import bs4
+import numpy as np
 
 # Matches 'http://www.pprune.org/tech-log/423988-concorde-question.html#post5866333'
 # Gives one group: ('5866333',)
@@ -71,13 +75,74 @@ def text_without_quoted_message(node: bs4.element.Tag, texts: typing.List[str])
             text_without_quoted_message(child, texts)
 
 
+class SerialisedNode:
+    """Holds a post content node as serialised HTML, this is parsed with BeautifulSoup when first needed.
+
+    This is much smaller than a node that is still part of the parse tree of the whole page.
+    Attribute access is delegated to the parsed node so this can be used as ``Post.node``.
+    release() discards the parsed node, it will be parsed again if needed.
+    Pickling only preserves the HTML.
+    """
+    __slots__ = ('html', '_node')
+
+    def __init__(self, html: str):
+        self.html = html
+        self._node: typing.Optional[bs4.element.Tag] = None
+
+    @property
+    def node(self) -> bs4.element.Tag:
+        """The parsed node."""
+        if self._node is None:
+            self._node = bs4.BeautifulSoup(self.html, 'html.parser').find(True)
+        return self._node
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._node is not None
+
+    def release(self) -> None:
+        """Discard the parsed node to save memory."""
+        self._node = None
+
+    def __getattr__(self, name: str) -> typing.Any:
+        if name in SerialisedNode.__slots__:
+            # Not initialised, for example during unpickling.
+            raise AttributeError(name)
+        return getattr(self.node, name)
+
+    def __str__(self) -> str:
+        return self.html
+
+    def __repr__(self) -> str:
+        return f'SerialisedNode(<{len(self.html)} characters>, parsed={self.is_parsed})'
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SerialisedNode):
+            return self.html == other.html
+        return self.node == other
+
+    def __hash__(self) -> int:
+        return hash(self.html)
+
+    def __getstate__(self) -> str:
+        return self.html
+
+    def __setstate__(self, state: str) -> None:
+        self.html = state
+        self._node = None
+
+
 @dataclasses.dataclass
 class Post:
-    """Represents a single post in a thread."""
+    """Represents a single post in a thread.
+    node is either a BeautifulSoup node or a SerialisedNode that behaves like one.
+
+    The text and words extracted from the node are computed once and cached, the cached lists must not be modified.
+    If the node or sequence number is changed then call invalidate_cache()."""
     timestamp: datetime.datetime
     permalink: str
     user: User
-    node: bs4.element.Tag
+    node: typing.Union[bs4.element.Tag, SerialisedNode]
     sequence_num: int
     liked_by_users: typing.List[User]
 
@@ -115,7 +180,21 @@ class Post:
             # f' Text: {self.text}'
         )
 
-    @property
+    def invalidate_cache(self) -> None:
+        """Discard the cached text and words, they will be re-computed from the node when next needed."""
+        for name, value in vars(type(self)).items():
+            if isinstance(value, functools.cached_property):
+                self.__dict__.pop(name, None)
+
+    def prime_cache(self, **values: typing.Any) -> None:
+        """Sets cached values, for example the text read from a database, so that they are not computed from the node.
+        The names must be cached properties such as text."""
+        for name, value in values.items():
+            if not isinstance(vars(type(self)).get(name), functools.cached_property):
+                raise AttributeError(f'{name} is not a cached property of Post')
+            self.__dict__[name] = value
+
+    @functools.cached_property
     def subject(self) -> str:
         """Look for ``<div class="smallfont">`` in::
 
@@ -141,7 +220,7 @@ class Post:
             return subject_node.get_text()
         return ''
 
-    @property
+    @functools.cached_property
     def text(self) -> str:
         """The text in the node, this does not include the subject line.
         From:
@@ -152,7 +231,7 @@ class Post:
             raise RuntimeError(f'No text node for post {self.sequence_num}')
         return text_node.get_text()
 
-    @property
+    @functools.cached_property
     def text_stripped(self) -> str:
         """The text in the node with blank lines and pre/post whitespace removed.
         Inter-word spaces are maintained."""
@@ -163,7 +242,7 @@ class Post:
                 ret.append(line)
         return '\n'.join(ret)
 
-    @property
+    @functools.cached_property
     def text_stripped_without_quoted_message(self) -> str:
         post_node = self.node.find('div', **{'id': f'post_message_{self.sequence_num}'})
         texts = []
@@ -171,11 +250,21 @@ class Post:
             text_without_quoted_message(post_node, texts)
         return ' '.join(texts)
 
-    @property
+    @functools.cached_property
     def words(self) -> typing.List[str]:
         txt = self.text_stripped.translate(PUNCTUATION_TABLE)
         return txt.split()
 
+    @functools.cached_property
+    def _words_lower(self) -> typing.List[str]:
+        """The words all in lower case."""
+        return [w.lower() for w in self.words]
+
+    @functools.cached_property
+    def _words_lower_except_caps(self) -> typing.List[str]:
+        """The words in lower case except for words that are all upper case."""
+        return [w if w.upper() == w else w_lower for w, w_lower in zip(self.words, self._words_lower)]
+
     @property
     def post_number(self) -> typing.Optional[int]:
         m = RE_PERMALINK_TO_POST_NUMBER.match(self.permalink)
@@ -186,13 +275,8 @@ class Post:
         """Return the words in the post having removed all specified words and made lower case if required.
         Upper case words are maintained regardless of the lower_case flag.
         NOTE: The case of remove_these must match lower_case if that it to be effective."""
-        result = []
-        for w in self.words:
-            if lower_case and w.upper() != w:
-                w = w.lower()
-            if w not in remove_these:
-                result.append(w)
-        return result
+        words = self._words_lower_except_caps if lower_case else self.words
+        return [w for w in words if w not in remove_these]
 
     def cap_words(self, min_size: int) -> typing.List[str]:
         """Return the words in the post that are all capitals with a minimum size."""
@@ -206,11 +290,7 @@ class Post:
         """Return the 'significant' words in the post.
         Ignore a word (lowercase) in remove_these.
         Maintain words that are all uppercase."""
-        result = []
-        for w in self.words:
-            if w.lower() not in remove_these:  # or w.upper() == w:
-                result.append(w)
-        return result
+        return [w for w, w_lower in zip(self.words, self._words_lower) if w_lower not in remove_these]
 
     def href_pairs(self) -> typing.List[typing.Tuple[urllib.parse.ParseResult, str]]:
         """Return a list of links and their text.
@@ -231,6 +311,157 @@ class Post:
         return ret
 
 
+class Vocabulary:
+    """Interns words as integer token IDs.
+    For each token ID this also records the token ID of the lower case word and whether the word is all upper case.
+    """
+
+    def __init__(self):
+        # Indexed by token ID.
+        self.words: typing.List[str] = []
+        # Map of {word : token_id, ...}
+        self.word_ids: typing.Dict[str, int] = {}
+        # Indexed by token ID, the token ID of word.lower().
+        self.lower_ids = array.array('I')
+        # Indexed by token ID, 1 if word.upper() == word.
+        self.all_caps = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_ids
+
+    def get_id(self, word: str) -> typing.Optional[int]:
+        """Returns the token ID of the word or None if the word is not in the vocabulary."""
+        return self.word_ids.get(word)
+
+    def intern(self, word: str) -> int:
+        """Returns the token ID of the word, adding it to the vocabulary if necessary."""
+        token_id = self.word_ids.get(word)
+        if token_id is None:
+            token_id = len(self.words)
+            self.words.append(word)
+            self.word_ids[word] = token_id
+            self.lower_ids.append(token_id)
+            self.all_caps.append(word.upper() == word)
+            word_lower = word.lower()
+            if word_lower != word:
+                self.lower_ids[token_id] = self.intern(word_lower)
+        return token_id
+
+    def encode(self, words: typing.Iterable[str]) -> array.array:
+        """Returns the words as an array of token IDs."""
+        return array.array('I', map(self.intern, words))
+
+    def decode(self, token_ids: typing.Iterable[int]) -> typing.List[str]:
+        """Returns the words from the token IDs."""
+        return [self.words[token_id] for token_id in token_ids]
+
+    def ids_where(self, predicate: typing.Callable[[str], bool]) -> bytearray:
+        """Returns a bytearray indexed by token ID that is 1 where predicate(word) is True.
+        This means that predicate is called once per distinct word rather than once per word in the thread."""
+        return bytearray(bool(predicate(word)) for word in self.words)
+
+
+class EncodedThread:
+    """The words of every post in a thread as token IDs, post_token_ids is in the same order as Thread.posts."""
+
+    def __init__(self):
+        self.vocabulary = Vocabulary()
+        self.post_token_ids: typing.List[array.array] = []
+        # Count of every token ID in the thread in the order of first appearance.
+        # This ordering means that most_common() orders ties in the same way as counting the words directly.
+        self.token_counts: typing.Counter[int] = collections.Counter()
+        # The last argument to and result of filtered().
+        self._filtered_key: typing.Optional[bytes] = None
+        self._filtered: typing.List[typing.List[int]] = []
+
+    def add_words(self, words: typing.Iterable[str]) -> None:
+        """Add the words of the next post."""
+        token_ids = self.vocabulary.encode(words)
+        self.post_token_ids.append(token_ids)
+        self.token_counts.update(token_ids)
+        self._filtered_key = None
+
+    def filtered(self, keep: bytearray) -> typing.List[typing.List[int]]:
+        """Returns the token IDs of each post where keep[token_id] is set, see Vocabulary.ids_where().
+        The last result is cached as the same filter is often used repeatedly, for example for different phrase
+        lengths. The result must not be modified."""
+        key = bytes(keep)
+        if key != self._filtered_key:
+            self._filtered = [
+                [token_id for token_id in token_ids if keep[token_id]] for token_ids in self.post_token_ids
+            ]
+            self._filtered_key = key
+        return self._filtered
+
+
+class ThreadColumns:
+    """The posts of a thread as NumPy arrays for aggregating likes, users and timestamps without a Python loop.
+    The per post arrays are in the same order as Thread.posts.
+
+    users has every user that posted, in the order of their first post, followed by the users that only liked posts,
+    in the order of their first like. This means that stable sorts of the aggregates order ties in the same way as
+    a collections.Counter of the posts."""
+
+    def __init__(self, posts: typing.Sequence[Post]):
+        # Indexed by user code.
+        self.users: typing.List[User] = []
+        # Map of {User : user_code, ...}
+        self.user_codes: typing.Dict[User, int] = {}
+        for post in posts:
+            self._intern(post.user)
+        # Users with a code less than this have posted.
+        self.poster_count = len(self.users)
+        self.post_user_codes = np.array([self.user_codes[post.user] for post in posts], dtype=np.int32)
+        # Timestamps to the second, NaT if the post has no timestamp.
+        self.timestamps = np.array(
+            [np.datetime64('NaT') if post.timestamp is None else post.timestamp for post in posts],
+            dtype='datetime64[s]',
+        )
+        self.sequence_nums = np.array([post.sequence_num for post in posts], dtype=np.int64)
+        self.like_counts = np.array([len(post.liked_by_users) for post in posts], dtype=np.int32)
+        # The user code of every like in post order and, within a post, in the order of Post.liked_by_users.
+        self.like_user_codes = np.array(
+            [self._intern(user) for post in posts for user in post.liked_by_users], dtype=np.int32
+        )
+
+    def __len__(self) -> int:
+        return len(self.post_user_codes)
+
+    def _intern(self, user: User) -> int:
+        user_code = self.user_codes.get(user)
+        if user_code is None:
+            user_code = len(self.users)
+            self.users.append(user)
+            self.user_codes[user] = user_code
+        return user_code
+
+    def post_counts(self) -> np.ndarray:
+        """The number of posts by each user, indexed by user code, for the users that have posted."""
+        return np.bincount(self.post_user_codes, minlength=self.poster_count)
+
+    def likes_received(self) -> np.ndarray:
+        """The total likes on the posts of each user, indexed by user code, for the users that have posted."""
+        return np.bincount(self.post_user_codes, weights=self.like_counts, minlength=self.poster_count).astype(np.int64)
+
+    def likes_given(self) -> np.ndarray:
+        """The number of likes given by each user, indexed by user code, for all users."""
+        return np.bincount(self.like_user_codes, minlength=len(self.users))
+
+    def most_liked_post_ordinals(self) -> np.ndarray:
+        """The ordinals of the posts that have any likes, the most liked first, ties in post order."""
+        liked = np.flatnonzero(self.like_counts)
+        return liked[np.argsort(-self.like_counts[liked], kind='stable')]
+
+    def most_likes_given(self) -> np.ndarray:
+        """The codes of the users that have liked a post, most likes first, ties in the order of their first like."""
+        user_codes, first_likes = np.unique(self.like_user_codes, return_index=True)
+        likes_given = self.likes_given()[user_codes]
+        return user_codes[np.lexsort((first_likes, -likes_given))]
+
+
 class Thread:
     """Represents a thread of ordered posts with some internal indexing."""
 
@@ -241,6 +472,10 @@ class Thread:
         self.post_map: typing.Dict[str, int] = {}
         # Map of {User : [post_ordinal, ...], ...}
         self.user_post_indexes: typing.Dict[User, typing.List[int]] = {}
+        # Created on demand by encoded().
+        self._encoded: typing.Optional[EncodedThread] = None
+        # Created on demand by columns().
+        self._columns: typing.Optional[ThreadColumns] = None
 
     def __len__(self) -> int:
         return len(self.posts)
@@ -252,6 +487,8 @@ class Thread:
         """Sorts the posts by their sequence number.
         This is useful when combining multiple threads and you want to keep the posts in time order."""
         self.posts.sort(key=lambda p: p.sequence_num)
+        self._encoded = None
+        self._columns = None
 
     def add_post(self, post: Post):
         """Add a post."""
@@ -262,6 +499,25 @@ class Thread:
             self.user_post_indexes[post.user] = []
         self.user_post_indexes[post.user].append(len(self.posts))
         self.posts.append(post)
+        if self._encoded is not None:
+            self._encoded.add_words(post.words)
+        self._columns = None
+
+    def encoded(self) -> EncodedThread:
+        """Returns the words of every post as token IDs.
+        This is created once and then kept up to date by add_post()."""
+        if self._encoded is None:
+            self._encoded = EncodedThread()
+            for post in self.posts:
+                self._encoded.add_words(post.words)
+        return self._encoded
+
+    def columns(self) -> ThreadColumns:
+        """Returns the posts as NumPy arrays.
+        This is created once and discarded by add_post() and sort_by_sequence_number()."""
+        if self._columns is None:
+            self._columns = ThreadColumns(self.posts)
+        return self._columns
 
     @property
     def all_users(self) -> typing.Set[User]:
@@ -35,7 +35,10 @@ import time
 from pprune import publication_maps
 from pprune import write_html
 from pprune.common import log_config
+from pprune.common import post_cache
 from pprune.common import read_html
+from pprune.common import stage_profile
+from pprune.common import thread_db
 from pprune.common import thread_struct
 from pprune.common import words
 
@@ -84,6 +87,63 @@ def main():
             "Add posts by author."
         )
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=sorted(read_html.POST_RECORD_ENGINES),
+        default='bs4',
+        help="The engine used to extract posts from the archive pages, lxml is faster. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default='',
+        help=(
+            "Directory of the cache of posts read from the archive pages."
+            " Pages that have not changed since the last run are not parsed again."
+            " If absent no cache is used. [default: %(default)s]"
+        ),
+    )
+    parser.add_argument(
+        "--database",
+        type=str,
+        default='',
+        help=(
+            "Path of a SQLite database to export the thread to with a full text index of the posts."
+            " This can be searched with pprune/common/thread_db.py."
+            " If absent no database is written. [default: %(default)s]"
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the archive pages and to write the HTML pages. [default: %(default)d]",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Log the wall time, CPU time, peak RSS and number of calls of each stage of the run."
+            " Stages in worker processes, with --jobs > 1, are not recorded. [default: %(default)s]"
+        ),
+    )
+    parser.add_argument(
+        "--profile-json",
+        type=str,
+        default='',
+        help="Path to write the stage profile to as JSON, this implies --profile. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        type=str,
+        default='',
+        help=(
+            "Directory to write the cProfile statistics of each stage to as <stage>.pstats,"
+            " this implies --profile. [default: %(default)s]"
+        ),
+    )
     parser.add_argument(
         "-l",
         "--log-level",
@@ -101,16 +161,24 @@ def main():
 
     os.makedirs(args.output, exist_ok=True)
 
+    profiler = None
+    if args.profile or args.profile_json or args.profile_pstats:
+        profiler = stage_profile.StageProfiler(pstats_directory=args.profile_pstats or None)
+        stage_profile.enable(profiler)
     t_start = time.perf_counter()
+    cache = post_cache.PostRecordCache(args.cache_dir) if args.cache_dir else None
     thread = thread_struct.Thread()
-    for archive in args.archives:
-        read_html.update_whole_thread(archive, thread)
-    thread.sort_by_sequence_number()
+    with stage_profile.stage('read thread'):
+        for archive in args.archives:
+            read_html.update_whole_thread(archive, thread, jobs=args.jobs, engine=args.engine, cache=cache)
+        thread.sort_by_sequence_number()
     word_count = 0
-    for post in thread.posts:
-        word_count += len(post.words)
+    with stage_profile.stage('post words'):
+        for post in thread.posts:
+            word_count += len(post.words)
     logger.info('Number of posts: {:d} Number of words: {:d}'.format(len(thread), word_count))
-    common_words = words.read_common_words_file(args.common_words)
+    with stage_profile.stage('common words'):
+        common_words = words.read_common_words_file(args.common_words)
     logger.info('Read: {:d} common words from "{:s}" to "{:s}".'.format(
         len(common_words), common_words[0], common_words[-1],
     )
@@ -122,18 +190,28 @@ def main():
         words_required = pub_map.get_set_of_words_required()
         common_words -= words_required
         logger.info('Common words now length {:d}'.format(len(common_words)))
-        write_html.write_whole_thread(thread, common_words, pub_map, args.output)
+        pass_one_result = write_html.write_whole_thread(thread, common_words, pub_map, args.output, jobs=args.jobs)
     elif args.thread_name == 'AI171':
         pub_map = publication_maps.AirIndia171()
         words_required = pub_map.get_set_of_words_required()
         common_words -= words_required
         logger.info('Common words now length {:d}'.format(len(common_words)))
-        write_html.write_whole_thread(thread, common_words, pub_map, args.output)
+        pass_one_result = write_html.write_whole_thread(thread, common_words, pub_map, args.output, jobs=args.jobs)
     else:
         logger.error(f'Do not know thread {args.thread_name}')
+        stage_profile.disable()
         return -1
+    if args.database:
+        with stage_profile.stage('database'):
+            thread_db.write_thread(args.database, thread, pass_one_result.post_subject_map)
     t_elapsed = time.perf_counter() - t_start
     logger.info('Processed %d posts in %.3f (s)', len(thread), t_elapsed, )
+    if profiler is not None:
+        stage_profile.disable()
+        profiler.log_report()
+        if args.profile_json:
+            profiler.write_report(args.profile_json)
+        profiler.write_pstats()
     print('Bye, bye!')
     return 0
 
@@ -34,6 +34,7 @@ __version__ = '0.0.1'
 __rights__ = 'Copyright (c) 2017 Paul Ross'
 
 import abc
+import types
 import typing
 
 
@@ -124,6 +125,126 @@ class PublicationMap(abc.ABC):
         """The minimum number of posts a user has mad to get a page with all their posts."""
         pass
 
+    def get_duplicate_subjects_closure(self, subject: str) -> typing.Set[str]:
+        """The transitive closure of get_duplicate_subjects().
+        For example if "A" duplicates to "B" and "B" duplicates to "C" then this returns {"B", "C"} for "A"."""
+        result = set()
+        stack = [subject]
+        while stack:
+            for duplicate_subject in self.get_duplicate_subjects(stack.pop()):
+                if duplicate_subject not in result:
+                    result.add(duplicate_subject)
+                    stack.append(duplicate_subject)
+        result.discard(subject)
+        return result
+
+    def frozen(self) -> 'FrozenPublicationMap':
+        """Returns a FrozenPublicationMap of this map, this is created on the first call.
+        The publication map must not be changed after this."""
+        frozen = getattr(self, '_frozen', None)
+        if frozen is None:
+            frozen = FrozenPublicationMap(self)
+            self._frozen = frozen
+        return frozen
+
+
+class FrozenPublicationMap(PublicationMap):
+    """A read only view of a PublicationMap where every result is computed once.
+    The maps are read only mappings and the sets are frozensets.
+    This also computes the transitive closure of the duplicate subjects for all the subject titles."""
+
+    def __init__(self, publication_map: PublicationMap):
+        self._title = publication_map.get_title()
+        self._introduction_in_html = publication_map.get_introduction_in_html()
+        self._lowercase_word_to_subject_map = types.MappingProxyType(
+            dict(publication_map.get_lowercase_word_to_subject_map())
+        )
+        self._uppercase_word_to_subject_map = types.MappingProxyType(
+            dict(publication_map.get_uppercase_word_to_subject_map())
+        )
+        self._phrase_lengths = list(publication_map.get_phrase_lengths())
+        self._phrases_to_subject_maps = {
+            phrase_length: types.MappingProxyType(dict(publication_map.get_phrases_to_subject_map(phrase_length)))
+            for phrase_length in self._phrase_lengths
+        }
+        self._specific_posts_to_subject_map = types.MappingProxyType(
+            dict(publication_map.get_specific_posts_to_subject_map())
+        )
+        self._all_subject_titles = frozenset(publication_map.get_all_subject_titles())
+        self._significant_posts_permalinks = frozenset(publication_map.get_significant_posts_permalinks())
+        self._set_of_words_required = frozenset(publication_map.get_set_of_words_required())
+        self._number_of_top_authors = publication_map.get_number_of_top_authors()
+        self._upvoted_post_count_limit = publication_map.get_upvoted_post_count_limit()
+        self._upvoted_post_text_limit = publication_map.get_upvoted_post_text_limit()
+        self._minimum_number_username_posts = publication_map.get_minimum_number_username_posts()
+        # Map of {subject : frozenset(subject), ...} for the direct duplicates and their transitive closure.
+        # get_duplicate_subjects() only has to be defined for subjects in the maps but other subjects are added on
+        # demand.
+        self._publication_map = publication_map
+        self._duplicate_subjects: typing.Dict[str, typing.FrozenSet[str]] = {}
+        self._duplicate_subjects_closure: typing.Dict[str, typing.FrozenSet[str]] = {}
+        for subject in self._all_subject_titles:
+            self.get_duplicate_subjects_closure(subject)
+
+    def get_title(self) -> str:
+        return self._title
+
+    def get_introduction_in_html(self) -> str:
+        return self._introduction_in_html
+
+    def get_lowercase_word_to_subject_map(self) -> typing.Mapping[str, str]:
+        return self._lowercase_word_to_subject_map
+
+    def get_uppercase_word_to_subject_map(self) -> typing.Mapping[str, str]:
+        return self._uppercase_word_to_subject_map
+
+    def get_phrase_lengths(self) -> typing.List[int]:
+        return list(self._phrase_lengths)
+
+    def get_phrases_to_subject_map(self, phrase_length: int) -> typing.Mapping[typing.Tuple[str, ...], str]:
+        return self._phrases_to_subject_maps.get(phrase_length, types.MappingProxyType({}))
+
+    def get_specific_posts_to_subject_map(self) -> typing.Mapping[str, str]:
+        return self._specific_posts_to_subject_map
+
+    def get_duplicate_subjects(self, subject: str) -> typing.FrozenSet[str]:
+        result = self._duplicate_subjects.get(subject)
+        if result is None:
+            result = frozenset(self._publication_map.get_duplicate_subjects(subject))
+            self._duplicate_subjects[subject] = result
+        return result
+
+    def get_duplicate_subjects_closure(self, subject: str) -> typing.FrozenSet[str]:
+        result = self._duplicate_subjects_closure.get(subject)
+        if result is None:
+            result = frozenset(super().get_duplicate_subjects_closure(subject))
+            self._duplicate_subjects_closure[subject] = result
+        return result
+
+    def get_all_subject_titles(self) -> typing.FrozenSet[str]:
+        return self._all_subject_titles
+
+    def get_significant_posts_permalinks(self) -> typing.FrozenSet[str]:
+        return self._significant_posts_permalinks
+
+    def get_set_of_words_required(self) -> typing.FrozenSet[str]:
+        return self._set_of_words_required
+
+    def get_number_of_top_authors(self) -> int:
+        return self._number_of_top_authors
+
+    def get_upvoted_post_count_limit(self) -> int:
+        return self._upvoted_post_count_limit
+
+    def get_upvoted_post_text_limit(self) -> int:
+        return self._upvoted_post_text_limit
+
+    def get_minimum_number_username_posts(self) -> int:
+        return self._minimum_number_username_posts
+
+    def frozen(self) -> 'FrozenPublicationMap':
+        return self
+
 
 class ConcordePublicationMap(PublicationMap):
     """Specialisation for the Concorde thread."""
@@ -32,9 +32,13 @@ import logging
 import pprint
 import sys
 import time
+import typing
+
+import numpy as np
 
 import analyse_thread
 import pprune.common.log_config
+import pprune.common.post_cache
 import pprune.common.read_html
 import pprune.common.thread_struct
 import pprune.common.words
@@ -42,9 +46,8 @@ import pprune.common.words
 logger = logging.getLogger(__file__)
 
 
-def print_non_cap_words(thread, common_words, freq_ge: int):
+def print_non_cap_words(word_counter: collections.Counter, freq_ge: int):
     print(' print_non_cap_words(): freq_ge={:d} '.format(freq_ge).center(75, '-'))
-    word_counter = analyse_thread.count_non_cap_words(thread, common_words, freq_ge)
     print(f'Words counted: {sum(word_counter.values())}')
     # pprint.pprint(word_counter.most_common(400))
     pprint.pprint(word_counter)
@@ -54,12 +57,11 @@ def print_non_cap_words(thread, common_words, freq_ge: int):
     print(' print_non_cap_words(): freq_ge={:d} DONE '.format(freq_ge).center(75, '-'))
 
 
-def print_phrases(thread, common_words, phrase_length, most_common_count: int, freq_ge: int):
+def print_phrases(word_counter: collections.Counter, phrase_length: int, most_common_count: int, freq_ge: int):
     print(
         ' print_phrases(): len={:d} most_common={:d} freq_ge={:d} '.format(
             phrase_length, most_common_count, freq_ge).center(75, '-')
     )
-    word_counter = analyse_thread.count_phrases(thread, common_words, phrase_length, freq_ge=freq_ge)
     # pprint.pprint(word_counter.most_common(most_common_count))
     for words, count in word_counter.most_common(most_common_count):
         # print(f'{" ".join(words):32} : {count:4d}')
@@ -82,9 +84,21 @@ def print_phrases(thread, common_words, phrase_length, most_common_count: int, f
     )
 
 
-def print_all_caps(thread, most_common_count: int, freq_ge: int):
+def print_repeated_phrases(word_counter: collections.Counter, min_length: int, most_common_count: int, freq_ge: int):
+    print(
+        ' print_repeated_phrases(): min_length={:d} most_common={:d} freq_ge={:d} '.format(
+            min_length, most_common_count, freq_ge).center(75, '-')
+    )
+    for words, count in word_counter.most_common(most_common_count):
+        print(f'{str(words):64} : {count:4d}')
+    print(
+        ' print_repeated_phrases(): min_length={:d} most_common={:d} freq_ge={:d} DONE '.format(
+            min_length, most_common_count, freq_ge).center(75, '-')
+    )
+
+
+def print_all_caps(word_counter: collections.Counter, most_common_count: int, freq_ge: int):
     print(' print_all_caps(): most_common={:d} freq_ge={:d} '.format(most_common_count, freq_ge).center(75, '-'))
-    word_counter = analyse_thread.count_all_caps(thread, min_size=2, freq_ge=freq_ge)
     pprint.pprint(word_counter.most_common(most_common_count))
     print(' print_all_caps(): most_common={:d} freq_ge={:d} DONE '.format(most_common_count, freq_ge).center(75, '-'))
     print(' print_all_caps(): most_common={:d} freq_ge={:d} sorted '.format(most_common_count, freq_ge).center(75, '-'))
@@ -114,14 +128,13 @@ def print_authors(thread: pprune.common.thread_struct.Thread, most_common_count:
 
 
 def print_liked_by_users(thread: pprune.common.thread_struct.Thread):
-    like_count = collections.Counter()
-    for post in thread.posts:
-        like_count.update([len(post.liked_by_users)])
+    columns = thread.columns()
+    # Number of posts indexed by the number of likes.
+    like_count = np.bincount(columns.like_counts)
     print(' print_liked_by_users(): '.center(75, '-'))
-    # pprint.pprint(like_count)
     total_posts = total_likes = 0
     print(f'{"likes":6s} : {"posts":6s}')
-    for key in sorted(like_count.keys(), reverse=True):
+    for key in np.flatnonzero(like_count)[::-1]:
         print(f'{key:6d} : {like_count[key]:6d}')
         total_posts += like_count[key]
         total_likes += key
@@ -129,25 +142,41 @@ def print_liked_by_users(thread: pprune.common.thread_struct.Thread):
     print(' print_liked_by_users(): DONE '.center(75, '-'))
     UPVOTES_LIMIT_GE = 10
     print(f' print_liked_by_users(): most upvoters >= {UPVOTES_LIMIT_GE} '.center(75, '-'))
-    upvoters = collections.Counter()
-    for post in thread.posts:
-        for user in post.liked_by_users:
-            upvoters.update([user.name])
-    for username, count in upvoters.most_common():
-        if count < UPVOTES_LIMIT_GE:
+    likes_given = columns.likes_given()
+    for user_code in columns.most_likes_given():
+        if likes_given[user_code] < UPVOTES_LIMIT_GE:
             break
-        print(f'{username:32s} : {count:6d}')
+        print(f'{columns.users[user_code].name:32s} : {likes_given[user_code]:6d}')
     print(f' print_liked_by_users(): most upvoters >= {UPVOTES_LIMIT_GE} DONE '.center(75, '-'))
 
 
 def print_research(thread, common_words, most_common_count: int, freq_ge: int,
-                   non_cap_words: bool, all_cap_words: bool, phrases: int, authors: bool, liked_by_users: bool):
+                   non_cap_words: bool, all_cap_words: bool, phrases: typing.Sequence[int], authors: bool,
+                   liked_by_users: bool, phrase_capacity: int = 0, repeated_phrases: int = 0):
+    """Prints the requested reports, the word and phrase counts are computed together in one pass over the thread.
+    phrases is the phrase lengths to report, lengths <= 0 are ignored.
+    If phrase_capacity > 0 then the phrases are counted with bounded memory, see
+    analyse_thread.count_phrases_streaming().
+    If repeated_phrases > 0 then the maximal phrases of this length or more are reported, see
+    analyse_thread.count_repeated_phrases()."""
+    counts = analyse_thread.count_research(
+        thread, common_words, freq_ge,
+        non_cap_words=non_cap_words,
+        all_caps_min_size=2 if all_cap_words else None,
+        phrase_lengths=[phrase_length for phrase_length in phrases if phrase_length > 0],
+        phrase_capacity=phrase_capacity,
+    )
     if non_cap_words:
-        print_non_cap_words(thread, common_words, freq_ge)
+        print_non_cap_words(counts.non_cap_words, freq_ge)
     if all_cap_words:
-        print_all_caps(thread, most_common_count, freq_ge)
-    if phrases > 0:
-        print_phrases(thread, common_words, phrases, most_common_count, freq_ge)
+        print_all_caps(counts.all_caps, most_common_count, freq_ge)
+    for phrase_length, word_counter in counts.phrases.items():
+        print_phrases(word_counter, phrase_length, most_common_count, freq_ge)
+    if repeated_phrases > 0:
+        word_counter = analyse_thread.count_repeated_phrases(
+            thread, common_words, max(2, freq_ge), min_length=repeated_phrases, maximal=True,
+        )
+        print_repeated_phrases(word_counter, repeated_phrases, most_common_count, freq_ge)
     if authors:
         print_authors(thread, most_common_count)
     if liked_by_users:
@@ -200,8 +229,29 @@ def main():
     parser.add_argument(
         "--phrases",
         type=int,
+        nargs='+',
+        default=[],
+        help="Report the frequency of phrases of these lengths, for example --phrases 2 3 4. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--phrase-capacity",
+        type=int,
         default=0,
-        help="If >0 then report the frequency of phrases of this length. [default: %(default)d]",
+        help=(
+            "If >0 then count the phrases with at most this many counters rather than counting every phrase."
+            " The counts are exact but phrases with a frequency close to --freq-ge may be missed if this is too small,"
+            " a warning is logged if so. [default: %(default)d]"
+        ),
+    )
+    parser.add_argument(
+        "--repeated-phrases",
+        type=int,
+        default=0,
+        help=(
+            "If >0 then report the maximal phrases of this length or longer that occur at least --freq-ge times."
+            " A maximal phrase can not be extended by a word without reducing its frequency."
+            " [default: %(default)d]"
+        ),
     )
     parser.add_argument(
         "--authors",
@@ -217,6 +267,30 @@ def main():
             "Show the count of how many people liked a post. "
         )
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=sorted(pprune.common.read_html.POST_RECORD_ENGINES),
+        default='bs4',
+        help="The engine used to extract posts from the archive pages, lxml is faster. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default='',
+        help=(
+            "Directory of the cache of posts read from the archive pages."
+            " Pages that have not changed since the last run are not parsed again."
+            " If absent no cache is used. [default: %(default)s]"
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the archive pages. [default: %(default)d]",
+    )
     parser.add_argument(
         "-l",
         "--log-level",
@@ -238,9 +312,12 @@ def main():
     )
 
     t_start = time.perf_counter()
+    cache = pprune.common.post_cache.PostRecordCache(args.cache_dir) if args.cache_dir else None
     thread = pprune.common.thread_struct.Thread()
     for archive in args.archives:
-        pprune.common.read_html.update_whole_thread(archive, thread)
+        pprune.common.read_html.update_whole_thread(
+            archive, thread, jobs=args.jobs, engine=args.engine, cache=cache
+        )
 
     print(f'Number of posts: {len(thread)}')
     word_count = 0
@@ -252,7 +329,8 @@ def main():
 
     print_research(
         thread, common_words, args.most_common_count, args.freq_ge,
-        args.non_cap_words, args.all_cap_words, args.phrases, args.authors, args.liked_by_users
+        args.non_cap_words, args.all_cap_words, args.phrases, args.authors, args.liked_by_users,
+        phrase_capacity=args.phrase_capacity, repeated_phrases=args.repeated_phrases,
     )
 
     t_elapsed = time.perf_counter() - t_start
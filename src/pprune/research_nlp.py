@@ -7,12 +7,23 @@ import typing
 
 import spacy
 
+from pprune.common import doc_cache
 from pprune.common import log_config
+from pprune.common import post_cache
 from pprune.common import read_html
 from pprune.common import thread_struct
 
 logger = logging.getLogger(__file__)
 
+#: The spaCy model used by process_thread().
+MODEL_NAME = "en_core_web_sm"
+#: The pipeline components that each output needs, a tok2vec that these listen to is added by load_pipeline().
+NOUN_COMPONENTS = frozenset(('tagger', 'attribute_ruler', 'parser'))
+VERB_COMPONENTS = frozenset(('tagger', 'attribute_ruler', 'lemmatizer'))
+ENTITY_COMPONENTS = frozenset(('ner',))
+#: Number of posts that nlp.pipe() processes in each batch.
+DEFAULT_BATCH_SIZE = 256
+
 
 def print_set_str(the_set: typing.Set[str], width: int):
     """Print a set of strings as a table given a screen width."""
@@ -26,30 +37,90 @@ def print_set_str(the_set: typing.Set[str], width: int):
     print()
 
 
-def process_thread(thread: thread_struct.Thread, collect_nouns: bool, collect_verbs: bool, min_frequency: int):
-    logger.info('process_thread(): %s', thread)
-    # Load English tokenizer, tagger, parser and NER
-    nlp = spacy.load("en_core_web_sm")
-    # {label : value : [post_ordinals, ...], ...}, ...}
-    entity_lable_map: typing.Dict[str, typing.Dict[str, typing.List[int]]] = {}
+def load_pipeline(
+        collect_nouns: bool, collect_verbs: bool, collect_entities: bool, model_name: str = MODEL_NAME,
+) -> spacy.language.Language:
+    """Loads the spaCy model with only the pipeline components needed for the requested outputs enabled."""
+    nlp = spacy.load(model_name)
+    required = set()
+    if collect_nouns:
+        required |= NOUN_COMPONENTS
+    if collect_verbs:
+        required |= VERB_COMPONENTS
+    if collect_entities:
+        required |= ENTITY_COMPONENTS
+    # A shared tok2vec is needed if any required component listens to it.
+    for name, component in nlp.pipeline:
+        if required & set(getattr(component, 'listening_components', ())):
+            required.add(name)
+    disable = [name for name in nlp.pipe_names if name not in required]
+    nlp.select_pipes(disable=disable)
+    logger.info('Loaded %s with components %s disabled %s', model_name, nlp.pipe_names, disable)
+    return nlp
+
+
+def analyse_posts(
+        nlp: spacy.language.Language,
+        thread: thread_struct.Thread,
+        collect_nouns: bool,
+        collect_verbs: bool,
+        collect_entities: bool,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        n_process: int = 1,
+        cache: typing.Optional[doc_cache.DocCache] = None,
+) -> typing.Tuple[collections.Counter, collections.Counter, typing.Dict[str, typing.Dict[str, typing.List[int]]]]:
+    """Runs the texts of the posts through nlp.pipe() in batches of batch_size with n_process processes.
+    If cache is given then only the posts that are not in the cache are run through nlp.pipe().
+    Returns (nouns, verbs, entity_label_map).
+    entity_label_map is {label : {value : [post_ordinals, ...], ...}, ...}.
+    """
+    entity_label_map: typing.Dict[str, typing.Dict[str, typing.List[int]]] = {}
     nouns = collections.Counter()
     verbs = collections.Counter()
-    for p, post in enumerate(thread.posts):
+    if cache is not None:
+        docs = cache.annotate(thread, batch_size=batch_size, n_process=n_process)
+    else:
+        texts = (post.text_stripped_without_quoted_message for post in thread.posts)
+        docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    for p, doc in enumerate(docs):
         logger.debug('Post %d/%d', p, len(thread))
-        doc = nlp(post.text_stripped_without_quoted_message)
         # Analyze syntax
         if collect_nouns:
-            # print("Noun phrases:", [chunk.text for chunk in doc.noun_chunks])
             # From: https://spacy.io
             nouns.update([chunk.text for chunk in doc.noun_chunks])
         if collect_verbs:
             verbs.update([token.lemma_ for token in doc if token.pos_ == "VERB"])
         # Find named entities, phrases and concepts
-        for entity in doc.ents:
-            # print(entity.text, entity.label_)
-            if entity.label_ not in entity_lable_map:
-                entity_lable_map[entity.label_] = collections.defaultdict(list)
-            entity_lable_map[entity.label_][entity.text].append(p)
+        if collect_entities:
+            for entity in doc.ents:
+                if entity.label_ not in entity_label_map:
+                    entity_label_map[entity.label_] = collections.defaultdict(list)
+                entity_label_map[entity.label_][entity.text].append(p)
+    return nouns, verbs, entity_label_map
+
+
+def process_thread(
+        thread: thread_struct.Thread,
+        collect_nouns: bool,
+        collect_verbs: bool,
+        min_frequency: int,
+        collect_entities: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        n_process: int = 1,
+        cache_directory: str = '',
+):
+    """Annotates the posts and prints the reports.
+    If cache_directory is given then the annotations are cached there and only new or edited posts are annotated."""
+    logger.info('process_thread(): %s', thread)
+    nlp = load_pipeline(collect_nouns, collect_verbs, collect_entities)
+    cache = doc_cache.DocCache(cache_directory, nlp) if cache_directory else None
+    t_start = time.perf_counter()
+    nouns, verbs, entity_lable_map = analyse_posts(
+        nlp, thread, collect_nouns, collect_verbs, collect_entities,
+        batch_size=batch_size, n_process=n_process, cache=cache,
+    )
+    t_elapsed = time.perf_counter() - t_start
+    logger.info('NLP of %d posts in %.3f (s)', len(thread), t_elapsed)
 
     if collect_nouns:
         print(f' Nouns '.center(75, '='))
@@ -77,6 +148,8 @@ def process_thread(thread: thread_struct.Thread, collect_nouns: bool, collect_ve
                 break
             print(f'[{count:8}] {verb}')
         print(f' Verbs DONE '.center(75, '='))
+    if not collect_entities:
+        return
 
     # Prune entity_lable_map
     for entity in entity_lable_map:
@@ -140,12 +213,65 @@ def main() -> int:  # pragma: no cover
             "Report the verbs in the text (verbose). [default: %(default)s]"
         )
     )
+    parser.add_argument(
+        "--no-entities",
+        action="store_true",
+        help=(
+            "Do not report the named entities, this disables the NER component. [default: %(default)s]"
+        )
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of posts that spaCy processes in each batch. [default: %(default)d]",
+    )
+    parser.add_argument(
+        "--nlp-processes",
+        type=int,
+        default=1,
+        help="Number of processes that spaCy uses, -1 for all CPUs. [default: %(default)d]",
+    )
+    parser.add_argument(
+        "--nlp-cache-dir",
+        type=str,
+        default='',
+        help=(
+            "Directory of the cache of the spaCy annotations of the posts."
+            " Posts that have not changed since the last run are not annotated again."
+            " If absent no cache is used. [default: %(default)s]"
+        ),
+    )
     parser.add_argument(
         "--min-frequency",
         type=int,
         default=5,
         help="The minimum frequency to report. [default: %(default)d]",
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=sorted(read_html.POST_RECORD_ENGINES),
+        default='bs4',
+        help="The engine used to extract posts from the archive pages, lxml is faster. [default: %(default)s]",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default='',
+        help=(
+            "Directory of the cache of posts read from the archive pages."
+            " Pages that have not changed since the last run are not parsed again."
+            " If absent no cache is used. [default: %(default)s]"
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the archive pages. [default: %(default)d]",
+    )
     parser.add_argument(
         "-l",
         "--log-level",
@@ -166,9 +292,10 @@ def main() -> int:  # pragma: no cover
         stream=sys.stdout,
     )
     t_start = time.perf_counter()
+    cache = post_cache.PostRecordCache(args.cache_dir) if args.cache_dir else None
     thread = thread_struct.Thread()
     for archive in args.archives:
-        read_html.update_whole_thread(archive, thread)
+        read_html.update_whole_thread(archive, thread, jobs=args.jobs, engine=args.engine, cache=cache)
     logger.info('Read %d posts in %.3f (s)', len(thread), time.perf_counter() - t_start)
 
     word_count = 0
@@ -176,7 +303,11 @@ def main() -> int:  # pragma: no cover
         word_count += len(post.words)
     logger.info('Number of words: {:d}'.format(word_count))
 
-    process_thread(thread, args.collect_nouns, args.collect_verbs, args.min_frequency)
+    process_thread(
+        thread, args.collect_nouns, args.collect_verbs, args.min_frequency,
+        collect_entities=not args.no_entities, batch_size=args.batch_size, n_process=args.nlp_processes,
+        cache_directory=args.nlp_cache_dir,
+    )
 
     t_elapsed = time.perf_counter() - t_start
     logger.info('Processed %d posts in %.3f (s)', len(thread), t_elapsed, )
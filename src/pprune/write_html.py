@@ -27,17 +27,28 @@ __version__ = '0.0.1'
 __rights__ = 'Copyright (c) 2017 Paul Ross'
 
 import collections
+import concurrent.futures
+import contextlib
+import dataclasses
 import datetime
+import hashlib
+import io
+import json
 import logging
+import multiprocessing
 import os
 import string
+import tempfile
 import time
 import typing
 from contextlib import contextmanager
 
+import numpy as np
+
 import analyse_thread
 import publication_maps
 import styles
+from pprune.common import stage_profile
 from pprune.common import thread_struct
 
 logger = logging.getLogger(__file__)
@@ -76,6 +87,17 @@ def format_datetime(dt: datetime.datetime) -> str:
     return dt.strftime('%B %d, %Y, %H:%M:%S')
 
 
+@dataclasses.dataclass(frozen=True)
+class UserAggregate:
+    """The posts of a user in the thread, see PassOneResult.user_aggregates."""
+    post_count: int
+    up_votes: int
+    subjects: typing.FrozenSet[str]
+    # None if none of the posts have a timestamp.
+    first_post: typing.Optional[datetime.datetime]
+    last_post: typing.Optional[datetime.datetime]
+
+
 class PassOneResult:
     def __init__(self):
         # Map of {subject: [post_index in Thread.posts, ...], ...}
@@ -88,6 +110,8 @@ class PassOneResult:
         self.user_ordinal_map: typing.Dict[str, typing.List[int]] = collections.defaultdict(list)
         # Dict of {(sequence_number, subject) : page_link_to_post_on_subject_page, ...}
         self.sequence_num_subject_link_map = {}
+        # Map of {username: UserAggregate, ...} in the order of the first post of each user.
+        self.user_aggregates: typing.Dict[str, UserAggregate] = {}
 
     def add_subject_post(
             self,
@@ -108,6 +132,160 @@ class PassOneResult:
         """Populated by write_a_subject_page()."""
         self.sequence_num_subject_link_map[(sequence_num, subject)] = link
 
+    def add_user_aggregates(self, thread: thread_struct.Thread) -> None:
+        """Populates user_aggregates once every post has been added with add_subject_post().
+        This is a single pass over the posts so the index and user pages do not need to scan the thread per user."""
+        columns = thread.columns()
+        for user_name, post_indexes in self.user_ordinal_map.items():
+            timestamps = columns.timestamps[post_indexes]
+            timestamps = timestamps[~np.isnat(timestamps)]
+            self.user_aggregates[user_name] = UserAggregate(
+                post_count=len(post_indexes),
+                up_votes=int(columns.like_counts[post_indexes].sum()),
+                subjects=frozenset(self.user_subject_map[user_name]),
+                first_post=timestamps.min().item() if len(timestamps) else None,
+                last_post=timestamps.max().item() if len(timestamps) else None,
+            )
+
+
+class PostRenderCache:
+    """The rendered HTML of the body of each post, this is the prettified post and the like count footer.
+    A post usually appears on several subject pages and on a user page so each post is rendered once and reused."""
+
+    def __init__(self):
+        # Map of {post_index in Thread.posts: (prettified_post, like_count_footer), ...}
+        self._fragments: typing.Dict[int, typing.Tuple[str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def get(self, post_index: int, post: thread_struct.Post) -> typing.Tuple[str, str]:
+        """Returns the prettified post and the like count footer."""
+        fragments = self._fragments.get(post_index)
+        if fragments is None:
+            self.misses += 1
+            like_count_footer = io.StringIO()
+            _write_like_count(post, like_count_footer)
+            fragments = (post.node.prettify(formatter='html'), like_count_footer.getvalue())
+            self._fragments[post_index] = fragments
+        else:
+            self.hits += 1
+        return fragments
+
+    def hit_rate(self) -> float:
+        """The proportion of get() calls that were served from the cache."""
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+
+class OutputManifest:
+    """The SHA256 of the inputs of each output file written by the previous build.
+    The inputs of a page are described cheaply before it is assembled, see _page_inputs(), and a page is only assembled
+    and written if its inputs differ from the previous build or the file does not exist, so a rebuild after a few posts
+    have been added only renders the pages that they appear on. The content of an archived post is assumed not to
+    change.
+    Files of the previous build that are not part of this build are removed by remove_stale().
+    The manifest is a JSON file in the output directory, delete it to force every page to be written."""
+    FILE_NAME = '.write_html_manifest.json'
+    #: Increment this if the manifest format changes, this invalidates all existing manifests.
+    VERSION = 2
+
+    def __init__(self, previous: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None):
+        # Map of {file_name: sha256, ...} from the previous build, None if the page is always written.
+        self.previous: typing.Dict[str, typing.Optional[str]] = previous if previous is not None else {}
+        # Map of {file_name: sha256, ...} from this build.
+        self.hashes: typing.Dict[str, typing.Optional[str]] = {}
+        self.written = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def __str__(self):
+        return f'OutputManifest written: {self.written} skipped: {self.skipped} removed: {self.removed}'
+
+    @classmethod
+    def load(cls, out_path: str) -> 'OutputManifest':
+        """Returns the manifest from the output directory, this is empty if there is no valid manifest."""
+        manifest_path = os.path.join(out_path, cls.FILE_NAME)
+        try:
+            with open(manifest_path) as file:
+                content = json.load(file)
+            if content['version'] == cls.VERSION:
+                return cls(content['hashes'])
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warning('Ignoring corrupt manifest %s Error: %s', manifest_path, err)
+        return cls()
+
+    def save(self, out_path: str) -> None:
+        """Saves the hashes of this build atomically so that an interrupted run can not leave a partial manifest."""
+        file_descriptor, temp_path = tempfile.mkstemp(dir=out_path, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump({'version': self.VERSION, 'hashes': self.hashes}, file, indent=1, sort_keys=True)
+            os.replace(temp_path, os.path.join(out_path, self.FILE_NAME))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def unchanged(self, out_path: str, file_name: str, inputs: typing.Tuple) -> bool:
+        """Records the hash of the inputs of the page.
+        Returns True if the inputs are unchanged since the previous build and the file exists, the caller need not
+        assemble the page."""
+        sha256 = hashlib.sha256(repr(inputs).encode('utf-8')).hexdigest()
+        self.hashes[file_name] = sha256
+        if self.previous.get(file_name) == sha256 and os.path.exists(os.path.join(out_path, file_name)):
+            self.skipped += 1
+            return True
+        return False
+
+    def write(self, out_path: str, file_name: str, content: str) -> None:
+        """Writes the content to the file.
+        A page without a previous call to unchanged(), such as index.html which has the time of the build, is always
+        written."""
+        self.hashes.setdefault(file_name, None)
+        with open(os.path.join(out_path, file_name), 'w') as file:
+            file.write(content)
+        self.written += 1
+
+    def remove_stale(self, out_path: str) -> None:
+        """Removes the files of the previous build that are not part of this build, for example the last page of a
+        subject that now has fewer posts."""
+        for file_name in sorted(self.previous.keys() - self.hashes.keys()):
+            try:
+                os.remove(os.path.join(out_path, file_name))
+            except FileNotFoundError:
+                continue
+            self.removed += 1
+
+    def update(self, hashes: typing.Dict[str, typing.Optional[str]], written: int, skipped: int) -> None:
+        """Adds the results of writing pages with another manifest, for example in a worker process."""
+        self.hashes.update(hashes)
+        self.written += written
+        self.skipped += skipped
+
+
+@contextmanager
+def _page_file(out_path: str, file_name: str, manifest: OutputManifest):
+    """Yields a stream for the page content which is written by the manifest when complete."""
+    stream = io.StringIO()
+    yield stream
+    manifest.write(out_path, file_name, stream.getvalue())
+
+
+def _page_inputs(thread: thread_struct.Thread, page: typing.List[int], *context) -> typing.Tuple:
+    """A cheap description of what a subject or user page is assembled from for OutputManifest.unchanged().
+    This is the context, such as the number of pages for the page links, then for each post on the page its ordinal in
+    Thread.posts, which is also the PostRenderCache key, its sequence number and its up-vote count."""
+    posts = thread.posts
+    return context + tuple(
+        (post_index, posts[post_index].sequence_num, len(posts[post_index].liked_by_users)) for post_index in page
+    )
+
 
 def pass_one(
         thread: thread_struct.Thread,
@@ -117,28 +295,22 @@ def pass_one(
     """Works through every post in the thread and returns a PassOneResult."""
     logger.info('Starting pass one...')
     t_start = time.perf_counter()
+    publication_map = publication_map.frozen()
     pass_one_result = PassOneResult()
+    # Equivalent to match_words(), match_all_caps() and match_phrases() for each phrase length.
+    subject_matcher = analyse_thread.SubjectMatcher.from_publication_map(publication_map, common_words)
+    specific_posts_to_subject_map = publication_map.get_specific_posts_to_subject_map()
     for i, post in enumerate(thread.posts):
-        subjects: typing.Set[str] = set()
-        subjects |= analyse_thread.match_words(
-            post, common_words, publication_map.get_lowercase_word_to_subject_map()
-        )
-        subjects |= analyse_thread.match_all_caps(
-            post, common_words, publication_map.get_uppercase_word_to_subject_map()
-        )
-        for phrase_length in publication_map.get_phrase_lengths():
-            phrase_map = publication_map.get_phrases_to_subject_map(phrase_length)
-            subjects |= analyse_thread.match_phrases(
-                post, common_words, phrase_length, phrase_map,
-            )
-        if post.permalink in publication_map.get_specific_posts_to_subject_map():
-            subjects.add(publication_map.get_specific_posts_to_subject_map()[post.permalink])
+        subjects: typing.Set[str] = subject_matcher.match(post.words)
+        if post.permalink in specific_posts_to_subject_map:
+            subjects.add(specific_posts_to_subject_map[post.permalink])
         # Add duplicate subjects, for example: 'RAT (Deployment)': {'RAT (All)', }
         dupe_subjects = set()
         for subject in subjects:
-            dupe_subjects |= publication_map.get_duplicate_subjects(subject)
+            dupe_subjects |= publication_map.get_duplicate_subjects_closure(subject)
         subjects |= dupe_subjects
         pass_one_result.add_subject_post(subjects, i, post.sequence_num, post.user.name.strip())
+    pass_one_result.add_user_aggregates(thread)
     all_subject_titles = publication_map.get_all_subject_titles()
     for subject_title in sorted(all_subject_titles):
         if subject_title not in pass_one_result.subject_post_map:
@@ -242,20 +414,17 @@ def write_index_most_upvoted_posts_table(
         index: typing.TextIO,
 ):
     """Posts by most up-voted."""
-    # dict of {votes : [post_ordinals, ...], ...}
-    liked_by_users_dict = collections.defaultdict(list)
-    total_upvotes = 0
-    for i, post in enumerate(thread.posts):
-        if len(post.liked_by_users) > 0:
-            liked_by_users_dict[len(post.liked_by_users)].append(i)
-            total_upvotes += len(post.liked_by_users)
-    if liked_by_users_dict:
-        keys = sorted(liked_by_users_dict.keys(), reverse=True)
-        post_count = 0
-        for k in keys:
-            post_count += len(liked_by_users_dict[k])
-            if post_count >= publication_map.get_upvoted_post_count_limit():
-                break
+    columns = thread.columns()
+    total_upvotes = int(columns.like_counts.sum())
+    post_ordinals = columns.most_liked_post_ordinals()
+    if len(post_ordinals):
+        post_count_limit = publication_map.get_upvoted_post_count_limit()
+        # The heading includes every post with the same number of up-votes as the last post in the table.
+        _like_counts, group_sizes = np.unique(columns.like_counts[post_ordinals], return_counts=True)
+        cumulative_counts = np.cumsum(group_sizes[::-1])
+        post_count = int(
+            cumulative_counts[min(np.searchsorted(cumulative_counts, post_count_limit), len(cumulative_counts) - 1)]
+        )
         with element(index, 'h1'):
             index.write(f'The {post_count} Most Up-voted Posts')
         with element(index, 'p'):
@@ -268,38 +437,31 @@ def write_index_most_upvoted_posts_table(
             )
         with element(index, 'p'):
             index.write('NOTE: Up-votes from closed threads maybe lost.')
-        post_count = 0
         with element(index, 'table', _class="indextable"):
             _write_table_header(['Up-votes', 'Text (Quoted Text Removed)', 'User Name', 'Permalink', ], index)
-            for k in keys:
-                for post_ordinal in liked_by_users_dict[k]:
-                    post = thread.posts[post_ordinal]
-                    with element(index, 'tr'):
-                        with element(index, 'td', _class='indextable'):
-                            index.write(f'{len(post.liked_by_users)}')
-                        # post_subject_line = post.subject.strip()
-                        # if not post_subject_line:
-                        #     # post_subject_line = 'No Subject'
-                        #     post_subject_line = post.text_stripped[:64]
+            for post_ordinal in post_ordinals[:max(1, post_count_limit)]:
+                post = thread.posts[post_ordinal]
+                with element(index, 'tr'):
+                    with element(index, 'td', _class='indextable'):
+                        index.write(f'{len(post.liked_by_users)}')
+                    # post_subject_line = post.subject.strip()
+                    # if not post_subject_line:
+                    #     # post_subject_line = 'No Subject'
+                    #     post_subject_line = post.text_stripped[:64]
 
-                        # post_subject_line = post.text_stripped[:publication_map.get_upvoted_post_text_limit()]
+                    # post_subject_line = post.text_stripped[:publication_map.get_upvoted_post_text_limit()]
 
-                        post_subject_line = post.text_stripped_without_quoted_message[
-                                            :publication_map.get_upvoted_post_text_limit()
-                                            ]
-                        with element(index, 'td', _class='indextable'):
-                            index.write(post_subject_line)
-                        with element(index, 'td', _class='indextable'):
-                            with element(index, 'a', href=post.user.href):
-                                index.write(post.user.name)
-                        with element(index, 'td', _class='indextable'):
-                            with element(index, 'a', href=post.permalink):
-                                index.write('Permalink')
-                    post_count += 1
-                    if post_count >= publication_map.get_upvoted_post_count_limit():
-                        break
-                if post_count >= publication_map.get_upvoted_post_count_limit():
-                    break
+                    post_subject_line = post.text_stripped_without_quoted_message[
+                                        :publication_map.get_upvoted_post_text_limit()
+                                        ]
+                    with element(index, 'td', _class='indextable'):
+                        index.write(post_subject_line)
+                    with element(index, 'td', _class='indextable'):
+                        with element(index, 'a', href=post.user.href):
+                            index.write(post.user.name)
+                    with element(index, 'td', _class='indextable'):
+                        with element(index, 'a', href=post.permalink):
+                            index.write('Permalink')
     else:
         logger.warning('Can not read up-votes from the thread. Is the thread closed (up-votes will not show)?')
         with element(index, 'h1'):
@@ -317,7 +479,7 @@ def _write_table_header(headers: typing.List[str], index: typing.TextIO):
 
 def write_index_user_subject_table(
         thread: thread_struct.Thread,
-        user_subject_map: typing.Dict[str, typing.Set[str]],
+        user_aggregates: typing.Dict[str, UserAggregate],
         publication_map: publication_maps.PublicationMap,
         index: typing.TextIO,
 ):
@@ -325,8 +487,8 @@ def write_index_user_subject_table(
     with element(index, 'h1'):
         index.write('Posts by User on a Subject')
     # MOST_COMMON_COUNT = 40
-    user_count = collections.Counter([post.user for post in thread.posts])
-    # print(user_count)
+    # Most posts first, ties in the order of the first post.
+    user_names = sorted(user_aggregates, key=lambda name: user_aggregates[name].post_count, reverse=True)
     with element(index, 'p'):
         index.write(
             'The most prolific {:d} posters in the original thread:'.format(publication_map.get_number_of_top_authors())
@@ -335,36 +497,31 @@ def write_index_user_subject_table(
             'The User Name links to the User page (below).'
             'The "Subjects" links to the first page on that subject.'
         )
-    upvotes_dict: typing.Dict[thread_struct.User, int] = {}
-    for post in thread.posts:
-        if post.user not in upvotes_dict:
-            upvotes_dict[post.user] = len(post.liked_by_users)
-        else:
-            upvotes_dict[post.user] += len(post.liked_by_users)
 
     with element(index, 'table', _class="indextable"):
         _write_table_header(['User Name', 'Number of Posts', 'Total Up-votes', 'Up-votes/post', 'Subjects'], index)
-        for user, post_count in user_count.most_common(publication_map.get_number_of_top_authors()):
+        for user_name in user_names[:publication_map.get_number_of_top_authors()]:
+            user_aggregate = user_aggregates[user_name]
             with element(index, 'tr'):
                 # User name
                 with element(index, 'td', _class='indextable'):
                     # with element(index, 'a', href=user.href):
                     #     index.write(user.name)
                     # Link to users page below in write_user_post_table()
-                    with element(index, 'a', href=_page_name('USER_' + user.name, 0)):
-                        index.write(user.name)
+                    with element(index, 'a', href=_page_name('USER_' + user_name, 0)):
+                        index.write(user_name)
                 # Count of posts
                 with element(index, 'td', _class='indextable'):
-                    index.write('{:d}'.format(post_count))
+                    index.write('{:d}'.format(user_aggregate.post_count))
                 # Count of up-votes
                 with element(index, 'td', _class='indextable'):
-                    index.write('{:d}'.format(upvotes_dict[user]))
+                    index.write('{:d}'.format(user_aggregate.up_votes))
                 # 'Up-votes/post'
                 with element(index, 'td', _class='indextable'):
-                    index.write('{:.1f}'.format(upvotes_dict[user] / post_count))
+                    index.write('{:.1f}'.format(user_aggregate.up_votes / user_aggregate.post_count))
                 # Comma separated list of subjects that they are identified with
                 with element(index, 'td', _class='indextable'):
-                    subjects = sorted(user_subject_map[user.name])
+                    subjects = sorted(user_aggregate.subjects)
                     for subject in subjects:
                         with element(index, 'a',
                                      href=_page_name(subject, 0)):
@@ -374,7 +531,7 @@ def write_index_user_subject_table(
 
 def write_index_user_post_table(
         thread: thread_struct.Thread,
-        user_ordinal_map: typing.Dict[str, typing.List[int]],
+        user_aggregates: typing.Dict[str, UserAggregate],
         publication_map: publication_maps.PublicationMap,
         index: typing.TextIO,
 ):
@@ -390,8 +547,8 @@ def write_index_user_post_table(
     with element(index, 'table', _class="indextable"):
         COLUMNS = 8
         filtered_users = []
-        for user_name in user_ordinal_map.keys():
-            if len(user_ordinal_map[user_name]) >= publication_map.get_minimum_number_username_posts():
+        for user_name in user_aggregates.keys():
+            if user_aggregates[user_name].post_count >= publication_map.get_minimum_number_username_posts():
                 filtered_users.append(user_name)
         filtered_users.sort()
         rows = [filtered_users[i:i + COLUMNS] for i in range(0, len(filtered_users), COLUMNS)]
@@ -400,10 +557,10 @@ def write_index_user_post_table(
             with element(index, 'tr'):
                 for _cell in row:
                     user_name = filtered_users[subject_index]
-                    if len(user_ordinal_map[user_name]) >= publication_map.get_minimum_number_username_posts():
+                    if user_aggregates[user_name].post_count >= publication_map.get_minimum_number_username_posts():
                         with element(index, 'td', _class='indextable'):
                             with element(index, 'a', href=_page_name('USER_' + user_name, 0)):
-                                index.write('{:s} [{:d}]'.format(user_name, len(user_ordinal_map[user_name])))
+                                index.write('{:s} [{:d}]'.format(user_name, user_aggregates[user_name].post_count))
                         subject_index += 1
 
 
@@ -412,11 +569,14 @@ def write_index_page(
         pass_one_result: PassOneResult,
         publication_map: publication_maps.PublicationMap,
         out_path: str,
+        manifest: typing.Optional[OutputManifest] = None,
 ):
+    if manifest is None:
+        manifest = OutputManifest()
     if not os.path.exists(out_path):
         os.mkdir(out_path)
     styles.writeCssToDir(out_path)
-    with open(os.path.join(out_path, 'index.html'), 'w') as index:
+    with _page_file(out_path, 'index.html', manifest) as index:
         index.write(
             '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">')
         with element(index, 'html', xmlns="http://www.w3.org/1999/xhtml", dir="ltr", lang="en"):
@@ -522,9 +682,9 @@ def write_index_page(
 
                 write_index_most_upvoted_posts_table(thread, publication_map, index)
 
-                write_index_user_subject_table(thread, pass_one_result.user_subject_map, publication_map, index)
+                write_index_user_subject_table(thread, pass_one_result.user_aggregates, publication_map, index)
 
-                write_index_user_post_table(thread, pass_one_result.user_ordinal_map, publication_map, index)
+                write_index_user_post_table(thread, pass_one_result.user_aggregates, publication_map, index)
 
 
 def _write_page_links(subject: str, page_num: int, page_count: int, out_file: typing.TextIO) -> None:
@@ -559,17 +719,38 @@ def _write_page_links(subject: str, page_num: int, page_count: int, out_file: ty
             out_file.write('Index Page')
 
 
+def _write_like_count(post: thread_struct.Post, out_file: typing.TextIO) -> None:
+    if len(post.liked_by_users) == 1:
+        with element(out_file, 'p'):
+            out_file.write(f'{len(post.liked_by_users)} user liked this post.')
+    elif len(post.liked_by_users) > 1:
+        with element(out_file, 'p'):
+            out_file.write(f'{len(post.liked_by_users)} users liked this post.')
+
+
 def write_a_subject_page(
         thread: thread_struct.Thread,
         pass_one_result: PassOneResult,
         subject: str,
         out_path: str,
+        render_cache: typing.Optional[PostRenderCache] = None,
+        manifest: typing.Optional[OutputManifest] = None,
 ):
-    """Writes all the pages for a single subject."""
+    """Writes all the pages for a single subject.
+    render_cache is shared between pages so that each post is rendered once.
+    manifest is the OutputManifest of the previous build, unchanged pages are not assembled or written."""
+    if render_cache is None:
+        render_cache = PostRenderCache()
+    if manifest is None:
+        manifest = OutputManifest()
     _posts = pass_one_result.subject_post_map[subject]
     pages = [_posts[i:i + POSTS_PER_PAGE] for i in range(0, len(_posts), POSTS_PER_PAGE)]
     for page_index, page in enumerate(pages):
-        with open(os.path.join(out_path, _page_name(subject, page_index)), 'w') as out_file:
+        page_name = _page_name(subject, page_index)
+        page_inputs = _page_inputs(thread, page, subject, page_index, len(_posts), len(pages), PAGE_LINK_COUNT)
+        if manifest.unchanged(out_path, page_name, page_inputs):
+            continue
+        with _page_file(out_path, page_name, manifest) as out_file:
             out_file.write(
                 '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">')
             with element(out_file, 'html', xmlns="http://www.w3.org/1999/xhtml", dir="ltr", lang="en"):
@@ -587,6 +768,7 @@ def write_a_subject_page(
                     with element(out_file, 'table', _class='posts'):
                         for post_index in page:
                             post = thread.posts[post_index]
+                            prettified_post, like_count_footer = render_cache.get(post_index, post)
                             with element(out_file, 'tr', valign="top", _id=f'{post.sequence_num}'):
                                 # with element(f, 'td', _class="alt2", style="border: 1px solid #000063; border-top: 0px; border-bottom: 0px"):
                                 with element(out_file, 'td', _class="post"):
@@ -598,13 +780,8 @@ def write_a_subject_page(
                                         out_file.write('<br/>permalink')
                                     out_file.write(' Post: {:d}'.format(post.sequence_num))
                                 with element(out_file, 'td', _class="post"):
-                                    out_file.write(post.node.prettify(formatter='html'))
-                                    if len(post.liked_by_users) == 1:
-                                        with element(out_file, 'p'):
-                                            out_file.write(f'{len(post.liked_by_users)} user liked this post.')
-                                    elif len(post.liked_by_users) > 1:
-                                        with element(out_file, 'p'):
-                                            out_file.write(f'{len(post.liked_by_users)} users liked this post.')
+                                    out_file.write(prettified_post)
+                                    out_file.write(like_count_footer)
                     _write_page_links(subject, page_index, len(pages), out_file)
 
 
@@ -613,16 +790,38 @@ def write_user_page(
         pass_one_result: PassOneResult,
         user_name: str,
         out_path: str,
+        render_cache: typing.Optional[PostRenderCache] = None,
+        manifest: typing.Optional[OutputManifest] = None,
 ) -> None:
     """Writes a specific HTML page for the user posts.
     Each user page has all the posts from that user in order.
     If the post matches any subject then a link is made to that particular post in subject page so the post can be seen
-    in context."""
+    in context.
+    render_cache is shared between pages so that each post is rendered once.
+    manifest is the OutputManifest of the previous build, unchanged pages are not assembled or written."""
+    if render_cache is None:
+        render_cache = PostRenderCache()
+    if manifest is None:
+        manifest = OutputManifest()
     _posts = pass_one_result.user_ordinal_map[user_name]
     pages = [_posts[i:i + POSTS_PER_PAGE] for i in range(0, len(_posts), POSTS_PER_PAGE)]
-    up_votes = sum(len(p.liked_by_users) for p in thread.posts if p.user.name == user_name)
+    up_votes = pass_one_result.user_aggregates[user_name].up_votes
     for page_index, page in enumerate(pages):
-        with open(os.path.join(out_path, _page_name('USER_' + user_name, page_index)), 'w') as out_file:
+        page_name = _page_name('USER_' + user_name, page_index)
+        # The links from each post to the subject pages that it appears on.
+        subject_links = tuple(
+            tuple(
+                pass_one_result.sequence_num_subject_link_map[(sequence_num, subject)]
+                for subject in sorted(pass_one_result.post_subject_map[sequence_num])
+            )
+            for sequence_num in (thread.posts[post_index].sequence_num for post_index in page)
+        )
+        page_inputs = _page_inputs(
+            thread, page, user_name, page_index, len(_posts), up_votes, len(pages), PAGE_LINK_COUNT, subject_links,
+        )
+        if manifest.unchanged(out_path, page_name, page_inputs):
+            continue
+        with _page_file(out_path, page_name, manifest) as out_file:
             out_file.write(
                 '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">')
             with element(out_file, 'html', xmlns="http://www.w3.org/1999/xhtml", dir="ltr", lang="en"):
@@ -643,6 +842,7 @@ def write_user_page(
                     with element(out_file, 'table', _class='posts'):
                         for post_index in page:
                             post = thread.posts[post_index]
+                            prettified_post, like_count_footer = render_cache.get(post_index, post)
                             with element(out_file, 'tr', valign="top"):
                                 # with element(f, 'td', _class="alt2", style="border: 1px solid #000063; border-top: 0px; border-bottom: 0px"):
                                 with element(out_file, 'td', _class="post"):
@@ -654,7 +854,7 @@ def write_user_page(
                                         out_file.write('<br/>permalink')
                                     out_file.write(' Post: {:d}'.format(post.sequence_num))
                                 with element(out_file, 'td', _class="post"):
-                                    out_file.write(post.node.prettify(formatter='html'))
+                                    out_file.write(prettified_post)
 
                                     # Subjects that this post covers.
                                     with element(out_file, 'p'):
@@ -677,37 +877,137 @@ def write_user_page(
                                                 out_file.write('Subjects:')
                                             out_file.write(' None')
 
-                                    if len(post.liked_by_users) == 1:
-                                        with element(out_file, 'p'):
-                                            out_file.write(f'{len(post.liked_by_users)} user liked this post.')
-                                    elif len(post.liked_by_users) > 1:
-                                        with element(out_file, 'p'):
-                                            out_file.write(f'{len(post.liked_by_users)} users liked this post.')
+                                    out_file.write(like_count_footer)
                     _write_page_links('USER_' + user_name, page_index, len(pages), out_file)
 
 
+# The thread, the result of pass one, the render cache and the previous manifest in a page writing worker process,
+# these are set once per process by _init_page_worker().
+_worker_thread: typing.Optional[thread_struct.Thread] = None
+_worker_pass_one_result: typing.Optional[PassOneResult] = None
+_worker_render_cache: typing.Optional[PostRenderCache] = None
+_worker_previous_hashes: typing.Optional[typing.Dict[str, str]] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class _PageWorkerResult:
+    """The render cache counts and the manifest changes from writing the pages of a subject or a user."""
+    render_hits: int
+    render_misses: int
+    hashes: typing.Dict[str, str]
+    written: int
+    skipped: int
+
+
+def _init_page_worker(
+        thread: thread_struct.Thread,
+        pass_one_result: PassOneResult,
+        previous_hashes: typing.Dict[str, str],
+) -> None:
+    global _worker_thread, _worker_pass_one_result, _worker_render_cache, _worker_previous_hashes
+    _worker_thread = thread
+    _worker_pass_one_result = pass_one_result
+    _worker_render_cache = PostRenderCache()
+    _worker_previous_hashes = previous_hashes
+
+
+def _write_pages_in_worker(write_pages: typing.Callable, name: str, out_path: str) -> _PageWorkerResult:
+    """Calls write_a_subject_page() or write_user_page() with the worker process state."""
+    hits, misses = _worker_render_cache.hits, _worker_render_cache.misses
+    manifest = OutputManifest(_worker_previous_hashes)
+    write_pages(_worker_thread, _worker_pass_one_result, name, out_path, _worker_render_cache, manifest)
+    return _PageWorkerResult(
+        render_hits=_worker_render_cache.hits - hits,
+        render_misses=_worker_render_cache.misses - misses,
+        hashes=manifest.hashes,
+        written=manifest.written,
+        skipped=manifest.skipped,
+    )
+
+
+def _page_executor(
+        thread: thread_struct.Thread,
+        pass_one_result: PassOneResult,
+        previous_hashes: typing.Dict[str, str],
+        jobs: int,
+) -> concurrent.futures.ProcessPoolExecutor:
+    """A process pool where each worker has the thread, the result of pass one and the previous manifest.
+    Where possible the workers are forked so that they share the parents copy of the thread, otherwise the thread is
+    pickled once per worker rather than once per page."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+    else:
+        mp_context = None
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=mp_context,
+        initializer=_init_page_worker,
+        initargs=(thread, pass_one_result, previous_hashes),
+    )
+
+
 def write_whole_thread(
         thread: thread_struct.Thread,
         common_words: typing.Set[str],
         publication_map: publication_maps.PublicationMap,
-        output_path: str
-):
+        output_path: str,
+        jobs: int = 1,
+) -> PassOneResult:
+    """Writes the subject pages, the user pages and the index page and returns the result of pass_one().
+    If jobs > 1 the subject and user pages are written by that number of processes, the output is identical.
+    Pages that are unchanged since the previous build are not rewritten and pages that are no longer part of the build
+    are removed, see OutputManifest."""
     logger.info('Starting write_whole_thread() to %s', output_path)
     t_start = time.perf_counter()
-    pass_one_result = pass_one(thread, common_words, publication_map)
-    total_posts = 0
-    for subject in sorted(pass_one_result.subject_post_map.keys()):
-        logger.info('Writing: "{:s}" [{:d}]'.format(subject, len(pass_one_result.subject_post_map[subject])))
-        write_a_subject_page(thread, pass_one_result, subject, output_path)
-        total_posts += len(pass_one_result.subject_post_map[subject])
-    logger.info('Wrote %d posts including duplicates.', total_posts)
-    for user_name in sorted(pass_one_result.user_ordinal_map.keys()):
-        if len(pass_one_result.user_ordinal_map[user_name]) >= publication_map.get_minimum_number_username_posts():
-            logger.info(
-                'Writing: user page for "{:s}" [{:d}]'.format(
-                    user_name, len(pass_one_result.user_ordinal_map[user_name]))
-            )
-            write_user_page(thread, pass_one_result, user_name, output_path)
+    publication_map = publication_map.frozen()
+    with stage_profile.stage('pass_one'):
+        pass_one_result = pass_one(thread, common_words, publication_map)
+    manifest = OutputManifest.load(output_path)
+    # Each worker process has its own render cache, the hits and misses are summed here.
+    render_cache = PostRenderCache()
+    with contextlib.ExitStack() as exit_stack:
+        executor = None
+        if jobs > 1:
+            executor = exit_stack.enter_context(_page_executor(thread, pass_one_result, manifest.previous, jobs))
+        futures = []
+        total_posts = 0
+        for subject in sorted(pass_one_result.subject_post_map.keys()):
+            logger.info('Writing: "{:s}" [{:d}]'.format(subject, len(pass_one_result.subject_post_map[subject])))
+            if executor is not None:
+                futures.append(executor.submit(_write_pages_in_worker, write_a_subject_page, subject, output_path))
+            else:
+                with stage_profile.stage('subject pages'):
+                    write_a_subject_page(thread, pass_one_result, subject, output_path, render_cache, manifest)
+            total_posts += len(pass_one_result.subject_post_map[subject])
+        logger.info('Wrote %d posts including duplicates.', total_posts)
+        for user_name in sorted(pass_one_result.user_aggregates.keys()):
+            user_aggregate = pass_one_result.user_aggregates[user_name]
+            if user_aggregate.post_count >= publication_map.get_minimum_number_username_posts():
+                logger.info('Writing: user page for "{:s}" [{:d}]'.format(user_name, user_aggregate.post_count))
+                if executor is not None:
+                    futures.append(executor.submit(_write_pages_in_worker, write_user_page, user_name, output_path))
+                else:
+                    with stage_profile.stage('user pages'):
+                        write_user_page(thread, pass_one_result, user_name, output_path, render_cache, manifest)
+        # Raise any exception from the workers.
+        for future in futures:
+            with stage_profile.stage('page workers'):
+                result = future.result()
+            render_cache.hits += result.render_hits
+            render_cache.misses += result.render_misses
+            manifest.update(result.hashes, result.written, result.skipped)
+    logger.info(
+        'Post render cache: rendered %d reused %d hit rate %.1f%%',
+        render_cache.misses, render_cache.hits, 100 * render_cache.hit_rate(),
+    )
     logger.info('Writing: {:s}'.format('index.html'))
-    write_index_page(thread, pass_one_result, publication_map, output_path)
+    with stage_profile.stage('index'):
+        write_index_page(thread, pass_one_result, publication_map, output_path, manifest)
+    manifest.remove_stale(output_path)
+    manifest.save(output_path)
+    logger.info(
+        'Pages written: %d skipped as unchanged: %d removed as stale: %d',
+        manifest.written, manifest.skipped, manifest.removed,
+    )
     logger.info('Writing thread done in %.3f (s)', time.perf_counter() - t_start)
+    return pass_one_result
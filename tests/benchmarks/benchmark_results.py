@@ -0,0 +1,82 @@
+"""Records benchmark timings as JSON so that regressions are visible between runs.
+
+Each run is appended to the JSON file and every timing is compared with the same timing in the previous run::
+
+    {
+        "runs": [
+            {
+                "time": "2025-07-12T10:00:00",
+                "python": "3.11.7",
+                "platform": "Linux-6.1-x86_64",
+                "results": [
+                    {"name": "read_html[lxml]", "post_count": 1000, "seconds": 0.47, "posts_per_second": 2127.7},
+                    ...
+                ]
+            },
+            ...
+        ]
+    }
+"""
+import datetime
+import json
+import os
+import platform
+import typing
+
+# A timing that is this much slower than the previous run is reported as a regression.
+REGRESSION_RATIO = 1.25
+
+
+class BenchmarkResults:
+    """Collects the timings of a benchmark run, save() appends them to the JSON file."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.runs: typing.List[typing.Dict[str, typing.Any]] = []
+        if os.path.exists(file_path):
+            with open(file_path) as file:
+                self.runs = json.load(file)['runs']
+        self.results: typing.List[typing.Dict[str, typing.Any]] = []
+
+    def previous(self, name: str, post_count: int) -> typing.Optional[float]:
+        """The seconds of the same timing in the most recent run that has it, None if there is none."""
+        for run in reversed(self.runs):
+            for result in run['results']:
+                if result['name'] == name and result['post_count'] == post_count:
+                    return result['seconds']
+        return None
+
+    def add(self, name: str, post_count: int, seconds: float) -> str:
+        """Adds a timing and returns a line that describes it and compares it with the previous run."""
+        self.results.append(
+            {
+                'name': name,
+                'post_count': post_count,
+                'seconds': seconds,
+                'posts_per_second': post_count / seconds if seconds else 0.0,
+            }
+        )
+        line = f'{name:24s} posts: {post_count:8,d} {seconds:10.3f} (s) {post_count / seconds:10,.0f} (posts/s)'
+        previous = self.previous(name, post_count)
+        if previous:
+            ratio = seconds / previous
+            line += f' previous: {previous:10.3f} (s) ratio: {ratio:5.2f}'
+            if ratio > REGRESSION_RATIO:
+                line += ' REGRESSION'
+        return line
+
+    def save(self) -> None:
+        """Appends this run to the JSON file, nothing is written if there are no results."""
+        if not self.results:
+            return
+        self.runs.append(
+            {
+                'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': self.results,
+            }
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        with open(self.file_path, 'w') as file:
+            json.dump({'runs': self.runs}, file, indent=4)
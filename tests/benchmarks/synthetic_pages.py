@@ -0,0 +1,263 @@
+"""Generates synthetic pprune thread pages with the same HTML structure as the archived pages.
+These are for benchmarks at scale as the example pages only have 40 posts.
+
+Usage::
+
+    config = SyntheticThreadConfig(post_count=10_000)
+    file_paths = write_synthetic_thread(directory, config)
+    thread = read_html.read_whole_thread(directory, engine='lxml')
+
+The words of the posts are drawn from the vocabulary of the example pages with a Zipf distribution so that the
+publication maps find subjects in the synthetic posts.
+"""
+import collections
+import dataclasses
+import datetime
+import html
+import os
+import random
+import typing
+
+import lxml.html
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+THREAD_URL = 'https://www.pprune.org/accidents-close-calls/999999-synthetic-thread'
+FIRST_SEQUENCE_NUM = 11_900_000
+START_TIME = datetime.datetime(2025, 6, 12, 8, 0)
+
+PAGE_HEADER = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" dir="ltr" lang="en">
+<head>
+    <title> Synthetic thread - Page {page_number} - PPRuNe Forums</title>
+</head>
+<body>
+<div class="pagenav">
+    <a class="button" id="mb_pagelast" href="{last_page_url}" title="Last Page">Last</a>
+</div>
+<div id="posts">
+"""
+
+PAGE_FOOTER = """<div id="lastpost"></div>
+</div>
+</body>
+</html>
+"""
+
+POST = """    <!-- post #{sequence_num} -->
+
+<div id="edit{sequence_num}">
+<div id="post{sequence_num}">
+    <div class="tpost">
+        <div class="trow-group">
+            <div class="trow thead smallfont">
+                <div class="tcell"  style="width:175px;">
+                    <!-- status icon and date -->
+                    <a name="post{sequence_num}"><img class="inlineimg"
+                        src="https://www.pprune.org/images/statusicon/post_old.gif" alt="Old" /></a>
+                    {date}
+
+                    <!-- / status icon and date -->
+                </div>
+                <div class="tcell text-right">
+                    &nbsp;
+                    #<a href="https://www.pprune.org/{sequence_num}-post{post_number}.html" target="new" rel="nofollow"
+                        id="postcount{sequence_num}" name="{post_number}"><strong>{post_number}</strong></a>
+                    (<b><a href="{page_url}#post{sequence_num}" title="Link to this Post">permalink</a></b>) &nbsp;
+                </div>
+            </div>
+            <div class="trow">
+                <div class="tcell alt2" style="width:175px;">
+                    <div id="postmenu_{sequence_num}">
+                        <a rel="nofollow" class="bigusername" href="{user_href}">{user_name}</a>
+                    </div>
+                    <div class="smallfont">
+                        &nbsp;<br />
+                        <div>Join Date: Oct 2001</div>
+                    </div>
+                </div>
+
+                <div class="tcell alt1" id="td_post_{sequence_num}">
+                    <!-- message -->
+                    <div id="post_message_{sequence_num}">
+                        {message}
+                    </div>
+                    <!-- / message -->
+                </div>
+            </div>
+        </div><!-- trow-group -->
+    </div><!-- tbox -->
+</div>
+{likes}
+</div>
+
+<!-- / post #{sequence_num} -->"""
+
+QUOTE = """<div style="margin:1rem; margin-top:0.3rem;">
+    <div><label>Quote:</label></div>
+    <div class="panel alt2" style="border:1px inset">
+        {message}
+    </div>
+</div>"""
+
+LIKES = """ <div id="post_thanks_box_{sequence_num}"><div class="tbox">
+    <div class="trow">
+        <div class="tcell alt2" style="width: 175px">
+                <strong>The following {like_count} users liked this post by {user_name}:</strong>
+        </div>
+        <div class="tcell alt1" style="vertical-align: top"><div> {users}</div></div>
+    </div>
+</div></div>"""
+
+
+@dataclasses.dataclass(frozen=True)
+class SyntheticThreadConfig:
+    """The shape of a synthetic thread."""
+    post_count: int = 1_000
+    # If 0 this is post_count // 20.
+    user_count: int = 0
+    posts_per_page: int = 20
+    # The number of words in the text of each post, excluding quotes, is uniform over this range.
+    words_per_post: typing.Tuple[int, int] = (10, 120)
+    # The number of distinct words, the most common words of the example pages are used first.
+    vocabulary_size: int = 5_000
+    # The proportion of posts that quote the previous posts, quotes are nested up to quote_depth deep.
+    quote_probability: float = 0.3
+    quote_depth: int = 2
+    # The proportion of posts with likes, the number of likes is uniform over 1 to max_likes.
+    like_probability: float = 0.4
+    max_likes: int = 20
+    seed: int = 42
+
+    @property
+    def users(self) -> int:
+        return self.user_count or max(1, self.post_count // 20)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.post_count // self.posts_per_page))
+
+
+def page_url(page_number: int) -> str:
+    if page_number == 1:
+        return f'{THREAD_URL}.html'
+    return f'{THREAD_URL}-{page_number}.html'
+
+
+def format_date(timestamp: datetime.datetime) -> str:
+    """The date of a post as pprune shows it, for example '12th Jun 2025, 09:35'."""
+    if timestamp.day in (1, 21, 31):
+        suffix = 'st'
+    elif timestamp.day in (2, 22):
+        suffix = 'nd'
+    elif timestamp.day in (3, 23):
+        suffix = 'rd'
+    else:
+        suffix = 'th'
+    return f'{timestamp.day}{suffix} {timestamp:%b %Y, %H:%M}'
+
+
+def example_vocabulary() -> typing.List[str]:
+    """The distinct words of the messages in the example pages, most common first."""
+    word_counter = collections.Counter()
+    for file_name in sorted(os.listdir(EXAMPLE_PAGES_DIRECTORY)):
+        doc = lxml.html.parse(os.path.join(EXAMPLE_PAGES_DIRECTORY, file_name))
+        for node in doc.xpath('//div[starts-with(@id, "post_message_")]'):
+            word_counter.update(node.text_content().split())
+    return [word for word, _count in word_counter.most_common()]
+
+
+class SyntheticThread:
+    """Generates the pages of a synthetic thread, the same config always generates the same pages."""
+
+    def __init__(self, config: SyntheticThreadConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        vocabulary = example_vocabulary()[:config.vocabulary_size]
+        vocabulary += [f'term{i}' for i in range(config.vocabulary_size - len(vocabulary))]
+        self._words = [html.escape(word) for word in vocabulary]
+        # Zipf distribution by rank.
+        self._cumulative_weights = []
+        total = 0.0
+        for rank in range(len(self._words)):
+            total += 1.0 / (rank + 1)
+            self._cumulative_weights.append(total)
+        # The messages of the most recent posts, without their quotes, for quoting.
+        self._recent_messages: typing.Deque[str] = collections.deque(maxlen=max(1, config.quote_depth))
+
+    def _user(self, user_number: int) -> typing.Tuple[str, str]:
+        """The (href, name) of a user."""
+        return f'https://www.pprune.org/members/{100_000 + user_number}-user{user_number}', f'user{user_number}'
+
+    def _text(self) -> str:
+        word_count = self._random.randint(*self.config.words_per_post)
+        words = self._random.choices(self._words, cum_weights=self._cumulative_weights, k=word_count)
+        # A line break every 20 words or so.
+        lines = [' '.join(words[i:i + 20]) for i in range(0, len(words), 20)]
+        return '<br />\n'.join(lines)
+
+    def _message(self) -> str:
+        text = self._text()
+        message = text
+        if self._recent_messages and self._random.random() < self.config.quote_probability:
+            # Nest the most recent messages, the innermost is the oldest.
+            depth = self._random.randint(1, min(self.config.quote_depth, len(self._recent_messages)))
+            quoted = ''
+            for recent in list(self._recent_messages)[-depth:]:
+                quoted = QUOTE.format(message=quoted + recent)
+            message = quoted + text
+        self._recent_messages.append(text)
+        return message
+
+    def _likes(self, sequence_num: int, user_name: str) -> str:
+        if self._random.random() >= self.config.like_probability:
+            return ''
+        like_count = min(self._random.randint(1, self.config.max_likes), self.config.users)
+        users = []
+        for user_number in sorted(self._random.sample(range(self.config.users), like_count)):
+            href, name = self._user(user_number)
+            users.append(f'<a href="{href}" rel="nofollow">{name}</a>')
+        return LIKES.format(
+            sequence_num=sequence_num, like_count=like_count, user_name=user_name, users=', '.join(users),
+        )
+
+    def _post(self, post_index: int, page_number: int) -> str:
+        sequence_num = FIRST_SEQUENCE_NUM + 2 * post_index
+        user_href, user_name = self._user(self._random.randrange(self.config.users))
+        # pprune dates from curl are 12 hours behind, see read_html.date_from_text().
+        timestamp = START_TIME + datetime.timedelta(minutes=post_index) - datetime.timedelta(hours=12)
+        return POST.format(
+            sequence_num=sequence_num,
+            post_number=post_index + 1,
+            date=format_date(timestamp),
+            page_url=page_url(page_number),
+            user_href=user_href,
+            user_name=user_name,
+            message=self._message(),
+            likes=self._likes(sequence_num, user_name),
+        )
+
+    def pages(self) -> typing.Iterator[typing.Tuple[int, str]]:
+        """Yields (page_number, page_html) for every page."""
+        config = self.config
+        for page_number in range(1, config.page_count + 1):
+            parts = [PAGE_HEADER.format(page_number=page_number, last_page_url=page_url(config.page_count))]
+            first_post = (page_number - 1) * config.posts_per_page
+            for post_index in range(first_post, min(first_post + config.posts_per_page, config.post_count)):
+                parts.append(self._post(post_index, page_number))
+            parts.append(PAGE_FOOTER)
+            yield page_number, ''.join(parts)
+
+
+def write_synthetic_thread(directory: str, config: SyntheticThreadConfig) -> typing.List[str]:
+    """Writes the pages of a synthetic thread to the directory, returns the list of file paths.
+    The file names are those of an archived thread so read_html.read_whole_thread() can read the directory."""
+    os.makedirs(directory, exist_ok=True)
+    file_paths = []
+    for page_number, content in SyntheticThread(config).pages():
+        file_path = read_html.archive_destination(directory, page_url(page_number))
+        with open(file_path, 'w') as file:
+            file.write(content)
+        file_paths.append(file_path)
+    return file_paths
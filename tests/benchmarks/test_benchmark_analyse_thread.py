@@ -0,0 +1,118 @@
+"""Benchmarks of the token ID implementation of the analyse_thread counting functions.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import collections
+import os
+import sys
+import time
+
+import pytest
+from pprune import analyse_thread
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+# research.py uses a list of 1000 common words from words.read_common_words_file().
+COMMON_WORDS = [
+    'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'you', 'it', 'not',
+    'or', 'be', 'are', 'from', 'at', 'as', 'your', 'all', 'have', 'new', 'more', 'an', 'was', 'we', 'will', 'can',
+]
+COMMON_WORDS += [f'common{i}' for i in range(1000 - len(COMMON_WORDS))]
+# Number of times the research counts are repeated.
+REPEAT = 10
+
+
+def _count_non_cap_words_str(thread, common_words, freq_ge):
+    word_counter = collections.Counter()
+    all_users = thread.all_users
+    for post in thread.posts:
+        word_counter.update(
+            [
+                word for word in post.words
+                if word.lower() not in common_words and word not in all_users and word.upper() != word
+            ]
+        )
+    return analyse_thread.filter_counter(word_counter, freq_ge)
+
+
+def _count_phrases_str(thread, common_words, phrase_length, freq_ge):
+    phrase_counter = collections.Counter()
+    for post in thread.posts:
+        trimmed_words = post.significant_words(common_words)
+        phrase_counter.update(
+            [tuple(trimmed_words[i:i + phrase_length]) for i in range(len(trimmed_words) - (phrase_length - 1))]
+        )
+    return analyse_thread.filter_counter(phrase_counter, freq_ge)
+
+
+def _count_all_caps_str(thread, min_size, freq_ge):
+    word_counter = collections.Counter()
+    for post in thread.posts:
+        word_counter.update(post.cap_words(min_size))
+    return analyse_thread.filter_counter(word_counter, freq_ge)
+
+
+def _research_str(thread, common_words):
+    _count_non_cap_words_str(thread, common_words, 2)
+    _count_all_caps_str(thread, 2, 2)
+    for phrase_length in range(2, 6):
+        _count_phrases_str(thread, common_words, phrase_length, 2)
+
+
+def _research_encoded(thread, common_words):
+    analyse_thread.count_non_cap_words(thread, common_words, 2)
+    analyse_thread.count_all_caps(thread, 2, 2)
+    for phrase_length in range(2, 6):
+        analyse_thread.count_phrases(thread, common_words, phrase_length, 2)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('common_words', (COMMON_WORDS, set(COMMON_WORDS)), ids=['list', 'set'])
+def test_benchmark_analyse_thread_encoded(common_words):
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY)
+    # Populate the cached words so that this is not included in either timing.
+    for post in thread.posts:
+        post.words
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        _research_str(thread, common_words)
+    time_str = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    encoded = thread.encoded()
+    time_encode = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        _research_encoded(thread, common_words)
+    time_encoded = time.perf_counter() - t_start
+    token_count = sum(len(p.words) for p in thread.posts)
+    memory_str = sum(sys.getsizeof(p.words) + sum(sys.getsizeof(w) for w in p.words) for p in thread.posts)
+    memory_encoded = sum(sys.getsizeof(a) for a in encoded.post_token_ids) \
+        + sum(sys.getsizeof(w) for w in encoded.vocabulary.words)
+    print()
+    print(f'Posts: {len(thread)} tokens: {token_count:,d} vocabulary: {len(encoded.vocabulary):,d}')
+    print(
+        f'Research x{REPEAT} common words {type(common_words).__name__:4s}: str: {time_str * 1000:8.1f} (ms) encoded: {time_encoded * 1000:8.1f} (ms)'
+        f' encoding: {time_encode * 1000:8.1f} (ms) ratio: {time_str / time_encoded:.2f}'
+    )
+    print(f'Token memory: str: {memory_str:,d} bytes encoded: {memory_encoded:,d} bytes')
+    if isinstance(common_words, list):
+        assert time_encoded < time_str
+
+
+@pytest.mark.slow
+def test_benchmark_analyse_thread_count_research():
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY)
+    thread.encoded()
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        _research_encoded(thread, COMMON_WORDS)
+    time_separate = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        analyse_thread.count_research(
+            thread, COMMON_WORDS, 2, non_cap_words=True, all_caps_min_size=2, phrase_lengths=range(2, 6),
+        )
+    time_single = time.perf_counter() - t_start
+    print()
+    print(
+        f'Research x{REPEAT}: separate passes: {time_separate * 1000:8.1f} (ms)'
+        f' single pass: {time_single * 1000:8.1f} (ms) ratio: {time_separate / time_single:.2f}'
+    )
@@ -0,0 +1,57 @@
+"""Benchmarks of the disk size and the parse time of compressed archived pages.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import os
+import time
+
+import pytest
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+AI171_PAGES = (
+    '666472-plane-crash-near-ahmedabad.html',
+    '666472-plane-crash-near-ahmedabad-2.html',
+)
+# Number of times each page is parsed.
+REPEAT = 5
+
+
+def _write_pages(directory, compression):
+    """Writes the AI171 example pages with the compression, returns the list of file paths."""
+    os.makedirs(directory, exist_ok=True)
+    file_paths = []
+    for file_name in AI171_PAGES:
+        with open(os.path.join(EXAMPLE_PAGES_DIRECTORY, file_name)) as file:
+            content = file.read()
+        file_path = read_html.archive_destination(directory, file_name, compression)
+        with read_html.open_archive_file(file_path, 'w') as file:
+            file.write(content)
+        file_paths.append(file_path)
+    return file_paths
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('engine', ('bs4', 'lxml'))
+@pytest.mark.parametrize('compression', (None, 'gzip', 'zstd'), ids=['none', 'gzip', 'zstd'])
+def test_benchmark_archive_compression(tmp_path, compression, engine):
+    if compression == 'zstd' and read_html.zstandard is None:
+        pytest.skip('zstandard is not installed.')
+    uncompressed_paths = _write_pages(str(tmp_path / 'none'), None) if compression else None
+    file_paths = _write_pages(str(tmp_path), compression)
+    disk_bytes = sum(os.path.getsize(p) for p in file_paths)
+    get_post_records = read_html.POST_RECORD_ENGINES[engine]
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        for file_path in file_paths:
+            records = get_post_records(file_path)
+            assert len(records) >= 20
+    time_exec = time.perf_counter() - t_start
+    print()
+    print(
+        f'Compression: {str(compression):5s} engine: {engine:5s} pages: {len(file_paths)}'
+        f' disk: {disk_bytes:10,d} bytes'
+        f' parse x{REPEAT}: {time_exec * 1000:8.1f} (ms) per page: {time_exec * 1000 / REPEAT / len(file_paths):8.1f} (ms)'
+    )
+    if uncompressed_paths is not None:
+        uncompressed_bytes = sum(os.path.getsize(p) for p in uncompressed_paths)
+        print(f'Compression ratio: {uncompressed_bytes / disk_bytes:.1f}')
+        assert disk_bytes < uncompressed_bytes
@@ -0,0 +1,63 @@
+"""Benchmarks of the peak memory and time of count_phrases() compared to count_phrases_streaming() on a synthetic
+thread.
+The words of the synthetic posts are independent so there are few frequent phrases, this is the worst case for the
+streaming summary. The result is exact if FREQ_GE > number of phrases / capacity, about 2.9 for 100,000.
+These are slow so run them with: pytest tests/benchmarks/test_benchmark_phrase_heavy_hitters.py --runslow -vs"""
+import time
+import tracemalloc
+
+import pytest
+from pprune import analyse_thread
+from pprune.common import read_html
+
+import synthetic_pages
+
+POST_COUNT = 5_000
+COMMON_WORDS = {'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'it'}
+FREQ_GE = 3
+
+
+@pytest.fixture(scope='module')
+def thread(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('synthetic'))
+    synthetic_pages.write_synthetic_thread(directory, synthetic_pages.SyntheticThreadConfig(post_count=POST_COUNT))
+    thread = read_html.read_whole_thread(directory, engine='lxml')
+    # Encode and filter the posts so that this is not included in either measurement.
+    analyse_thread.count_phrases(thread, COMMON_WORDS, 1, FREQ_GE)
+    return thread
+
+
+def _measure(function, *args):
+    """Returns the result, the time and the peak memory allocated by function(*args)."""
+    tracemalloc.start()
+    t_start = time.perf_counter()
+    result = function(*args)
+    time_exec = time.perf_counter() - t_start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, time_exec, peak
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('phrase_length', (3, 4, 5))
+@pytest.mark.parametrize('capacity', (10_000, 100_000))
+def test_benchmark_count_phrases_streaming(thread, phrase_length, capacity):
+    expected, time_exact, peak_exact = _measure(
+        analyse_thread.count_phrases, thread, COMMON_WORDS, phrase_length, FREQ_GE
+    )
+    result, time_streaming, peak_streaming = _measure(
+        analyse_thread.count_phrases_streaming, thread, COMMON_WORDS, phrase_length, FREQ_GE, capacity
+    )
+    for phrase, count in result.items():
+        assert expected[phrase] == count
+    print()
+    print(
+        f'Posts: {len(thread)} phrase length: {phrase_length} capacity: {capacity:6,d}'
+        f' phrases >= {FREQ_GE}: {len(expected):,d} found: {len(result):,d}'
+        f' recall: {len(result) / len(expected) if expected else 1.0:.3f}'
+    )
+    print(f'Exact    : {time_exact:8.3f} (s) peak memory: {peak_exact / 1024 ** 2:8.1f} (MB)')
+    print(
+        f'Streaming: {time_streaming:8.3f} (s) peak memory: {peak_streaming / 1024 ** 2:8.1f} (MB)'
+        f' ratio: {peak_exact / peak_streaming:.1f}'
+    )
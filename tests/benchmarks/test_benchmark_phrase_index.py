@@ -0,0 +1,41 @@
+"""Benchmarks of finding the repeated phrases of every length with one PhraseIndex compared to count_phrases() for
+each length on a synthetic thread.
+These are slow so run them with: pytest tests/benchmarks/test_benchmark_phrase_index.py --runslow -vs"""
+import time
+
+import pytest
+from pprune import analyse_thread
+from pprune.common import read_html
+
+import synthetic_pages
+
+COMMON_WORDS = {'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'it'}
+FREQ_GE = 3
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('post_count', (1_000, 5_000))
+def test_benchmark_phrase_index(tmp_path, post_count):
+    synthetic_pages.write_synthetic_thread(str(tmp_path), synthetic_pages.SyntheticThreadConfig(post_count=post_count))
+    thread = read_html.read_whole_thread(str(tmp_path), engine='lxml')
+    thread.encoded()
+    t_start = time.perf_counter()
+    result = analyse_thread.count_repeated_phrases(thread, COMMON_WORDS, FREQ_GE, min_length=1, maximal=False)
+    time_index = time.perf_counter() - t_start
+    max_length = max(len(phrase) for phrase in result)
+    t_start = time.perf_counter()
+    # One more than the longest phrase to show that there are none longer.
+    for phrase_length in range(1, max_length + 2):
+        expected = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, FREQ_GE)
+        assert {phrase: count for phrase, count in result.items() if len(phrase) == phrase_length} == expected
+    time_counts = time.perf_counter() - t_start
+    maximal = analyse_thread.count_repeated_phrases(thread, COMMON_WORDS, FREQ_GE, min_length=2, maximal=True)
+    print()
+    print(
+        f'Posts: {len(thread)} phrases >= {FREQ_GE}: {len(result):,d} maximal of length >= 2: {len(maximal):,d}'
+        f' longest: {max_length}'
+    )
+    print(f'PhraseIndex          : {time_index:8.3f} (s)')
+    print(
+        f'count_phrases() x{max_length + 1:<3d}: {time_counts:8.3f} (s) ratio: {time_counts / time_index:.1f}'
+    )
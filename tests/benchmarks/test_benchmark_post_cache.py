@@ -0,0 +1,32 @@
+"""Benchmarks of the post cache.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import os
+import time
+
+import pytest
+from pprune.common import post_cache
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('page_name', sorted(os.listdir(EXAMPLE_PAGES_DIRECTORY)))
+def test_benchmark_post_cache_load(tmp_path, page_name):
+    file_path = os.path.join(EXAMPLE_PAGES_DIRECTORY, page_name)
+    cache = post_cache.PostRecordCache(str(tmp_path))
+    t_start = time.perf_counter()
+    records = read_html.get_post_records_from_file_path(file_path)
+    time_parse = time.perf_counter() - t_start
+    cache.save(file_path, records)
+    t_start = time.perf_counter()
+    cached_records = cache.load(file_path)
+    time_load = time.perf_counter() - t_start
+    assert cached_records == records
+    print()
+    print(
+        f'{page_name:48s} {os.path.getsize(file_path):8,d} bytes'
+        f' cache file: {os.path.getsize(cache.cache_path(file_path)):8,d} bytes'
+        f' parse: {time_parse * 1000:8.1f} (ms) load: {time_load * 1000:8.3f} (ms)'
+    )
+    assert time_load < time_parse
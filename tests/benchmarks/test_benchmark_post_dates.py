@@ -0,0 +1,55 @@
+"""Benchmarks of parsing the date of each post with the fast path compared to dateparser.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import datetime
+import os
+import time
+
+import dateparser
+import pytest
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+# Number of times all the dates are parsed.
+REPEAT = 20
+
+
+def _date_texts():
+    """The text of the date node of every post in all the example pages."""
+    texts = []
+    for file_name in sorted(os.listdir(EXAMPLE_PAGES_DIRECTORY)):
+        for node in read_html.get_post_nodes_from_file_path(os.path.join(EXAMPLE_PAGES_DIRECTORY, file_name)):
+            date_node = node.find('div', **{"class": "tcell"})
+            if date_node is not None:
+                texts.append(date_node.text)
+    return texts
+
+
+def _date_from_text_dateparser(text):
+    """The original implementation of date_from_text()."""
+    ret = dateparser.parse(text.strip())
+    if ret is not None:
+        ret += datetime.timedelta(hours=12)
+    return ret
+
+
+@pytest.mark.slow
+def test_benchmark_post_dates():
+    texts = _date_texts()
+    assert [read_html.date_from_text(t) for t in texts] == [_date_from_text_dateparser(t) for t in texts]
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        for text in texts:
+            _date_from_text_dateparser(text)
+    time_dateparser = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        for text in texts:
+            read_html.date_from_text(text)
+    time_fast = time.perf_counter() - t_start
+    count = REPEAT * len(texts)
+    print()
+    print(
+        f'Dates: {len(texts)} x{REPEAT} dateparser: {time_dateparser * 1e6 / count:8.1f} (us/post)'
+        f' fast path: {time_fast * 1e6 / count:8.1f} (us/post) ratio: {time_dateparser / time_fast:.1f}'
+    )
+    assert time_fast < time_dateparser
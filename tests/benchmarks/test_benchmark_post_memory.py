@@ -0,0 +1,79 @@
+"""Benchmarks of the memory used by the posts of an AI171 sized thread.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import gc
+import os
+import time
+import tracemalloc
+import typing
+
+import pytest
+from pprune.common import read_html
+from pprune.common import thread_struct
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+AI171_PAGES = (
+    os.path.join(EXAMPLE_PAGES_DIRECTORY, '666472-plane-crash-near-ahmedabad.html'),
+    os.path.join(EXAMPLE_PAGES_DIRECTORY, '666472-plane-crash-near-ahmedabad-2.html'),
+)
+# The AI171 thread has about 3500 posts at 20 posts per page.
+# Tracing the memory allocations is slow so a smaller number of pages are read and the result is scaled to that.
+AI171_POST_COUNT = 3499
+BENCHMARK_PAGE_COUNT = 20
+
+
+def _posts_attached(file_path: str) -> typing.List[thread_struct.Post]:
+    """Each post node references the parse tree of the whole page."""
+    posts = [read_html.post_from_html_node(node) for node in read_html.get_post_nodes_from_file_path(file_path)]
+    return [p for p in posts if p is not None]
+
+
+def _posts_detached(file_path: str) -> typing.List[thread_struct.Post]:
+    """Each post node is detached from the parse tree of the page."""
+    posts = [
+        read_html.post_from_html_node(node, detach=True)
+        for node in read_html.get_post_nodes_from_file_path(file_path)
+    ]
+    return [p for p in posts if p is not None]
+
+
+def _posts_serialised(file_path: str) -> typing.List[thread_struct.Post]:
+    """Each post node is serialised HTML."""
+    posts = [read_html.post_from_record(r) for r in read_html.get_post_records_from_file_path_lxml(file_path)]
+    return [p for p in posts if p is not None]
+
+
+def _posts_serialised_parsed(file_path: str) -> typing.List[thread_struct.Post]:
+    """Each post node is serialised HTML that has been parsed."""
+    posts = _posts_serialised(file_path)
+    for post in posts:
+        post.node.node
+    return posts
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    'get_posts',
+    (_posts_attached, _posts_detached, _posts_serialised, _posts_serialised_parsed),
+    ids=['attached', 'detached', 'serialised', 'serialised_parsed'],
+)
+def test_benchmark_post_memory(get_posts):
+    """Posts are accumulated in a list rather than a Thread as the permalinks repeat."""
+    gc.collect()
+    tracemalloc.start()
+    t_start = time.perf_counter()
+    posts = []
+    for i in range(BENCHMARK_PAGE_COUNT):
+        posts.extend(get_posts(AI171_PAGES[i % len(AI171_PAGES)]))
+    time_exec = time.perf_counter() - t_start
+    gc.collect()
+    memory_current, memory_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print()
+    memory_per_post = memory_current / len(posts)
+    print(
+        f'{get_posts.__name__:28s} pages: {BENCHMARK_PAGE_COUNT:4d} posts: {len(posts):6,d}'
+        f' memory: {memory_current / 1024 ** 2:8.1f} (MB) peak: {memory_peak / 1024 ** 2:8.1f} (MB)'
+        f' per post: {memory_per_post / 1024:6.1f} (kB) time: {time_exec:6.1f} (s)'
+        f' AI171 estimate: {memory_per_post * AI171_POST_COUNT / 1024 ** 2:8.1f} (MB)'
+    )
+    assert len(posts) == BENCHMARK_PAGE_COUNT * 20
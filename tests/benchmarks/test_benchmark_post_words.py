@@ -0,0 +1,67 @@
+"""Benchmarks of the cached text and words of a Post.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import os
+import time
+
+import bs4
+import pytest
+from pprune import analyse_thread
+from pprune import publication_maps
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+
+
+def _access_post(post, publication_map, common_words, invalidate: bool) -> None:
+    """Access the post in the same way as write_html.pass_one(), main.py and write_html.write_subject_page().
+    If invalidate is True then the cache is discarded before each access, this is the equivalent of not caching."""
+    accesses = [
+        lambda: analyse_thread.match_words(
+            post, common_words, publication_map.get_lowercase_word_to_subject_map()
+        ),
+        lambda: analyse_thread.match_all_caps(
+            post, common_words, publication_map.get_uppercase_word_to_subject_map()
+        ),
+    ]
+    for phrase_length in publication_map.get_phrase_lengths():
+        accesses.append(
+            lambda pl=phrase_length: analyse_thread.match_phrases(
+                post, common_words, pl, publication_map.get_phrases_to_subject_map(pl)
+            )
+        )
+    accesses.append(lambda: len(post.words))
+    accesses.append(lambda: post.subject)
+    accesses.append(lambda: post.text_stripped_without_quoted_message)
+    for access in accesses:
+        if invalidate:
+            post.invalidate_cache()
+        access()
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('invalidate', (True, False), ids=['uncached', 'cached'])
+def test_benchmark_post_words_find_count(monkeypatch, invalidate):
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY)
+    publication_map = publication_maps.AirIndia171()
+    common_words = {'the', 'a', 'and', 'of', 'to', 'in'}
+    find_count = 0
+    tag_find = bs4.element.Tag.find
+
+    def counting_find(self, *args, **kwargs):
+        nonlocal find_count
+        find_count += 1
+        return tag_find(self, *args, **kwargs)
+
+    monkeypatch.setattr(bs4.element.Tag, 'find', counting_find)
+    t_start = time.perf_counter()
+    for post in thread.posts:
+        _access_post(post, publication_map, common_words, invalidate)
+    time_exec = time.perf_counter() - t_start
+    print()
+    print(
+        f'{"uncached" if invalidate else "cached":8s} posts: {len(thread):4d} find() calls: {find_count:6d}'
+        f' per post: {find_count / len(thread):6.1f} time: {time_exec * 1000:8.1f} (ms)'
+    )
+    if not invalidate:
+        # subject, text and text_stripped_without_quoted_message
+        assert find_count == 3 * len(thread)
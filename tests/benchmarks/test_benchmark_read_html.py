@@ -0,0 +1,47 @@
+"""Benchmarks of reading archived pages.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import io
+import os
+import time
+
+import pytest
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+EXAMPLE_PAGE_NAMES = sorted(os.listdir(EXAMPLE_PAGES_DIRECTORY))
+REPEAT = 5
+
+
+def _read_page(page_name: str) -> str:
+    with open(os.path.join(EXAMPLE_PAGES_DIRECTORY, page_name), errors='backslashreplace') as file:
+        return file.read()
+
+
+def _records_bs4(html_str: str):
+    post_nodes = read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    return [read_html.post_record_from_html_node(node) for node in post_nodes]
+
+
+def _best_time(function, *args) -> float:
+    """Returns the minimum time of REPEAT calls."""
+    times = []
+    for _i in range(REPEAT):
+        t_start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - t_start)
+    return min(times)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+def test_benchmark_extract_post_records(page_name):
+    html_str = _read_page(page_name)
+    time_bs4 = _best_time(_records_bs4, html_str)
+    time_lxml = _best_time(read_html.get_post_records_from_string_lxml, html_str)
+    print()
+    print(
+        f'{page_name:48s} {len(html_str):8,d} bytes'
+        f' bs4: {time_bs4 * 1000:8.1f} (ms) lxml: {time_lxml * 1000:8.1f} (ms)'
+        f' speedup: x{time_bs4 / time_lxml:.1f}'
+    )
+    assert time_lxml < time_bs4
@@ -0,0 +1,100 @@
+"""Benchmarks of research_nlp with one nlp() call per post and the full pipeline compared to batched nlp.pipe() with
+only the components that are needed.
+These need spaCy and en_core_web_sm and are slow so run them with:
+pytest tests/benchmarks/test_benchmark_research_nlp.py --runslow -vs"""
+import collections
+import os
+import time
+
+import pytest
+
+spacy = pytest.importorskip('spacy')
+if not spacy.util.is_package('en_core_web_sm'):  # pragma: no cover
+    pytest.skip('en_core_web_sm is not installed.', allow_module_level=True)
+
+from pprune import research_nlp  # noqa: E402
+from pprune.common import doc_cache  # noqa: E402
+from pprune.common import read_html  # noqa: E402
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+
+
+def _analyse_posts_one_by_one(nlp, thread):
+    """The previous implementation of research_nlp.process_thread(), one nlp() call per post."""
+    entity_label_map = {}
+    nouns = collections.Counter()
+    verbs = collections.Counter()
+    for p, post in enumerate(thread.posts):
+        doc = nlp(post.text_stripped_without_quoted_message)
+        nouns.update([chunk.text for chunk in doc.noun_chunks])
+        verbs.update([token.lemma_ for token in doc if token.pos_ == "VERB"])
+        for entity in doc.ents:
+            if entity.label_ not in entity_label_map:
+                entity_label_map[entity.label_] = collections.defaultdict(list)
+            entity_label_map[entity.label_][entity.text].append(p)
+    return nouns, verbs, entity_label_map
+
+
+@pytest.fixture(scope='module')
+def thread():
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY, engine='lxml')
+    for post in thread.posts:
+        assert post.text_stripped_without_quoted_message is not None
+    return thread
+
+
+@pytest.mark.slow
+def test_benchmark_research_nlp_all_outputs(thread):
+    nlp = spacy.load(research_nlp.MODEL_NAME)
+    t_start = time.perf_counter()
+    expected = _analyse_posts_one_by_one(nlp, thread)
+    time_before = time.perf_counter() - t_start
+    nlp = research_nlp.load_pipeline(True, True, True)
+    t_start = time.perf_counter()
+    result = research_nlp.analyse_posts(nlp, thread, True, True, True)
+    time_after = time.perf_counter() - t_start
+    assert result == expected
+    print()
+    print(f'Posts: {len(thread)}')
+    print(f'nlp() per post : {time_before:8.3f} (s) {len(thread) / time_before:8.1f} (posts/s)')
+    print(f'nlp.pipe()     : {time_after:8.3f} (s) {len(thread) / time_after:8.1f} (posts/s)')
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    'collect_nouns, collect_verbs, collect_entities',
+    (
+        (True, False, False),
+        (False, True, False),
+        (False, False, True),
+    )
+)
+@pytest.mark.parametrize('batch_size', (32, research_nlp.DEFAULT_BATCH_SIZE))
+def test_benchmark_research_nlp_components(thread, collect_nouns, collect_verbs, collect_entities, batch_size):
+    nlp = research_nlp.load_pipeline(collect_nouns, collect_verbs, collect_entities)
+    t_start = time.perf_counter()
+    research_nlp.analyse_posts(nlp, thread, collect_nouns, collect_verbs, collect_entities, batch_size=batch_size)
+    time_exec = time.perf_counter() - t_start
+    print()
+    print(
+        f'Components: {nlp.pipe_names} batch size: {batch_size:4d}'
+        f' {time_exec:8.3f} (s) {len(thread) / time_exec:8.1f} (posts/s)'
+    )
+
+
+@pytest.mark.slow
+def test_benchmark_research_nlp_doc_cache(thread, tmp_path):
+    nlp = research_nlp.load_pipeline(True, True, True)
+    times = []
+    results = []
+    for _i in range(2):
+        cache = doc_cache.DocCache(str(tmp_path / 'docs'), nlp)
+        t_start = time.perf_counter()
+        results.append(research_nlp.analyse_posts(nlp, thread, True, True, True, cache=cache))
+        times.append(time.perf_counter() - t_start)
+    assert results[0] == results[1]
+    assert (cache.hits, cache.misses) == (len(thread), 0)
+    print()
+    print(f'Posts: {len(thread)}')
+    print(f'Empty cache : {times[0]:8.3f} (s) {len(thread) / times[0]:8.1f} (posts/s)')
+    print(f'Full cache  : {times[1]:8.3f} (s) {len(thread) / times[1]:8.1f} (posts/s)')
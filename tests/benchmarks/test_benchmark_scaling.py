@@ -0,0 +1,119 @@
+"""Benchmarks of read_html, analyse_thread and write_html on synthetic threads of 1k, 10k and 100k posts.
+The timings are appended to RESULTS_FILE and compared with the previous run, see benchmark_results.py.
+These are slow so run them with: pytest tests/benchmarks/test_benchmark_scaling.py --runslow -vs"""
+import os
+import time
+
+import pytest
+from pprune import analyse_thread
+from pprune import publication_maps
+from pprune import write_html
+from pprune.common import post_cache
+from pprune.common import read_html
+
+import benchmark_results
+import synthetic_pages
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), 'results', 'scaling.json')
+POST_COUNTS = (1_000, 10_000, 100_000)
+# BeautifulSoup is too slow to read the largest thread in a reasonable time.
+BS4_MAX_POST_COUNT = 10_000
+COMMON_WORDS = {'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'it'}
+
+
+@pytest.fixture(scope='module')
+def results():
+    benchmark = benchmark_results.BenchmarkResults(RESULTS_FILE)
+    yield benchmark
+    benchmark.save()
+
+
+@pytest.fixture(scope='module', params=POST_COUNTS, ids=lambda n: f'{n}_posts')
+def synthetic_thread_directory(request, tmp_path_factory, results):
+    """The directory of the pages of a synthetic thread and the post count."""
+    post_count = request.param
+    directory = str(tmp_path_factory.mktemp(f'synthetic_{post_count}'))
+    t_start = time.perf_counter()
+    synthetic_pages.write_synthetic_thread(
+        os.path.join(directory, 'pages'), synthetic_pages.SyntheticThreadConfig(post_count=post_count),
+    )
+    print()
+    print(results.add('generate', post_count, time.perf_counter() - t_start))
+    return directory, post_count
+
+
+def _thread(directory):
+    """Reads the synthetic thread from the PostRecordCache and computes the words of every post.
+    This is not timed, it gives each benchmark the same starting point as after read_html."""
+    cache = post_cache.PostRecordCache(os.path.join(directory, 'cache'))
+    thread = read_html.read_whole_thread(os.path.join(directory, 'pages'), engine='lxml', cache=cache)
+    for post in thread.posts:
+        assert post.words is not None
+    return thread
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('engine', ('lxml', 'bs4'))
+def test_benchmark_scaling_read_html(synthetic_thread_directory, results, engine):
+    directory, post_count = synthetic_thread_directory
+    if engine == 'bs4' and post_count > BS4_MAX_POST_COUNT:
+        pytest.skip(f'bs4 is too slow for {post_count} posts.')
+    t_start = time.perf_counter()
+    thread = read_html.read_whole_thread(os.path.join(directory, 'pages'), engine=engine)
+    time_exec = time.perf_counter() - t_start
+    assert len(thread) == post_count
+    print()
+    print(results.add(f'read_html[{engine}]', post_count, time_exec))
+
+
+@pytest.mark.slow
+def test_benchmark_scaling_words(synthetic_thread_directory, results):
+    directory, post_count = synthetic_thread_directory
+    cache = post_cache.PostRecordCache(os.path.join(directory, 'cache'))
+    thread = read_html.read_whole_thread(os.path.join(directory, 'pages'), engine='lxml', cache=cache)
+    t_start = time.perf_counter()
+    word_count = sum(len(post.words) for post in thread.posts)
+    time_exec = time.perf_counter() - t_start
+    assert word_count > post_count
+    print()
+    print(results.add('Post.words', post_count, time_exec))
+
+
+@pytest.mark.slow
+def test_benchmark_scaling_analyse_thread(synthetic_thread_directory, results):
+    directory, post_count = synthetic_thread_directory
+    thread = _thread(directory)
+    t_start = time.perf_counter()
+    assert analyse_thread.count_non_cap_words(thread, COMMON_WORDS, 2)
+    assert analyse_thread.count_all_caps(thread, 2, 2)
+    for phrase_length in range(2, 6):
+        analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, 2)
+    time_exec = time.perf_counter() - t_start
+    print()
+    print(results.add('analyse_thread', post_count, time_exec))
+
+
+@pytest.mark.slow
+def test_benchmark_scaling_pass_one(synthetic_thread_directory, results):
+    directory, post_count = synthetic_thread_directory
+    thread = _thread(directory)
+    t_start = time.perf_counter()
+    pass_one_result = write_html.pass_one(thread, COMMON_WORDS, publication_maps.AirIndia171())
+    time_exec = time.perf_counter() - t_start
+    assert pass_one_result.subject_post_map
+    print()
+    print(results.add('pass_one', post_count, time_exec))
+
+
+@pytest.mark.slow
+def test_benchmark_scaling_write_html(synthetic_thread_directory, results):
+    directory, post_count = synthetic_thread_directory
+    thread = _thread(directory)
+    output_path = os.path.join(directory, 'output')
+    os.makedirs(output_path, exist_ok=True)
+    t_start = time.perf_counter()
+    write_html.write_whole_thread(thread, COMMON_WORDS, publication_maps.AirIndia171(), output_path)
+    time_exec = time.perf_counter() - t_start
+    assert os.path.exists(os.path.join(output_path, 'index.html'))
+    print()
+    print(results.add('write_html', post_count, time_exec))
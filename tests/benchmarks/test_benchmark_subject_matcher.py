@@ -0,0 +1,56 @@
+"""Benchmarks of matching the subjects of a publication map against every post.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import os
+import time
+
+import pytest
+from pprune import analyse_thread
+from pprune import publication_maps
+from pprune.common import read_html
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+COMMON_WORDS = {
+    'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'you', 'it', 'not',
+    'or', 'be', 'are', 'from', 'at', 'as', 'your', 'all', 'have', 'new', 'more', 'an', 'was', 'we', 'will', 'can',
+}
+# Number of times every post is matched.
+REPEAT = 20
+
+
+def _match_subjects(post, common_words, publication_map):
+    """The original implementation in write_html.pass_one()."""
+    subjects = set()
+    subjects |= analyse_thread.match_words(post, common_words, publication_map.get_lowercase_word_to_subject_map())
+    subjects |= analyse_thread.match_all_caps(post, common_words, publication_map.get_uppercase_word_to_subject_map())
+    for phrase_length in publication_map.get_phrase_lengths():
+        phrase_map = publication_map.get_phrases_to_subject_map(phrase_length)
+        subjects |= analyse_thread.match_phrases(post, common_words, phrase_length, phrase_map)
+    return subjects
+
+
+@pytest.mark.slow
+def test_benchmark_subject_matcher():
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY)
+    publication_map = publication_maps.AirIndia171()
+    # Populate the cached words so that this is not included in either timing.
+    for post in thread.posts:
+        post.words
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        expected = [_match_subjects(post, COMMON_WORDS, publication_map) for post in thread.posts]
+    time_functions = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    matcher = analyse_thread.SubjectMatcher.from_publication_map(publication_map, COMMON_WORDS)
+    time_compile = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        result = [matcher.match(post.words) for post in thread.posts]
+    time_matcher = time.perf_counter() - t_start
+    assert result == expected
+    print()
+    print(
+        f'Posts: {len(thread)} x{REPEAT} match functions: {time_functions * 1000:8.1f} (ms)'
+        f' SubjectMatcher: {time_matcher * 1000:8.1f} (ms) compile: {time_compile * 1000:8.3f} (ms)'
+        f' ratio: {time_functions / time_matcher:.1f}'
+    )
+    assert time_matcher < time_functions
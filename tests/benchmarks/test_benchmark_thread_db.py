@@ -0,0 +1,46 @@
+"""Benchmarks of loading a thread from a thread database compared to parsing the archived pages.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import os
+import time
+
+import pytest
+from pprune.common import read_html
+from pprune.common import thread_db
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+# Number of times the thread is loaded.
+REPEAT = 5
+
+
+def _load(function, *args, **kwargs):
+    """Loads the thread REPEAT times and computes the text of every post, returns the thread and the time per load."""
+    t_start = time.perf_counter()
+    for _i in range(REPEAT):
+        thread = function(*args, **kwargs)
+        for post in thread.posts:
+            assert post.words is not None
+            assert post.text_stripped_without_quoted_message is not None
+    return thread, (time.perf_counter() - t_start) / REPEAT
+
+
+@pytest.mark.slow
+def test_benchmark_thread_db(tmp_path):
+    database_path = str(tmp_path / 'thread.sqlite')
+    thread = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY)
+    t_start = time.perf_counter()
+    thread_db.write_thread(database_path, thread)
+    time_write = time.perf_counter() - t_start
+    times = {}
+    for engine in ('bs4', 'lxml'):
+        _thread, times[engine] = _load(read_html.read_whole_thread, EXAMPLE_PAGES_DIRECTORY, engine=engine)
+    result, time_db = _load(thread_db.read_thread, database_path)
+    assert [p.permalink for p in result.posts] == [p.permalink for p in thread.posts]
+    print()
+    print(
+        f'Posts: {len(thread)} database: {os.path.getsize(database_path):10,d} bytes'
+        f' write: {time_write * 1000:8.1f} (ms)'
+    )
+    for engine, time_exec in times.items():
+        print(f'Load with {engine:5s}: {time_exec * 1000:8.1f} (ms) ratio to database: {time_exec / time_db:.1f}')
+    print(f'Load database  : {time_db * 1000:8.1f} (ms)')
+    assert time_db < min(times.values())
@@ -0,0 +1,75 @@
+"""Benchmarks of the per user aggregates on synthetic threads compared to scanning the thread for each user.
+These are slow so run them with: pytest tests/benchmarks --runslow -vs"""
+import datetime
+import os
+import time
+
+import pytest
+from pprune import write_html
+from pprune.common import read_html
+from pprune.common import thread_struct
+
+EXAMPLE_PAGES_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, 'integration', 'example_pages')
+# Average number of posts per user.
+POSTS_PER_USER = 20
+# Number of users that are scanned to estimate the time of the original per user scan.
+SCAN_SAMPLE = 50
+
+
+def _synthetic_thread(example_posts, post_count):
+    """A thread of post_count posts that repeat the example posts with distinct permalinks and users.
+    The text of each post is primed so the HTML is not parsed."""
+    user_count = post_count // POSTS_PER_USER
+    thread = thread_struct.Thread()
+    timestamp = datetime.datetime(2025, 6, 12, 12, 0)
+    for i in range(post_count):
+        example = example_posts[i % len(example_posts)]
+        user_name = f'user{(i * 7919) % user_count}'
+        post = thread_struct.Post(
+            timestamp + datetime.timedelta(minutes=i),
+            f'https://www.pprune.org/synthetic.html#post{i}',
+            thread_struct.User(f'https://www.pprune.org/members/{i % user_count}-{user_name}', user_name),
+            example.node,
+            i,
+            example.liked_by_users,
+        )
+        post.prime_cache(text=example.text, subject=example.subject)
+        thread.add_post(post)
+    return thread
+
+
+def _pass_one_result(thread):
+    """A PassOneResult with the posts added but no subjects, this avoids the time of subject matching."""
+    pass_one_result = write_html.PassOneResult()
+    for i, post in enumerate(thread.posts):
+        pass_one_result.add_subject_post(set(), i, post.sequence_num, post.user.name)
+    return pass_one_result
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('post_count', (10_000, 30_000, 100_000))
+def test_benchmark_user_aggregates(post_count):
+    example_posts = read_html.read_whole_thread(EXAMPLE_PAGES_DIRECTORY).posts
+    thread = _synthetic_thread(example_posts, post_count)
+    pass_one_result = _pass_one_result(thread)
+    user_names = list(pass_one_result.user_ordinal_map.keys())
+    # The original up-vote count in write_user_page() for a sample of the users.
+    t_start = time.perf_counter()
+    expected = {
+        user_name: sum(len(p.liked_by_users) for p in thread.posts if p.user.name == user_name)
+        for user_name in user_names[:SCAN_SAMPLE]
+    }
+    time_scan = (time.perf_counter() - t_start) * len(user_names) / SCAN_SAMPLE
+    t_start = time.perf_counter()
+    pass_one_result.add_user_aggregates(thread)
+    time_aggregates = time.perf_counter() - t_start
+    for user_name, up_votes in expected.items():
+        assert pass_one_result.user_aggregates[user_name].up_votes == up_votes
+    print()
+    print(
+        f'Posts: {post_count:8,d} users: {len(user_names):6,d}'
+        f' scan per user (estimated): {time_scan * 1000:10.1f} (ms)'
+        f' aggregates: {time_aggregates * 1000:8.1f} (ms)'
+        f' ratio: {time_scan / time_aggregates:8.1f}'
+    )
+    assert time_aggregates < time_scan
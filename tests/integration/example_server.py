@@ -0,0 +1,153 @@
+"""A local HTTP stand-in for pprune that serves a thread made from the example pages."""
+import collections
+import email.utils
+import hashlib
+import http.server
+import re
+import threading
+import time
+import typing
+
+import example_data
+
+THREAD_PATH = '/accidents-close-calls/666472-plane-crash-near-ahmedabad'
+FIRST_PAGE = '666472-plane-crash-near-ahmedabad.html'
+OTHER_PAGE = '666472-plane-crash-near-ahmedabad-2.html'
+RE_PAGE_LAST = re.compile(r'(id="mb_pagelast"[^>]*?href=")[^"]*(")')
+RE_PATH = re.compile(re.escape(THREAD_PATH) + r'(?:-(\d+))?\.html')
+LAST_MODIFIED = 'Sat, 12 Jul 2025 10:00:00 GMT'
+
+
+class ExampleThreadServer:
+    """Serves a thread of page_count pages, the first page is the first example page and the others are the second.
+    The last page link is rewritten to point to this server.
+
+    Usage::
+
+        with ExampleThreadServer(page_count=3) as server:
+            text = requests.get(server.url(1)).text
+    """
+
+    def __init__(self, page_count: int, delay: float = 0.0, validators: bool = True):
+        self.page_count = page_count
+        # Delay in seconds before each response.
+        self.delay = delay
+        # If True the responses have an ETag and Last-Modified and conditional requests are supported.
+        self.validators = validators
+        # Map of {page_number: content, ...} that replaces the example page content.
+        self.content: typing.Dict[int, str] = {}
+        # Map of {page_number: Last-Modified, ...}, the default is LAST_MODIFIED.
+        self.last_modified: typing.Dict[int, str] = {}
+        # Map of {path: count, ...} of 304 (Not Modified) responses.
+        self.not_modified_counts: typing.Dict[str, int] = collections.Counter()
+        # Map of {path: count, ...} of requests.
+        self.request_counts: typing.Dict[str, int] = collections.Counter()
+        # Map of {path: (status, count), ...} of the number of requests that fail with that status.
+        self.failures: typing.Dict[str, typing.Tuple[int, int]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @staticmethod
+    def path(page_number: int) -> str:
+        if page_number == 1:
+            return f'{THREAD_PATH}.html'
+        return f'{THREAD_PATH}-{page_number}.html'
+
+    def url(self, page_number: int) -> str:
+        return self.base_url + self.path(page_number)
+
+    def page_content(self, page_number: int) -> str:
+        if page_number in self.content:
+            return self.content[page_number]
+        example_page = FIRST_PAGE if page_number == 1 else OTHER_PAGE
+        return RE_PAGE_LAST.sub(
+            lambda m: m.group(1) + self.url(self.page_count) + m.group(2), example_data.EXAMPLE_PAGES[example_page],
+        )
+
+    def set_page_content(self, page_number: int, content: str, last_modified: str) -> None:
+        self.content[page_number] = content
+        self.last_modified[page_number] = last_modified
+
+    def fail(self, page_number: int, status: int, count: int) -> None:
+        """The next count requests for the page fail with the HTTP status."""
+        self.failures[self.path(page_number)] = (status, count)
+
+    def _handler_class(self) -> typing.Type[http.server.BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.request_counts[self.path] += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.delay)
+                    self._respond()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _respond(self):
+                match = RE_PATH.fullmatch(self.path)
+                page_number = int(match.group(1) or 1) if match is not None else 0
+                if not 1 <= page_number <= server.page_count:
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    status, count = server.failures.get(self.path, (200, 0))
+                    if count:
+                        server.failures[self.path] = (status, count - 1)
+                if count:
+                    self.send_error(status)
+                    return
+                content = server.page_content(page_number).encode('utf-8')
+                etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+                last_modified = server.last_modified.get(page_number, LAST_MODIFIED)
+                if server.validators:
+                    if_none_match = self.headers.get('If-None-Match')
+                    if_modified_since = self.headers.get('If-Modified-Since')
+                    if if_none_match is not None:
+                        not_modified = if_none_match == etag
+                    elif if_modified_since is not None:
+                        not_modified = email.utils.parsedate_to_datetime(if_modified_since) >= \
+                            email.utils.parsedate_to_datetime(last_modified)
+                    else:
+                        not_modified = False
+                    if not_modified:
+                        with server._lock:
+                            server.not_modified_counts[self.path] += 1
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                if server.validators:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
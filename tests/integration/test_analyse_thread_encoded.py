@@ -0,0 +1,182 @@
+"""Checks that the token ID implementations in analyse_thread give identical results to the original string
+implementations that are reproduced here."""
+import collections
+
+import pytest
+from pprune import analyse_thread
+from pprune.common import read_html
+
+import example_data
+
+COMMON_WORDS = {
+    'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'you', 'it', 'not',
+    'or', 'be', 'are', 'from', 'at', 'as', 'your', 'all', 'have', 'new', 'more', 'an', 'was', 'we', 'will', 'can',
+}
+
+
+def _count_non_cap_words(thread, common_words, freq_ge):
+    word_counter = collections.Counter()
+    all_users = thread.all_users
+    for post in thread.posts:
+        trimmed_words = [
+            word for word in post.words
+            if word.lower() not in common_words and word not in all_users and word.upper() != word
+        ]
+        word_counter.update(trimmed_words)
+    return analyse_thread.filter_counter(word_counter, freq_ge)
+
+
+def _count_phrases(thread, common_words, phrase_length, freq_ge):
+    phrase_counter = collections.Counter()
+    for post in thread.posts:
+        trimmed_words = post.significant_words(common_words)
+        phrases = []
+        for i in range(len(trimmed_words) - (phrase_length - 1)):
+            phrases.append(tuple(trimmed_words[i:i + phrase_length]))
+        phrase_counter.update(phrases)
+    return analyse_thread.filter_counter(phrase_counter, freq_ge)
+
+
+def _count_all_caps(thread, min_size, freq_ge):
+    word_counter = collections.Counter()
+    for post in thread.posts:
+        word_counter.update(post.cap_words(min_size))
+    return analyse_thread.filter_counter(word_counter, freq_ge)
+
+
+def _threads():
+    threads = {
+        name: read_html.get_thread_from_html_string(html_str)
+        for name, html_str in sorted(example_data.EXAMPLE_PAGES.items())
+    }
+    threads['whole_thread'] = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    return threads
+
+
+THREADS = _threads()
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('freq_ge', (1, 3,))
+def test_count_non_cap_words_encoded(thread_name, freq_ge):
+    thread = THREADS[thread_name]
+    expected = _count_non_cap_words(thread, COMMON_WORDS, freq_ge)
+    result = analyse_thread.count_non_cap_words(thread, COMMON_WORDS, freq_ge)
+    assert result == expected
+    assert result.most_common() == expected.most_common()
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('phrase_length', (1, 2, 3, 4,))
+@pytest.mark.parametrize('freq_ge', (1, 2,))
+def test_count_phrases_encoded(thread_name, phrase_length, freq_ge):
+    thread = THREADS[thread_name]
+    expected = _count_phrases(thread, COMMON_WORDS, phrase_length, freq_ge)
+    result = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, freq_ge)
+    assert result == expected
+    assert result.most_common() == expected.most_common()
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('min_size', (0, 2, 4,))
+@pytest.mark.parametrize('freq_ge', (1, 2,))
+def test_count_all_caps_encoded(thread_name, min_size, freq_ge):
+    thread = THREADS[thread_name]
+    expected = _count_all_caps(thread, min_size, freq_ge)
+    result = analyse_thread.count_all_caps(thread, min_size, freq_ge)
+    assert result == expected
+    assert result.most_common() == expected.most_common()
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('freq_ge', (1, 2,))
+def test_count_research(thread_name, freq_ge):
+    thread = THREADS[thread_name]
+    result = analyse_thread.count_research(
+        thread, COMMON_WORDS, freq_ge, non_cap_words=True, all_caps_min_size=2, phrase_lengths=(1, 2, 3, 4),
+    )
+    expected = analyse_thread.count_non_cap_words(thread, COMMON_WORDS, freq_ge)
+    assert result.non_cap_words.most_common() == expected.most_common()
+    expected = analyse_thread.count_all_caps(thread, 2, freq_ge)
+    assert result.all_caps.most_common() == expected.most_common()
+    assert sorted(result.phrases) == [1, 2, 3, 4]
+    for phrase_length, phrase_counter in result.phrases.items():
+        expected = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, freq_ge)
+        assert phrase_counter.most_common() == expected.most_common()
+
+
+def test_count_research_not_requested():
+    result = analyse_thread.count_research(THREADS['whole_thread'], COMMON_WORDS, 1)
+    assert result == analyse_thread.ResearchCounts()
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('phrase_length', (1, 2, 3, 4,))
+@pytest.mark.parametrize('freq_ge', (2, 3,))
+def test_count_phrases_streaming(thread_name, phrase_length, freq_ge):
+    thread = THREADS[thread_name]
+    expected = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, freq_ge)
+    # Large enough for an exact result.
+    result = analyse_thread.count_phrases_streaming(thread, COMMON_WORDS, phrase_length, freq_ge, 1000)
+    assert result.most_common() == expected.most_common()
+
+
+@pytest.mark.parametrize('phrase_length', (1, 2, 3,))
+@pytest.mark.parametrize('capacity', (20, 200,))
+def test_count_phrases_streaming_small_capacity(phrase_length, capacity, caplog):
+    thread = THREADS['whole_thread']
+    expected = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, 1)
+    result = analyse_thread.count_phrases_streaming(thread, COMMON_WORDS, phrase_length, 1, capacity)
+    assert 'may be missing' in caplog.text
+    assert len(result) < len(expected)
+    # The counts are exact and no phrase with a count greater than total / capacity is missing.
+    for phrase, count in result.items():
+        assert expected[phrase] == count
+    for phrase, count in expected.items():
+        if count > sum(expected.values()) / capacity:
+            assert result[phrase] == count
+
+
+def test_count_research_phrase_capacity():
+    thread = THREADS['whole_thread']
+    expected = analyse_thread.count_research(thread, COMMON_WORDS, 2, phrase_lengths=(2, 3))
+    result = analyse_thread.count_research(thread, COMMON_WORDS, 2, phrase_lengths=(2, 3), phrase_capacity=1000)
+    assert result == expected
+
+
+@pytest.mark.parametrize('thread_name', sorted(THREADS.keys()))
+@pytest.mark.parametrize('freq_ge', (2, 3,))
+def test_count_repeated_phrases(thread_name, freq_ge):
+    thread = THREADS[thread_name]
+    result = analyse_thread.count_repeated_phrases(thread, COMMON_WORDS, freq_ge, min_length=1, maximal=False)
+    max_length = max(len(phrase) for phrase in result)
+    for phrase_length in range(1, max_length + 2):
+        expected = analyse_thread.count_phrases(thread, COMMON_WORDS, phrase_length, freq_ge)
+        assert {phrase: count for phrase, count in result.items() if len(phrase) == phrase_length} == expected
+
+
+def test_count_repeated_phrases_maximal():
+    thread = THREADS['whole_thread']
+    result = analyse_thread.count_repeated_phrases(thread, COMMON_WORDS, 3, maximal=True)
+    # 'by' is a common word.
+    assert result.most_common(1) == [(('Quote', 'Originally', 'Posted'), 14)]
+    # The sub-phrases always occur within it.
+    assert ('Quote', 'Originally') not in result
+    assert ('Originally', 'Posted') not in result
+    assert min(len(phrase) for phrase in result) == 2
+
+
+def test_thread_encoded_add_post():
+    """Adding posts after encoded() has been called keeps the encoding up to date."""
+    posts = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY).posts
+    thread = read_html.get_thread_from_html_string(
+        example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad.html']
+    )
+    encoded = thread.encoded()
+    assert len(encoded.post_token_ids) == 20
+    for post in posts[20:]:
+        thread.add_post(post)
+    assert thread.encoded() is encoded
+    assert len(encoded.post_token_ids) == 40
+    for post, token_ids in zip(thread.posts, encoded.post_token_ids):
+        assert encoded.vocabulary.decode(token_ids) == post.words
@@ -0,0 +1,119 @@
+"""Checks that SubjectMatcher gives identical results to match_words(), match_all_caps() and match_phrases()."""
+import datetime
+import random
+
+import pytest
+from pprune import analyse_thread
+from pprune import publication_maps
+from pprune.common import read_html
+from pprune.common import thread_struct
+
+import example_data
+
+COMMON_WORDS = {
+    'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'i', 'you', 'it', 'not',
+    'or', 'be', 'are', 'from', 'at', 'as', 'your', 'all', 'have', 'new', 'more', 'an', 'was', 'we', 'will', 'can',
+}
+
+
+def _match_subjects(post, common_words, word_map, caps_map, phrase_maps):
+    """The original implementation in write_html.pass_one()."""
+    subjects = set()
+    subjects |= analyse_thread.match_words(post, common_words, word_map)
+    subjects |= analyse_thread.match_all_caps(post, common_words, caps_map)
+    for phrase_length, phrase_map in phrase_maps.items():
+        subjects |= analyse_thread.match_phrases(post, common_words, phrase_length, phrase_map)
+    return subjects
+
+
+def _post_from_words(words):
+    html = f'<div class="tcell alt1" id="td_post_1"><div id="post_message_1">{" ".join(words)}</div></div>'
+    return thread_struct.Post(
+        datetime.datetime(2025, 1, 1), 'permalink#post1', 'user', thread_struct.SerialisedNode(html), 1, [],
+    )
+
+
+def _ai171_maps():
+    publication_map = publication_maps.AirIndia171()
+    return (
+        publication_map.get_lowercase_word_to_subject_map(),
+        publication_map.get_uppercase_word_to_subject_map(),
+        {
+            phrase_length: publication_map.get_phrases_to_subject_map(phrase_length)
+            for phrase_length in publication_map.get_phrase_lengths()
+        },
+    )
+
+
+@pytest.mark.parametrize('common_words', (COMMON_WORDS, set()), ids=['common_words', 'no_common_words'])
+def test_subject_matcher_example_pages(common_words):
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    word_map, caps_map, phrase_maps = _ai171_maps()
+    matcher = analyse_thread.SubjectMatcher(common_words, word_map, caps_map, phrase_maps)
+    match_count = 0
+    for post in thread.posts:
+        expected = _match_subjects(post, common_words, word_map, caps_map, phrase_maps)
+        assert matcher.match(post.words) == expected
+        match_count += len(expected)
+    assert match_count > 0
+
+
+def test_subject_matcher_from_publication_map():
+    publication_map = publication_maps.AirIndia171()
+    matcher = analyse_thread.SubjectMatcher.from_publication_map(publication_map, COMMON_WORDS)
+    assert matcher.match(['The', 'RAT', 'deployed', 'after', 'the', 'engine', 'failure']) == {
+        'RAT (All)', 'RAT (Deployment)', 'Engine Failure (All)',
+    }
+
+
+OVERLAPPING_MAPS = (
+    {'the'},
+    {'c': 'C'},
+    {'A': 'A (caps)', 'AB': 'AB (caps)', 'Z': 'Z (caps)'},
+    {2: {('a', 'b'): 'AB', ('b', 'c'): 'BC'}, 3: {('a', 'b', 'c'): 'ABC', ('b', 'c'): 'Wrong length'}},
+)
+
+
+@pytest.mark.parametrize(
+    'words, expected',
+    (
+            ([], set()),
+            (['a', 'b'], {'AB'}),
+            (['a', 'x', 'b'], set()),
+            # The common word is removed before matching phrases.
+            (['a', 'the', 'b'], {'AB'}),
+            (['a', 'b', 'c'], {'AB', 'ABC', 'BC', 'C'}),
+            (['x', 'b', 'c'], {'BC', 'C'}),
+            (['AB', 'b', 'c'], {'BC', 'C', 'AB (caps)'}),
+            # A single character is not matched as caps.
+            (['A', 'Z'], set()),
+            # Lower case map keys are not matched against all caps words.
+            (['C'], set()),
+            (['a', 'a', 'b'], {'AB'}),
+    ),
+)
+def test_subject_matcher_overlapping(words, expected):
+    matcher = analyse_thread.SubjectMatcher(*OVERLAPPING_MAPS)
+    assert matcher.match(words) == expected
+    assert _match_subjects(_post_from_words(words), *OVERLAPPING_MAPS) == expected
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_subject_matcher_random(seed):
+    """Random maps and words from a small vocabulary so that there are many overlapping matches."""
+    rng = random.Random(seed)
+    vocabulary = ['a', 'b', 'c', 'd', 'A', 'B', 'AB', 'Ab', 'the']
+    common_words = {'the', 'd'}
+    word_map = {w: f'word {w}' for w in rng.sample(vocabulary, 3)}
+    caps_map = {w: f'caps {w}' for w in rng.sample(vocabulary, 3)}
+    phrase_maps = {}
+    for phrase_length in (2, 3, 4):
+        phrase_maps[phrase_length] = {
+            tuple(rng.choice(vocabulary) for _i in range(phrase_length)): f'phrase {phrase_length} {i}'
+            for i in range(6)
+        }
+    matcher = analyse_thread.SubjectMatcher(common_words, word_map, caps_map, phrase_maps)
+    for _i in range(20):
+        words = [rng.choice(vocabulary) for _j in range(rng.randint(0, 30))]
+        expected = _match_subjects(_post_from_words(words), common_words, word_map, caps_map, phrase_maps)
+        assert matcher.match(words) == expected
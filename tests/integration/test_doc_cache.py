@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+spacy = pytest.importorskip('spacy')
+
+from pprune.common import doc_cache  # noqa: E402
+from pprune.common import read_html  # noqa: E402
+
+import example_data  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def thread():
+    return read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, engine='lxml')
+
+
+@pytest.fixture
+def nlp():
+    return spacy.blank('en')
+
+
+@pytest.fixture
+def cache_directory(tmp_path):
+    return os.path.join(tmp_path, 'docs')
+
+
+def _never_pipe(*args, **kwargs):
+    raise AssertionError('Should not annotate any posts.')
+
+
+def test_text_sha256():
+    assert doc_cache.text_sha256('') == 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+
+def test_annotate_miss_then_hit(thread, nlp, cache_directory, monkeypatch):
+    cache = doc_cache.DocCache(cache_directory, nlp)
+    docs = cache.annotate(thread)
+    assert (cache.hits, cache.misses) == (0, len(thread))
+    assert [doc.text for doc in docs] == [post.text_stripped_without_quoted_message for post in thread.posts]
+    assert os.path.exists(cache.cache_path())
+    # A new cache reads the Docs from the cache file.
+    cache = doc_cache.DocCache(cache_directory, nlp)
+    monkeypatch.setattr(nlp, 'pipe', _never_pipe)
+    result = cache.annotate(thread)
+    assert (cache.hits, cache.misses) == (len(thread), 0)
+    assert [doc.text for doc in result] == [doc.text for doc in docs]
+    assert [[token.text for token in doc] for doc in result] == [[token.text for token in doc] for doc in docs]
+
+
+def test_annotate_edited_post(nlp, cache_directory):
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, engine='lxml')
+    doc_cache.DocCache(cache_directory, nlp).annotate(thread)
+    thread.posts[3].prime_cache(text_stripped_without_quoted_message='Edited text.')
+    cache = doc_cache.DocCache(cache_directory, nlp)
+    docs = cache.annotate(thread)
+    assert (cache.hits, cache.misses) == (len(thread) - 1, 1)
+    assert docs[3].text == 'Edited text.'
+
+
+def test_cache_path_depends_on_pipeline(nlp, cache_directory):
+    cache_path = doc_cache.DocCache(cache_directory, nlp).cache_path()
+    nlp.add_pipe('sentencizer')
+    assert doc_cache.DocCache(cache_directory, nlp).cache_path() != cache_path
+
+
+def test_cache_miss_on_version(thread, nlp, cache_directory, monkeypatch):
+    doc_cache.DocCache(cache_directory, nlp).annotate(thread)
+    monkeypatch.setattr(doc_cache, 'CACHE_VERSION', doc_cache.CACHE_VERSION + 1)
+    cache = doc_cache.DocCache(cache_directory, nlp)
+    cache.annotate(thread)
+    assert (cache.hits, cache.misses) == (0, len(thread))
+
+
+def test_cache_ignores_corrupt_file(thread, nlp, cache_directory):
+    cache = doc_cache.DocCache(cache_directory, nlp)
+    with open(cache.cache_path(), 'wb') as file:
+        file.write(b'Not a cache file.')
+    cache.annotate(thread)
+    assert (cache.hits, cache.misses) == (0, len(thread))
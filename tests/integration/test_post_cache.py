@@ -0,0 +1,97 @@
+import os
+import shutil
+
+import pytest
+from pprune.common import post_cache
+from pprune.common import read_html
+
+import example_data
+
+PAGE_NAME = '666472-plane-crash-near-ahmedabad-2.html'
+
+
+@pytest.fixture
+def archive_directory(tmp_path):
+    """A copy of the archive pages in the example pages so that they can be modified."""
+    archive = os.path.join(tmp_path, 'archive')
+    os.makedirs(archive)
+    for name in ('666472-plane-crash-near-ahmedabad.html', '666472-plane-crash-near-ahmedabad-2.html'):
+        shutil.copy(os.path.join(example_data.EXAMPLE_PAGES_DIRECTORY, name), archive)
+    return archive
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return post_cache.PostRecordCache(os.path.join(tmp_path, 'cache'))
+
+
+def _never_parse(file_path):
+    raise AssertionError(f'Should not parse {file_path}')
+
+
+def test_post_record_tuple_round_trip():
+    records = read_html.get_post_records_from_file_path(os.path.join(example_data.EXAMPLE_PAGES_DIRECTORY, PAGE_NAME))
+    for record in records:
+        assert post_cache.post_record_from_tuple(post_cache.post_record_to_tuple(record)) == record
+
+
+def test_cache_miss_then_hit(archive_directory, cache):
+    file_path = os.path.join(archive_directory, PAGE_NAME)
+    assert cache.load(file_path) is None
+    records = read_html.get_post_records_from_file_path(file_path)
+    cache.save(file_path, records)
+    assert cache.load(file_path) == records
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_hit_after_touch(archive_directory, cache):
+    file_path = os.path.join(archive_directory, PAGE_NAME)
+    records = read_html.get_post_records_from_file_path(file_path)
+    cache.save(file_path, records)
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load(file_path) == records
+
+
+def test_cache_miss_after_change(archive_directory, cache):
+    file_path = os.path.join(archive_directory, PAGE_NAME)
+    records = read_html.get_post_records_from_file_path(file_path)
+    cache.save(file_path, records)
+    with open(file_path) as file:
+        content = file.read()
+    # Same size, different content and modification time.
+    with open(file_path, 'w') as file:
+        file.write(content.replace('Brits will be on board', 'Brits will be on BOARD'))
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load(file_path) is None
+
+
+def test_cache_miss_on_version(archive_directory, cache, monkeypatch):
+    file_path = os.path.join(archive_directory, PAGE_NAME)
+    cache.save(file_path, read_html.get_post_records_from_file_path(file_path))
+    monkeypatch.setattr(post_cache, 'CACHE_VERSION', post_cache.CACHE_VERSION + 1)
+    assert cache.load(file_path) is None
+
+
+def test_cache_ignores_corrupt_file(archive_directory, cache):
+    file_path = os.path.join(archive_directory, PAGE_NAME)
+    with open(cache.cache_path(file_path), 'wb') as file:
+        file.write(b'Not a cache file.')
+    assert cache.load(file_path) is None
+
+
+@pytest.mark.parametrize('jobs', (1, 2,))
+@pytest.mark.parametrize('engine', ('bs4', 'lxml',))
+def test_read_whole_thread_with_cache(archive_directory, cache, monkeypatch, jobs, engine):
+    expected = read_html.read_whole_thread(archive_directory)
+    result = read_html.read_whole_thread(archive_directory, jobs=jobs, engine=engine, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert [p.words for p in result.posts] == [p.words for p in expected.posts]
+    # Now the pages must not be parsed.
+    monkeypatch.setitem(read_html.POST_RECORD_ENGINES, engine, _never_parse)
+    result = read_html.read_whole_thread(archive_directory, jobs=1, engine=engine, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert result.post_map == expected.post_map
+    assert result.user_post_indexes == expected.user_post_indexes
+    assert [p.words for p in result.posts] == [p.words for p in expected.posts]
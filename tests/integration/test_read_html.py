@@ -1,5 +1,7 @@
 import datetime
 import io
+import os
+import pickle
 import pprint
 import urllib.parse
 
@@ -669,3 +671,138 @@ def test_get_thread_post_href_pairs(html_str, expected):
     for post in thread.posts:
         result.append((post.href_pairs()))
     assert result == expected
+
+
+def test_post_record_is_picklable():
+    file = io.StringIO(example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad-2.html'])
+    post_nodes = read_html.get_post_nodes_from_file(file)
+    record = read_html.post_record_from_html_node(post_nodes[0])
+    result = pickle.loads(pickle.dumps(record))
+    assert result == record
+    assert result.sequence_num == 11898940
+    assert len(result.liked_by_users) == 30
+
+
+@pytest.mark.parametrize(
+    'html_str',
+    (
+            example_data.EXAMPLE_PAGES['example_page.html'],
+            example_data.EXAMPLE_PAGES['example_page_four_posts.html'],
+            example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad.html'],
+            example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad-2.html'],
+    ),
+    ids=[
+        'example_page.html',
+        'example_page_four_posts.html',
+        '666472-plane-crash-near-ahmedabad.html',
+        '666472-plane-crash-near-ahmedabad-2.html',
+    ],
+)
+def test_post_from_record_matches_post_from_html_node(html_str):
+    post_nodes = read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    for post_node in post_nodes:
+        expected = read_html.post_from_html_node(post_node)
+        result = read_html.post_from_record(read_html.post_record_from_html_node(post_node))
+        if expected is None:
+            assert result is None
+            continue
+        assert result.timestamp == expected.timestamp
+        assert result.permalink == expected.permalink
+        assert result.user == expected.user
+        assert result.sequence_num == expected.sequence_num
+        assert result.liked_by_users == expected.liked_by_users
+        assert result.subject == expected.subject
+        assert result.text_stripped == expected.text_stripped
+        assert result.node.prettify(formatter='html') == expected.node.prettify(formatter='html')
+
+
+@pytest.mark.parametrize('jobs', (1, 2, 4,))
+def test_read_whole_thread_jobs(jobs):
+    expected = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    result = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, jobs=jobs)
+    assert len(result) == 40
+    assert [p.permalink for p in result.posts] == [p.permalink for p in expected.posts]
+    assert [p.text_stripped for p in result.posts] == [p.text_stripped for p in expected.posts]
+    assert result.post_map == expected.post_map
+    assert result.user_post_indexes == expected.user_post_indexes
+
+
+@pytest.mark.parametrize('count, expected', ((0, 0), (1, 20), (2, 40), (3, 40),))
+def test_read_whole_thread_jobs_count(count, expected):
+    result = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, count=count, jobs=2)
+    assert len(result) == expected
+
+
+@pytest.mark.parametrize('jobs', (1, 2,))
+def test_update_whole_thread_jobs_duplicate_posts(jobs):
+    """Reading the same pages again ignores the duplicates as add_post() raises."""
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, jobs=jobs)
+    assert len(thread) == 40
+    read_html.update_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, thread, jobs=jobs)
+    assert len(thread) == 40
+
+
+@pytest.mark.parametrize(
+    'html_str',
+    (
+            example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad.html'],
+            example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad-2.html'],
+    ),
+    ids=[
+        '666472-plane-crash-near-ahmedabad.html',
+        '666472-plane-crash-near-ahmedabad-2.html',
+    ],
+)
+def test_post_from_html_node_detach(html_str):
+    expected = [
+        read_html.post_from_html_node(node) for node in read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    ]
+    result = [
+        read_html.post_from_html_node(node, detach=True)
+        for node in read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    ]
+    assert len(result) == len(expected)
+    for post, expected_post in zip(result, expected):
+        if expected_post is None:
+            assert post is None
+            continue
+        assert post.node.parent is None
+        assert expected_post.node.parent is not None
+        assert post.text_stripped == expected_post.text_stripped
+        assert post.node.prettify(formatter='html') == expected_post.node.prettify(formatter='html')
+
+
+@pytest.mark.parametrize('jobs', (1, 2,))
+def test_read_whole_thread_posts_do_not_reference_page(jobs):
+    """The posts do not keep the parse tree of the whole page."""
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, jobs=jobs)
+    assert len(thread) == 40
+    for post in thread.posts:
+        if jobs > 1:
+            assert isinstance(post.node, thread_struct.SerialisedNode)
+        else:
+            assert post.node.parent is None
+
+
+def _write_compressed_example_pages(directory, compression):
+    """Writes the example pages that match RE_FILENAME compressed, returns the directory."""
+    for file_name in read_html.read_files(example_data.EXAMPLE_PAGES_DIRECTORY).values():
+        destination = os.path.join(
+            directory, os.path.basename(file_name) + read_html.ARCHIVE_COMPRESSION_EXTENSIONS[compression]
+        )
+        with read_html.open_archive_file(destination, 'w') as file:
+            file.write(example_data.EXAMPLE_PAGES[os.path.basename(file_name)])
+    return directory
+
+
+@pytest.mark.parametrize('compression', ('gzip', 'zstd'))
+@pytest.mark.parametrize('engine, jobs', (('bs4', 1), ('bs4', 2), ('lxml', 1)))
+def test_read_whole_thread_compressed(tmp_path, compression, engine, jobs):
+    if compression == 'zstd' and read_html.zstandard is None:
+        pytest.skip('zstandard is not installed.')
+    directory = _write_compressed_example_pages(str(tmp_path), compression)
+    expected = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, jobs=jobs, engine=engine)
+    result = read_html.read_whole_thread(directory, jobs=jobs, engine=engine)
+    assert len(result) == 40
+    assert [p.permalink for p in result.posts] == [p.permalink for p in expected.posts]
+    assert [p.text_stripped for p in result.posts] == [p.text_stripped for p in expected.posts]
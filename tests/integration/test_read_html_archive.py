@@ -0,0 +1,308 @@
+"""Tests of archiving a thread from a local stand-in for the pprune server."""
+import asyncio
+import concurrent.futures
+import os
+import time
+
+import pytest
+from pprune.common import read_html
+
+import example_server
+
+
+def _archived_pages(offline_directory):
+    """Map of {file_name: content, ...} of the archived pages."""
+    result = {}
+    for file_name in sorted(os.listdir(offline_directory)):
+        if file_name == read_html.ArchiveManifest.FILE_NAME:
+            continue
+        with open(os.path.join(offline_directory, file_name)) as file:
+            result[file_name] = file.read()
+    return result
+
+
+def _expected_pages(server):
+    return {
+        os.path.basename(server.path(page_number)): server.page_content(page_number)
+        for page_number in range(1, server.page_count + 1)
+    }
+
+
+def test_archive_thread_offline(tmp_path):
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        result = read_html.archive_thread_offline(server.url(1), str(tmp_path), -1, False)
+    expected = _expected_pages(server)
+    assert result == (3, sum(len(v) for v in expected.values()))
+    assert _archived_pages(str(tmp_path)) == expected
+    # The first page is read twice.
+    assert server.request_counts[server.path(1)] == 2
+
+
+def test_thread_sessions():
+    with read_html.ThreadSessions(pool_maxsize=2) as sessions:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            thread_sessions = list(executor.map(lambda _i: sessions.session(), range(2)))
+        assert sessions.session() is sessions.session()
+        assert sessions.session() not in thread_sessions
+        assert len(sessions) == len({id(session) for session in thread_sessions}) + 1
+        adapter = sessions.session().get_adapter('https://www.pprune.org')
+        assert adapter._pool_maxsize == 2
+    assert len(sessions) == 0
+
+
+@pytest.mark.parametrize('concurrency', (1, 4))
+def test_async_archiver(tmp_path, concurrency):
+    archiver = read_html.AsyncArchiver(concurrency=concurrency, per_host=concurrency)
+    with example_server.ExampleThreadServer(page_count=5) as server:
+        result = asyncio.run(archiver.archive(server.url(1), str(tmp_path)))
+    expected = _expected_pages(server)
+    assert result == (5, sum(len(v) for v in expected.values()))
+    assert _archived_pages(str(tmp_path)) == expected
+    # The first page is read once.
+    assert dict(server.request_counts) == {server.path(i): 1 for i in range(1, 6)}
+    assert (archiver.request_count, archiver.retry_count) == (5, 0)
+
+
+def test_async_archiver_same_as_archive_thread_offline(tmp_path):
+    with example_server.ExampleThreadServer(page_count=4) as server:
+        expected = read_html.archive_thread_offline(server.url(1), str(tmp_path / 'serial'), -1, False)
+        result = asyncio.run(read_html.AsyncArchiver().archive(server.url(1), str(tmp_path / 'async')))
+    assert result == expected
+    assert _archived_pages(str(tmp_path / 'async')) == _archived_pages(str(tmp_path / 'serial'))
+
+
+@pytest.mark.parametrize('page_count, expected', ((1, 1), (3, 3), (10, 5)))
+def test_async_archiver_page_count(tmp_path, page_count, expected):
+    with example_server.ExampleThreadServer(page_count=5) as server:
+        result = asyncio.run(read_html.AsyncArchiver().archive(server.url(1), str(tmp_path), page_count))
+    assert result[0] == expected
+    assert sorted(_archived_pages(str(tmp_path)).keys()) == sorted(
+        os.path.basename(server.path(i)) for i in range(1, expected + 1)
+    )
+
+
+@pytest.mark.parametrize('force', (False, True))
+def test_async_archiver_existing(tmp_path, force):
+    with example_server.ExampleThreadServer(page_count=5) as server:
+        asyncio.run(read_html.AsyncArchiver().archive(server.url(1), str(tmp_path), 3))
+        server.request_counts.clear()
+        result = asyncio.run(read_html.AsyncArchiver().archive(server.url(1), str(tmp_path), -1, force))
+    # The existing pages are unchanged so are not rewritten.
+    assert result[0] == 2
+    assert len(_archived_pages(str(tmp_path))) == 5
+    # The first page is always read to discover the URLs.
+    assert sum(server.request_counts.values()) == (5 if force else 3)
+
+
+def test_async_archiver_retry(tmp_path):
+    archiver = read_html.AsyncArchiver(backoff=0.01)
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        server.fail(1, 503, 1)
+        server.fail(2, 500, 3)
+        result = asyncio.run(archiver.archive(server.url(1), str(tmp_path)))
+    assert result[0] == 3
+    assert _archived_pages(str(tmp_path)) == _expected_pages(server)
+    assert archiver.retry_count == 4
+    assert server.request_counts[server.path(2)] == 4
+
+
+@pytest.mark.parametrize('status, count', ((503, 4), (404, 1)), ids=['retries_exhausted', 'not_retried'])
+def test_async_archiver_failure(tmp_path, status, count):
+    archiver = read_html.AsyncArchiver(backoff=0.01)
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        server.fail(2, status, count)
+        with pytest.raises(ValueError, match=f'failed: {status}'):
+            asyncio.run(archiver.archive(server.url(1), str(tmp_path)))
+        assert server.request_counts[server.path(2)] == count
+
+
+def test_async_archiver_connection_error(tmp_path):
+    with example_server.ExampleThreadServer(page_count=1) as server:
+        url = server.url(1)
+    archiver = read_html.AsyncArchiver(retries=1, backoff=0.01)
+    with pytest.raises(ValueError, match='raised'):
+        asyncio.run(archiver.archive(url, str(tmp_path)))
+    assert archiver.request_count == 2
+
+
+@pytest.mark.parametrize('per_host', (1, 2))
+def test_async_archiver_per_host(tmp_path, per_host):
+    archiver = read_html.AsyncArchiver(concurrency=8, per_host=per_host)
+    with example_server.ExampleThreadServer(page_count=8, delay=0.05) as server:
+        asyncio.run(archiver.archive(server.url(1), str(tmp_path)))
+    assert server.max_in_flight == per_host
+
+
+def test_async_archiver_interval(tmp_path):
+    archiver = read_html.AsyncArchiver(concurrency=4, per_host=4, interval=0.05)
+    with example_server.ExampleThreadServer(page_count=4) as server:
+        t_start = time.perf_counter()
+        asyncio.run(archiver.archive(server.url(1), str(tmp_path)))
+        t_elapsed = time.perf_counter() - t_start
+    assert t_elapsed >= 3 * 0.05
+
+
+def _archive(mode, url, offline_directory, page_count=-1, force=False, refresh=False, compression=None):
+    if mode == 'serial':
+        return read_html.archive_thread_offline(url, offline_directory, page_count, force, refresh, compression)
+    return asyncio.run(
+        read_html.AsyncArchiver().archive(url, offline_directory, page_count, force, refresh, compression)
+    )
+
+
+def _modification_times(offline_directory):
+    return {
+        file_name: os.stat(os.path.join(offline_directory, file_name)).st_mtime_ns
+        for file_name in _archived_pages(offline_directory)
+    }
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_refresh_conditional(tmp_path, mode):
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=5) as server:
+        _archive(mode, server.url(1), offline_directory)
+        manifest = read_html.ArchiveManifest.load(offline_directory)
+        assert sorted(manifest.entries.keys()) == sorted(server.url(i) for i in range(1, 6))
+        modification_times = _modification_times(offline_directory)
+        # The last page has new posts.
+        new_content = server.page_content(5).replace('</body>', '<p>A new post</p></body>')
+        server.set_page_content(5, new_content, 'Sun, 13 Jul 2025 10:00:00 GMT')
+        server.request_counts.clear()
+        result = _archive(mode, server.url(1), offline_directory, refresh=True)
+    assert result == (1, len(new_content))
+    assert _archived_pages(offline_directory) == _expected_pages(server)
+    new_modification_times = _modification_times(offline_directory)
+    assert [k for k in modification_times if modification_times[k] != new_modification_times[k]] == [
+        os.path.basename(server.path(5))
+    ]
+    if mode == 'serial':
+        # The first page is read unconditionally to find the URLs then conditionally.
+        assert sum(server.not_modified_counts.values()) == 4
+    else:
+        assert sum(server.not_modified_counts.values()) == 3
+    assert sum(server.request_counts.values()) == 6 if mode == 'serial' else 5
+    manifest = read_html.ArchiveManifest.load(offline_directory)
+    assert manifest.entries[server.url(5)]['length'] == len(new_content)
+    assert manifest.entries[server.url(5)]['last_modified'] == 'Sun, 13 Jul 2025 10:00:00 GMT'
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_refresh_without_validators(tmp_path, mode):
+    """The server does not support conditional requests so changes are found from the content hash."""
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=4, validators=False) as server:
+        _archive(mode, server.url(1), offline_directory)
+        modification_times = _modification_times(offline_directory)
+        new_content = server.page_content(3).replace('</body>', '<p>An edited post</p></body>')
+        server.set_page_content(3, new_content, 'Sun, 13 Jul 2025 10:00:00 GMT')
+        result = _archive(mode, server.url(1), offline_directory, refresh=True)
+    assert result == (1, len(new_content))
+    assert sum(server.not_modified_counts.values()) == 0
+    assert _archived_pages(offline_directory) == _expected_pages(server)
+    new_modification_times = _modification_times(offline_directory)
+    assert [k for k in modification_times if modification_times[k] != new_modification_times[k]] == [
+        os.path.basename(server.path(3))
+    ]
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_refresh_without_manifest(tmp_path, mode):
+    """Pages archived before there was a manifest are compared with the archived content."""
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        _archive(mode, server.url(1), offline_directory)
+        os.remove(os.path.join(offline_directory, read_html.ArchiveManifest.FILE_NAME))
+        result = _archive(mode, server.url(1), offline_directory, refresh=True)
+    assert result == (0, 0)
+    assert len(read_html.ArchiveManifest.load(offline_directory).entries) == 3
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_force_unchanged(tmp_path, mode):
+    """With force every page is requested unconditionally but unchanged pages are not rewritten."""
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        _archive(mode, server.url(1), offline_directory)
+        modification_times = _modification_times(offline_directory)
+        result = _archive(mode, server.url(1), offline_directory, force=True)
+    assert result == (0, 0)
+    assert sum(server.not_modified_counts.values()) == 0
+    assert _modification_times(offline_directory) == modification_times
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_refresh_page_count(tmp_path, mode):
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=5) as server:
+        _archive(mode, server.url(1), offline_directory)
+        server.not_modified_counts.clear()
+        _archive(mode, server.url(1), offline_directory, page_count=3, refresh=True)
+    assert sorted(server.not_modified_counts.keys()) == sorted(
+        server.path(i) for i in range(1 if mode == 'serial' else 2, 4)
+    )
+
+
+def test_archive_read_whole_thread_ignores_manifest(tmp_path, caplog):
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=2) as server:
+        _archive('async', server.url(1), offline_directory)
+    assert os.path.exists(os.path.join(offline_directory, read_html.ArchiveManifest.FILE_NAME))
+    with caplog.at_level('ERROR'):
+        thread = read_html.read_whole_thread(offline_directory)
+    assert len(thread) == 40
+    assert not caplog.records
+
+
+@pytest.mark.parametrize(
+    'content',
+    ('', 'Not JSON', '{"version": 0, "entries": {}}', '{"entries": {}}'),
+    ids=['empty', 'not_json', 'old_version', 'no_version'],
+)
+def test_archive_manifest_load_invalid(tmp_path, content):
+    with open(os.path.join(str(tmp_path), read_html.ArchiveManifest.FILE_NAME), 'w') as file:
+        file.write(content)
+    assert read_html.ArchiveManifest.load(str(tmp_path)).entries == {}
+
+
+def test_archive_manifest_request_headers(tmp_path):
+    url = 'https://www.pprune.org/accidents-close-calls/666472-plane-crash-near-ahmedabad-2.html'
+    destination = read_html.archive_destination(str(tmp_path), url)
+    manifest = read_html.ArchiveManifest(
+        {url: {'etag': '"abc"', 'last_modified': example_server.LAST_MODIFIED, 'length': 1, 'sha256': ''}}
+    )
+    # Not archived.
+    assert manifest.request_headers(destination, url) == {}
+    with open(destination, 'w') as file:
+        file.write('x')
+    assert manifest.request_headers(destination, url) == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': example_server.LAST_MODIFIED,
+    }
+    assert manifest.request_headers(destination, url + '?other') == {}
+
+
+@pytest.mark.parametrize('mode', ('serial', 'async'))
+def test_archive_compressed(tmp_path, mode):
+    offline_directory = str(tmp_path)
+    with example_server.ExampleThreadServer(page_count=3) as server:
+        result = _archive(mode, server.url(1), offline_directory, compression='gzip')
+        assert sorted(os.listdir(offline_directory)) == sorted(
+            [os.path.basename(server.path(i)) + '.gz' for i in range(1, 4)] + [read_html.ArchiveManifest.FILE_NAME]
+        )
+        # Unchanged pages are not rewritten.
+        assert _archive(mode, server.url(1), offline_directory, refresh=True, compression='gzip') == (0, 0)
+    expected = _expected_pages(server)
+    assert result == (3, sum(len(v) for v in expected.values()))
+    for file_name, content in expected.items():
+        with read_html.open_archive_file(os.path.join(offline_directory, file_name + '.gz')) as file:
+            assert file.read() == content
+    thread = read_html.read_whole_thread(offline_directory)
+    assert len(thread) == 40
+
+
+@pytest.mark.parametrize('compression', ('lzma', 'zstd'))
+def test_archive_compression_unavailable(tmp_path, compression):
+    if compression == 'zstd' and read_html.zstandard is not None:
+        pytest.skip('zstandard is installed.')
+    with pytest.raises(ValueError):
+        read_html.archive_thread_offline('http://localhost/1-thread.html', str(tmp_path), -1, False, False, compression)
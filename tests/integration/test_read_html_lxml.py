@@ -0,0 +1,112 @@
+"""Tests that the lxml engine produces the same posts as the BeautifulSoup engine."""
+import io
+import os
+
+import pytest
+from pprune.common import read_html
+
+import example_data
+
+EXAMPLE_PAGE_NAMES = sorted(example_data.EXAMPLE_PAGES.keys())
+
+POST_ATTRIBUTES = (
+    'timestamp',
+    'permalink',
+    'user',
+    'sequence_num',
+    'liked_by_users',
+    'subject',
+    'text',
+    'text_stripped',
+    'text_stripped_without_quoted_message',
+    'words',
+)
+
+
+def _posts_bs4(html_str):
+    post_nodes = read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    return [read_html.post_from_html_node(node) for node in post_nodes]
+
+
+def _posts_lxml(html_str):
+    records = read_html.get_post_records_from_string_lxml(html_str)
+    return [read_html.post_from_record(record) for record in records]
+
+
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+def test_lxml_post_count(page_name):
+    html_str = example_data.EXAMPLE_PAGES[page_name]
+    assert len(_posts_lxml(html_str)) == len(_posts_bs4(html_str))
+
+
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+def test_lxml_post_records(page_name):
+    html_str = example_data.EXAMPLE_PAGES[page_name]
+    post_nodes = read_html.get_post_nodes_from_file(io.StringIO(html_str))
+    expected = [read_html.post_record_from_html_node(node) for node in post_nodes]
+    result = read_html.get_post_records_from_string_lxml(html_str)
+    for record_lxml, record_bs4 in zip(result, expected):
+        assert record_lxml.timestamp == record_bs4.timestamp
+        assert record_lxml.permalink == record_bs4.permalink
+        assert record_lxml.user == record_bs4.user
+        assert record_lxml.sequence_num == record_bs4.sequence_num
+        assert record_lxml.liked_by_users == record_bs4.liked_by_users
+        assert record_lxml.node_name == record_bs4.node_name
+        assert (record_lxml.post_html is None) == (record_bs4.post_html is None)
+
+
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+@pytest.mark.parametrize('attribute', POST_ATTRIBUTES)
+def test_lxml_post_attributes(page_name, attribute):
+    html_str = example_data.EXAMPLE_PAGES[page_name]
+    for post_lxml, post_bs4 in zip(_posts_lxml(html_str), _posts_bs4(html_str)):
+        if post_bs4 is None:
+            assert post_lxml is None
+        else:
+            assert getattr(post_lxml, attribute) == getattr(post_bs4, attribute)
+
+
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+def test_lxml_post_href_pairs(page_name):
+    html_str = example_data.EXAMPLE_PAGES[page_name]
+    for post_lxml, post_bs4 in zip(_posts_lxml(html_str), _posts_bs4(html_str)):
+        if post_bs4 is not None:
+            assert post_lxml.href_pairs() == post_bs4.href_pairs()
+
+
+@pytest.mark.parametrize('page_name', EXAMPLE_PAGE_NAMES)
+def test_lxml_post_node_prettify(page_name):
+    html_str = example_data.EXAMPLE_PAGES[page_name]
+    for post_lxml, post_bs4 in zip(_posts_lxml(html_str), _posts_bs4(html_str)):
+        if post_bs4 is not None:
+            assert post_lxml.node.prettify(formatter='html') == post_bs4.node.prettify(formatter='html')
+
+
+@pytest.mark.parametrize('html_str', ('', '<html><body><p>No posts.</p></body></html>',))
+def test_lxml_no_posts_raises(html_str):
+    with pytest.raises(ValueError):
+        read_html.get_post_records_from_string_lxml(html_str)
+
+
+@pytest.mark.parametrize('jobs', (1, 2,))
+def test_read_whole_thread_lxml(jobs):
+    expected = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    result = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, jobs=jobs, engine='lxml')
+    assert len(result) == len(expected)
+    assert result.post_map == expected.post_map
+    assert result.user_post_indexes == expected.user_post_indexes
+    assert [p.words for p in result.posts] == [p.words for p in expected.posts]
+
+
+def test_read_whole_thread_unknown_engine():
+    with pytest.raises(ValueError):
+        read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, engine='Unknown')
+
+
+def test_read_whole_thread_lxml_empty_file(tmp_path):
+    with open(os.path.join(tmp_path, '423988-concorde-question.html'), 'w') as file:
+        file.write(example_data.EXAMPLE_PAGES['666472-plane-crash-near-ahmedabad.html'])
+    with open(os.path.join(tmp_path, '423988-concorde-question-2.html'), 'w'):
+        pass
+    thread = read_html.read_whole_thread(str(tmp_path), engine='lxml')
+    assert len(thread) == 20
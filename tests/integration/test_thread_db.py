@@ -0,0 +1,192 @@
+import datetime
+import os
+import re
+import sqlite3
+
+import pytest
+from pprune import publication_maps
+from pprune import write_html
+from pprune.common import read_html
+from pprune.common import thread_db
+from pprune.common import thread_struct
+
+import example_data
+
+COMMON_WORDS = {'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with'}
+
+
+@pytest.fixture(scope='module')
+def example_thread():
+    return read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+
+
+@pytest.fixture(scope='module')
+def example_post_subject_map(example_thread):
+    publication_map = publication_maps.AirIndia171().frozen()
+    return write_html.pass_one(example_thread, COMMON_WORDS, publication_map).post_subject_map
+
+
+@pytest.fixture
+def example_database(tmp_path, example_thread, example_post_subject_map):
+    database_path = str(tmp_path / 'thread.sqlite')
+    thread_db.write_thread(database_path, example_thread, example_post_subject_map)
+    return database_path
+
+
+def _matching_post_indexes(thread, word):
+    """The indexes of the posts that have the word, ignoring case, without quoted messages."""
+    return [
+        i for i, post in enumerate(thread.posts)
+        if word in re.findall(r'\w+', post.text_stripped_without_quoted_message.lower())
+    ]
+
+
+def test_write_read_thread(example_database, example_thread):
+    thread = thread_db.read_thread(example_database)
+    assert len(thread) == len(example_thread) == 40
+    assert thread.post_map == example_thread.post_map
+    assert thread.user_post_indexes == example_thread.user_post_indexes
+    for post, expected in zip(thread.posts, example_thread.posts):
+        assert post.timestamp == expected.timestamp
+        assert post.permalink == expected.permalink
+        assert post.user == expected.user
+        assert post.sequence_num == expected.sequence_num
+        assert post.liked_by_users == expected.liked_by_users
+        assert post.subject == expected.subject
+        assert post.text == expected.text
+        assert post.text_stripped_without_quoted_message == expected.text_stripped_without_quoted_message
+        assert str(post.node) == str(expected.node)
+    assert any(post.liked_by_users for post in thread.posts)
+
+
+def test_read_thread_does_not_parse_nodes(example_database):
+    thread = thread_db.read_thread(example_database)
+    for post in thread.posts:
+        assert post.text_stripped_without_quoted_message
+        assert post.words
+        assert isinstance(post.node, thread_struct.SerialisedNode)
+        assert not post.node.is_parsed
+
+
+def test_read_post_subject_map(example_database, example_post_subject_map):
+    post_subject_map = thread_db.read_post_subject_map(example_database)
+    assert post_subject_map == example_post_subject_map
+    assert any(post_subject_map.values())
+
+
+def test_read_post_subject_map_absent(tmp_path, example_thread):
+    database_path = str(tmp_path / 'thread.sqlite')
+    thread_db.write_thread(database_path, example_thread)
+    post_subject_map = thread_db.read_post_subject_map(database_path)
+    assert len(post_subject_map) == len(example_thread)
+    assert not any(post_subject_map.values())
+
+
+def test_write_thread_replaces(tmp_path, example_thread):
+    database_path = str(tmp_path / 'thread.sqlite')
+    thread_db.write_thread(database_path, example_thread)
+    thread = thread_struct.Thread()
+    thread.add_post(example_thread.posts[0])
+    thread_db.write_thread(database_path, thread)
+    assert len(thread_db.read_thread(database_path)) == 1
+    assert os.listdir(str(tmp_path)) == ['thread.sqlite']
+
+
+def test_connect_missing(tmp_path):
+    with pytest.raises(ValueError):
+        thread_db.connect(str(tmp_path / 'does_not_exist.sqlite'))
+
+
+def test_connect_not_a_thread_database(tmp_path):
+    database_path = str(tmp_path / 'other.sqlite')
+    connection = sqlite3.connect(database_path)
+    connection.execute('CREATE TABLE other (value TEXT)')
+    connection.close()
+    with pytest.raises(ValueError):
+        thread_db.connect(database_path)
+
+
+def test_connect_schema_version(example_database):
+    connection = sqlite3.connect(example_database)
+    with connection:
+        connection.execute("UPDATE metadata SET value = '0' WHERE key = 'schema_version'")
+    connection.close()
+    with pytest.raises(ValueError):
+        thread_db.read_thread(example_database)
+
+
+def test_search(example_database, example_thread):
+    expected = _matching_post_indexes(example_thread, 'flaps')
+    assert len(expected) > 1
+    connection = thread_db.connect(example_database)
+    results = thread_db.search(connection, 'flaps')
+    connection.close()
+    assert [r.post_index for r in results] == expected
+    for result in results:
+        post = example_thread.posts[result.post_index]
+        assert result.permalink == post.permalink
+        assert result.sequence_num == post.sequence_num
+        assert result.user_name == post.user.name
+        assert result.timestamp == post.timestamp
+        assert '[' in result.snippet
+
+
+def test_search_rank_and_limit(example_database, example_thread):
+    expected = _matching_post_indexes(example_thread, 'flaps')
+    connection = thread_db.connect(example_database)
+    ranked = thread_db.search(connection, 'flaps', rank=True)
+    limited = thread_db.search(connection, 'flaps', limit=2)
+    connection.close()
+    assert sorted(r.post_index for r in ranked) == expected
+    assert [r.post_index for r in limited] == expected[:2]
+
+
+def test_search_user(example_database, example_thread):
+    connection = thread_db.connect(example_database)
+    user_name = example_thread.posts[_matching_post_indexes(example_thread, 'flaps')[0]].user.name
+    results = thread_db.search(connection, 'flaps', user_name=user_name)
+    connection.close()
+    assert results
+    assert {r.user_name for r in results} == {user_name}
+
+
+def test_search_time_range(example_database, example_thread):
+    expected = _matching_post_indexes(example_thread, 'flaps')
+    after = example_thread.posts[expected[1]].timestamp
+    before = example_thread.posts[expected[-1]].timestamp
+    connection = thread_db.connect(example_database)
+    results = thread_db.search(connection, 'flaps', after=after, before=before)
+    connection.close()
+    assert [r.post_index for r in results] == [
+        i for i in expected if after <= example_thread.posts[i].timestamp < before
+    ]
+    assert results[0].timestamp == after
+
+
+def test_search_subject(example_database, example_thread, example_post_subject_map):
+    subject_counts = {}
+    for subjects in example_post_subject_map.values():
+        for subject in subjects:
+            subject_counts[subject] = subject_counts.get(subject, 0) + 1
+    subject = max(sorted(subject_counts), key=lambda s: subject_counts[s])
+    connection = thread_db.connect(example_database)
+    # Every post has a word from this list.
+    query = ' OR '.join(sorted({w for post in example_thread.posts for w in post.words[:1]}))
+    results = thread_db.search(connection, query, subject=subject)
+    connection.close()
+    assert results
+    for result in results:
+        assert subject in example_post_subject_map[result.sequence_num]
+
+
+def test_search_invalid_query(example_database):
+    connection = thread_db.connect(example_database)
+    with pytest.raises(ValueError):
+        thread_db.search(connection, '"unbalanced')
+    connection.close()
+
+
+def test_search_no_match(example_database):
+    connection = thread_db.connect(example_database)
+    assert thread_db.search(connection, 'xyzzyplugh', after=datetime.datetime(2025, 1, 1)) == []
+    connection.close()
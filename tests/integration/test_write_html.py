@@ -0,0 +1,225 @@
+import os
+import re
+
+import pytest
+from pprune import publication_maps
+from pprune import write_html
+from pprune.common import read_html
+
+import example_data
+
+COMMON_WORDS = {'the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with'}
+
+
+def _read_output(output_path):
+    """Map of file name to content excluding index.html which has the time of the build and the manifest."""
+    result = {}
+    for file_name in sorted(os.listdir(output_path)):
+        if file_name not in ('index.html', write_html.OutputManifest.FILE_NAME):
+            with open(os.path.join(output_path, file_name), 'rb') as file:
+                result[file_name] = file.read()
+    return result
+
+
+def _write_whole_thread(output_path, jobs):
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    os.makedirs(output_path)
+    write_html.write_whole_thread(thread, COMMON_WORDS, publication_maps.AirIndia171(), output_path, jobs=jobs)
+    return _read_output(output_path)
+
+
+@pytest.mark.parametrize('jobs', (2, 4))
+def test_write_whole_thread_jobs_identical(tmp_path, jobs):
+    expected = _write_whole_thread(str(tmp_path / 'serial'), 1)
+    result = _write_whole_thread(str(tmp_path / 'parallel'), jobs)
+    assert len(expected) > 2
+    assert sorted(result.keys()) == sorted(expected.keys())
+    for file_name in expected:
+        assert result[file_name] == expected[file_name], file_name
+    assert os.path.exists(str(tmp_path / 'parallel' / 'index.html'))
+
+
+def _like_count_footer(post):
+    """The original like count footer in write_a_subject_page() and write_user_page()."""
+    if len(post.liked_by_users) == 1:
+        return f'<p>{len(post.liked_by_users)} user liked this post.</p>\n'
+    elif len(post.liked_by_users) > 1:
+        return f'<p>{len(post.liked_by_users)} users liked this post.</p>\n'
+    return ''
+
+
+def test_post_render_cache():
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    render_cache = write_html.PostRenderCache()
+    for post_index, post in enumerate(thread.posts):
+        assert render_cache.get(post_index, post) == (post.node.prettify(formatter='html'), _like_count_footer(post))
+    assert any(post.liked_by_users for post in thread.posts)
+    assert len(render_cache) == len(thread)
+    assert (render_cache.hits, render_cache.misses) == (0, len(thread))
+    for post_index, post in enumerate(thread.posts):
+        render_cache.get(post_index, post)
+    assert (render_cache.hits, render_cache.misses) == (len(thread), len(thread))
+    assert render_cache.hit_rate() == 0.5
+
+
+def test_post_render_cache_empty():
+    assert write_html.PostRenderCache().hit_rate() == 0.0
+
+
+def _render_cache_counts(caplog):
+    """The (rendered, reused) post counts from the log."""
+    messages = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Post render cache:')]
+    assert len(messages) == 1
+    match = re.match(r'Post render cache: rendered (\d+) reused (\d+) hit rate', messages[0])
+    return int(match.group(1)), int(match.group(2))
+
+
+def test_write_whole_thread_logs_render_cache(tmp_path, caplog):
+    with caplog.at_level('INFO'):
+        _write_whole_thread(str(tmp_path / 'serial'), 1)
+    rendered, reused = _render_cache_counts(caplog)
+    # Many posts are on more than one subject page.
+    assert rendered > 0
+    assert reused > 0
+    caplog.clear()
+    with caplog.at_level('INFO'):
+        _write_whole_thread(str(tmp_path / 'parallel'), 2)
+    # Each worker has its own cache so fewer posts may be reused.
+    rendered_parallel, reused_parallel = _render_cache_counts(caplog)
+    assert rendered_parallel + reused_parallel == rendered + reused
+    assert rendered_parallel >= rendered
+
+
+def _rebuild(thread, output_path, jobs):
+    """Writes the thread to an existing output directory, returns the OutputManifest of this build."""
+    os.makedirs(output_path, exist_ok=True)
+    write_html.write_whole_thread(thread, COMMON_WORDS, publication_maps.AirIndia171(), output_path, jobs=jobs)
+    return write_html.OutputManifest.load(output_path)
+
+
+@pytest.mark.parametrize('jobs', (1, 2))
+def test_write_whole_thread_incremental(tmp_path, caplog, jobs):
+    output_path = str(tmp_path / 'incremental')
+    # Build with the first archive page then rebuild when the second archive page has been added.
+    _rebuild(read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, count=1), output_path, jobs)
+    first_build = _read_output(output_path)
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    caplog.clear()
+    with caplog.at_level('INFO'):
+        manifest = _rebuild(thread, output_path, jobs)
+    messages = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Pages written:')]
+    match = re.match(r'Pages written: (\d+) skipped as unchanged: (\d+) removed as stale: 0$', messages[0])
+    written, skipped = int(match.group(1)), int(match.group(2))
+    # All the pages and index.html
+    assert written + skipped == len(manifest.previous)
+    assert skipped > 0
+    assert written > 1
+    result = _read_output(output_path)
+    # The same as a full build.
+    assert result == _write_whole_thread(str(tmp_path / 'full'), 1)
+    # styles.css is always written and is not in the manifest.
+    unchanged = {k for k in manifest.previous if k in first_build and first_build[k] == result[k]}
+    assert skipped == len(unchanged)
+    # Nothing has changed so only index.html, with the build time, is written.
+    caplog.clear()
+    with caplog.at_level('INFO'):
+        _rebuild(thread, output_path, jobs)
+    messages = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Pages written:')]
+    assert messages[0] == f'Pages written: 1 skipped as unchanged: {len(manifest.previous) - 1} removed as stale: 0'
+    assert _read_output(output_path) == result
+
+
+def test_write_whole_thread_removes_stale(tmp_path, caplog):
+    output_path = str(tmp_path / 'incremental')
+    _rebuild(read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY), output_path, 1)
+    first_build = _read_output(output_path)
+    # Rebuild with fewer posts, some pages are no longer part of the build.
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY, count=1)
+    caplog.clear()
+    with caplog.at_level('INFO'):
+        manifest = _rebuild(thread, output_path, 1)
+    result = _read_output(output_path)
+    removed = first_build.keys() - result.keys()
+    assert removed
+    messages = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Pages written:')]
+    assert messages[0].endswith(f' removed as stale: {len(removed)}')
+    assert sorted(manifest.previous) == sorted(k for k in result if k != 'styles.css') + ['index.html']
+    # The same as a full build.
+    _rebuild(thread, str(tmp_path / 'full'), 1)
+    assert result == _read_output(str(tmp_path / 'full'))
+
+
+def _write_if_changed(manifest, output_path, file_name, inputs, content):
+    if manifest.unchanged(output_path, file_name, inputs):
+        return False
+    manifest.write(output_path, file_name, content)
+    return True
+
+
+def test_output_manifest_write(tmp_path):
+    output_path = str(tmp_path)
+    manifest = write_html.OutputManifest()
+    assert _write_if_changed(manifest, output_path, 'page.html', (1, 2), 'Content')
+    assert _write_if_changed(manifest, output_path, 'other.html', (3,), 'Other')
+    manifest.write(output_path, 'index.html', 'Index')
+    manifest.save(output_path)
+    manifest = write_html.OutputManifest.load(output_path)
+    assert sorted(manifest.previous.keys()) == ['index.html', 'other.html', 'page.html']
+    assert not _write_if_changed(manifest, output_path, 'page.html', (1, 2), 'Content')
+    assert _write_if_changed(manifest, output_path, 'other.html', (3, 4), 'Changed')
+    assert _write_if_changed(manifest, output_path, 'new.html', (5,), 'New')
+    assert (manifest.written, manifest.skipped) == (2, 1)
+    with open(os.path.join(output_path, 'other.html')) as file:
+        assert file.read() == 'Changed'
+    # index.html is not part of this build.
+    manifest.remove_stale(output_path)
+    assert str(manifest) == 'OutputManifest written: 2 skipped: 1 removed: 1'
+    assert sorted(os.listdir(output_path)) == [write_html.OutputManifest.FILE_NAME, 'new.html', 'other.html', 'page.html']
+
+
+def test_output_manifest_write_missing_file(tmp_path):
+    output_path = str(tmp_path)
+    manifest = write_html.OutputManifest()
+    _write_if_changed(manifest, output_path, 'page.html', (1,), 'Content')
+    manifest.save(output_path)
+    os.remove(os.path.join(output_path, 'page.html'))
+    manifest = write_html.OutputManifest.load(output_path)
+    assert _write_if_changed(manifest, output_path, 'page.html', (1,), 'Content')
+    assert os.path.exists(os.path.join(output_path, 'page.html'))
+
+
+def test_output_manifest_remove_stale_missing_file(tmp_path):
+    output_path = str(tmp_path)
+    manifest = write_html.OutputManifest({'page.html': '0'})
+    manifest.remove_stale(output_path)
+    assert manifest.removed == 0
+
+
+@pytest.mark.parametrize(
+    'content',
+    ('', 'Not JSON', '{"version": 0, "hashes": {"page.html": "0"}}', '{"hashes": {}}'),
+    ids=['empty', 'not_json', 'old_version', 'no_version'],
+)
+def test_output_manifest_load_invalid(tmp_path, content):
+    with open(os.path.join(str(tmp_path), write_html.OutputManifest.FILE_NAME), 'w') as file:
+        file.write(content)
+    assert write_html.OutputManifest.load(str(tmp_path)).previous == {}
+
+
+def test_output_manifest_load_missing(tmp_path):
+    assert write_html.OutputManifest.load(str(tmp_path / 'does_not_exist')).previous == {}
+
+
+def test_pass_one_user_aggregates():
+    thread = read_html.read_whole_thread(example_data.EXAMPLE_PAGES_DIRECTORY)
+    pass_one_result = write_html.pass_one(thread, COMMON_WORDS, publication_maps.AirIndia171())
+    assert list(pass_one_result.user_aggregates.keys()) == list(dict.fromkeys(p.user.name for p in thread.posts))
+    for user_name, user_aggregate in pass_one_result.user_aggregates.items():
+        posts = [p for p in thread.posts if p.user.name == user_name]
+        assert user_aggregate.post_count == len(posts)
+        assert user_aggregate.up_votes == sum(len(p.liked_by_users) for p in posts)
+        assert user_aggregate.subjects == pass_one_result.user_subject_map[user_name]
+        assert user_aggregate.first_post == min(p.timestamp for p in posts)
+        assert user_aggregate.last_post == max(p.timestamp for p in posts)
+    assert any(a.up_votes for a in pass_one_result.user_aggregates.values())
+    assert any(a.post_count > 1 for a in pass_one_result.user_aggregates.values())
@@ -0,0 +1,82 @@
+import collections
+import random
+
+import numpy as np
+import pytest
+from pprune.common import phrase_index
+
+
+def _all_phrases(posts, freq_ge):
+    """The count of every phrase of every length that occurs >= freq_ge times."""
+    counter = collections.Counter()
+    for token_ids in posts:
+        for length in range(1, len(token_ids) + 1):
+            counter.update(tuple(token_ids[i:i + length]) for i in range(len(token_ids) - length + 1))
+    return {phrase: count for phrase, count in counter.items() if count >= freq_ge}
+
+
+def _maximal_phrases(phrases):
+    """The phrases that can not be extended by one token to the left or right with the same count."""
+    return {
+        phrase: count for phrase, count in phrases.items()
+        if not any(
+            len(other) == len(phrase) + 1 and other_count == count and phrase in (other[1:], other[:-1])
+            for other, other_count in phrases.items()
+        )
+    }
+
+
+def _random_posts(seed):
+    rng = random.Random(seed)
+    return [[rng.randrange(4) for _i in range(rng.randrange(12))] for _j in range(rng.randrange(1, 6))]
+
+
+@pytest.mark.parametrize(
+    'text',
+    (
+            [],
+            [0],
+            [1, 0],
+            [2, 1, 2, 1, 2, 1, 0],
+            [1, 1, 1, 1, 1],
+    )
+)
+def test_suffix_array(text):
+    result = phrase_index.suffix_array(np.array(text, dtype=np.int64)).tolist()
+    assert result == sorted(range(len(text)), key=lambda i: text[i:])
+
+
+def test_lcp_array():
+    text = [2, 1, 2, 1, 2, 1, 0]
+    sa = phrase_index.suffix_array(np.array(text)).tolist()
+    assert phrase_index.lcp_array(text, sa) == [0, 0, 1, 3, 0, 2, 4]
+
+
+def test_repeated_phrases():
+    index = phrase_index.PhraseIndex([[1, 2, 3], [1, 2, 3], [0, 1, 2]], 4)
+    assert dict(index.repeated_phrases(2)) == {
+        (1,): 3, (1, 2): 3, (1, 2, 3): 2, (2,): 3, (2, 3): 2, (3,): 2,
+    }
+    assert dict(index.repeated_phrases(2, maximal=True)) == {(1, 2): 3, (1, 2, 3): 2}
+    assert dict(index.repeated_phrases(3)) == {(1,): 3, (1, 2): 3, (2,): 3}
+    assert dict(index.repeated_phrases(2, min_length=2, max_length=2)) == {(1, 2): 3, (2, 3): 2}
+
+
+def test_repeated_phrases_do_not_span_posts():
+    index = phrase_index.PhraseIndex([[1, 2], [1, 2], [3], [3]], 4)
+    assert dict(index.repeated_phrases(2)) == {(1,): 2, (1, 2): 2, (2,): 2, (3,): 2}
+
+
+def test_repeated_phrases_freq_ge_error():
+    with pytest.raises(ValueError):
+        list(phrase_index.PhraseIndex([[1, 2]], 4).repeated_phrases(1))
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('freq_ge', (2, 3))
+def test_repeated_phrases_random(seed, freq_ge):
+    posts = _random_posts(seed)
+    index = phrase_index.PhraseIndex(posts, 4)
+    expected = _all_phrases(posts, freq_ge)
+    assert dict(index.repeated_phrases(freq_ge)) == expected
+    assert dict(index.repeated_phrases(freq_ge, maximal=True)) == _maximal_phrases(expected)
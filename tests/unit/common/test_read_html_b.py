@@ -50,6 +50,18 @@ def test_user_attributes(file_name, expected):
                     '666581-air-india-ahmedabad-accident-12th-june-2025-part-2-a-20.html',
                     ('666581', '-air-india-ahmedabad-accident-12th-june-2025-part-2-a-', '20'),
             ),
+            (
+                    '666472-plane-crash-near-ahmedabad.html.gz',
+                    ('666472', '-plane-crash-near-ahmedabad', None),
+            ),
+            (
+                    '666472-plane-crash-near-ahmedabad-2.html.gz',
+                    ('666472', '-plane-crash-near-ahmedabad-', '2'),
+            ),
+            (
+                    '666472-plane-crash-near-ahmedabad-87.html.zst',
+                    ('666472', '-plane-crash-near-ahmedabad-', '87'),
+            ),
     ),
 )
 def test_RE_FILENAME(filename, expected):
@@ -58,6 +70,18 @@ def test_RE_FILENAME(filename, expected):
     assert m.groups() == expected
 
 
+@pytest.mark.parametrize(
+    'filename',
+    (
+            '666472-plane-crash-near-ahmedabad-2.html.bz2',
+            '666472-plane-crash-near-ahmedabad-2.html.tmp',
+            '666472-plane-crash-near-ahmedabad-2.htm',
+    ),
+)
+def test_RE_FILENAME_no_match(filename):
+    assert read_html.RE_FILENAME.match(filename) is None
+
+
 # Taken from tests/integration/example_pages/666472-plane-crash-near-ahmedabad-2.html with tabs replaced by '    '.
 HTML_SINGLE_POST = """<!DOCTYPE html>
 <html xmlns="http://www.w3.org/1999/xhtml" dir="ltr" lang="en" class="no-js">
@@ -454,3 +478,51 @@ def test_read_post_node(html_str, node_id, expected):
     assert post_node is not None
     post = read_html.post_from_html_node(post_node)
     assert post is not None
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+            ('20th Feb 2021, 22:20', datetime.datetime(2021, 2, 21, 10, 20)),
+            ('  1st Mar 2021, 01:05\n', datetime.datetime(2021, 3, 1, 13, 5)),
+            ('2nd Jun 2025, 08:57', datetime.datetime(2025, 6, 2, 20, 57)),
+            ('23rd Sep 2024, 23:59', datetime.datetime(2024, 9, 24, 11, 59)),
+            ('11th June 2025 | 20:57', datetime.datetime(2025, 6, 12, 8, 57)),
+            ('11th June 2025|20:57', datetime.datetime(2025, 6, 12, 8, 57)),
+            ('3rd September 2024, 7:05', datetime.datetime(2024, 9, 3, 19, 5)),
+            ('3rd Sept 2024, 07:05', datetime.datetime(2024, 9, 3, 19, 5)),
+    ),
+)
+def test_date_from_text(text, expected):
+    assert read_html.date_from_text(text) == expected
+    # The same as dateparser.
+    assert read_html._dateparser_parse(text.strip()) + datetime.timedelta(hours=12) == expected
+
+
+@pytest.mark.parametrize(
+    'text',
+    (
+            '2021-02-20 22:20',
+            '20 February 2021 10:20 pm',
+            # Not a valid date so not the fast path.
+            '30th Feb 2021, 22:20',
+            '20th Foo 2021, 22:20',
+            'Posting Rules',
+    ),
+)
+def test_date_from_text_not_fast_path(text):
+    """These formats are not used by pprune and are parsed by dateparser."""
+    assert read_html._parse_post_date(text) is None
+    expected = read_html._dateparser_parse(text)
+    if expected is not None:
+        expected += datetime.timedelta(hours=12)
+    assert read_html.date_from_text(text) == expected
+
+
+def test_date_from_text_dateparser_cached():
+    read_html._dateparser_parse.cache_clear()
+    for _i in range(3):
+        read_html.date_from_text('2021-02-20 22:20')
+        read_html.date_from_text('20th Feb 2021, 22:20')
+    cache_info = read_html._dateparser_parse.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (2, 1)
@@ -0,0 +1,101 @@
+import json
+import os
+import pstats
+
+import pytest
+from pprune.common import stage_profile
+
+
+@pytest.fixture
+def profiler():
+    profiler = stage_profile.StageProfiler()
+    stage_profile.enable(profiler)
+    yield profiler
+    stage_profile.disable()
+
+
+def test_stage_disabled_does_nothing():
+    assert stage_profile._profiler is None
+    with stage_profile.stage('A'):
+        pass
+
+
+def test_stage_calls(profiler):
+    for _i in range(3):
+        with stage_profile.stage('A'):
+            pass
+    with stage_profile.stage('B'):
+        pass
+    assert list(profiler.records) == ['A', 'B']
+    assert profiler.records['A'].calls == 3
+    assert profiler.records['B'].calls == 1
+
+
+def test_stage_nested(profiler):
+    with stage_profile.stage('outer'):
+        with stage_profile.stage('inner'):
+            sum(range(100_000))
+    outer = profiler.records['outer']
+    inner = profiler.records['inner']
+    assert outer.wall_time >= inner.wall_time > 0.0
+    assert outer.cpu_time >= 0.0
+    assert outer.peak_rss > 0
+
+
+def test_stage_records_on_exception(profiler):
+    with pytest.raises(ValueError):
+        with stage_profile.stage('A'):
+            raise ValueError()
+    assert profiler.records['A'].calls == 1
+
+
+def test_staged(profiler):
+    @stage_profile.staged('double')
+    def double(value):
+        return 2 * value
+
+    assert double(2) == 4
+    assert double(3) == 6
+    assert profiler.records['double'].calls == 2
+
+
+def test_staged_disabled():
+    @stage_profile.staged('double')
+    def double(value):
+        return 2 * value
+
+    assert double(2) == 4
+
+
+def test_write_report(profiler, tmp_path):
+    with stage_profile.stage('A'):
+        pass
+    file_path = os.path.join(tmp_path, 'profile.json')
+    profiler.write_report(file_path)
+    with open(file_path) as file:
+        report = json.load(file)
+    assert report['version'] == stage_profile.REPORT_VERSION
+    assert [stage['name'] for stage in report['stages']] == ['A']
+    assert set(report['stages'][0]) == {'name', 'calls', 'wall_time', 'cpu_time', 'peak_rss', 'peak_rss_increase'}
+
+
+def test_write_pstats(tmp_path):
+    pstats_directory = os.path.join(tmp_path, 'pstats')
+    profiler = stage_profile.StageProfiler(pstats_directory=pstats_directory)
+    stage_profile.enable(profiler)
+    try:
+        with stage_profile.stage('HTML parse'):
+            with stage_profile.stage('date parsing'):
+                sorted(range(1000))
+    finally:
+        stage_profile.disable()
+    file_paths = profiler.write_pstats()
+    assert sorted(os.path.basename(file_path) for file_path in file_paths) == [
+        'HTML_parse.pstats', 'date_parsing.pstats',
+    ]
+    stats = pstats.Stats(os.path.join(pstats_directory, 'date_parsing.pstats'))
+    assert any(function_name == '<built-in method builtins.sorted>' for _f, _l, function_name in stats.stats)
+
+
+def test_write_pstats_none(profiler):
+    assert profiler.write_pstats() == []
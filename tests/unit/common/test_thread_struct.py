@@ -1,7 +1,9 @@
 import datetime
+import pickle
 import urllib.parse
 
 import bs4
+import numpy as np
 import pytest
 from pprune.common import thread_struct
 
@@ -701,6 +703,69 @@ def test_post_href_pairs(args, expected):
     assert result == expected
 
 
+@pytest.mark.parametrize(
+    'html',
+    (
+            EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT,
+            EXAMPLE_SINGLE_PPRUNE_POST,
+    ),
+    ids=['very_minimal', 'single_post'],
+)
+def test_serialised_node_lazy(html):
+    node = thread_struct.SerialisedNode(html)
+    assert not node.is_parsed
+    assert str(node) == html
+    expected = parse_string(html, 'html.parser').find(True)
+    assert node.name == expected.name
+    assert node.is_parsed
+    assert node.prettify() == expected.prettify()
+    node.release()
+    assert not node.is_parsed
+    assert node.get_text() == expected.get_text()
+
+
+def test_serialised_node_pickle():
+    node = thread_struct.SerialisedNode(EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT)
+    assert node.name == 'div'
+    result = pickle.loads(pickle.dumps(node))
+    assert not result.is_parsed
+    assert result == node
+    assert result.attrs == {'class': ['tcell', 'alt1'], 'id': 'td_post_10994338'}
+
+
+def test_serialised_node_hash():
+    node = thread_struct.SerialisedNode(EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT)
+    other = thread_struct.SerialisedNode(EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT)
+    assert node.name == 'div'
+    assert node == other
+    assert hash(node) == hash(other)
+    assert len({node, other, thread_struct.SerialisedNode(EXAMPLE_SINGLE_PPRUNE_POST)}) == 2
+
+
+@pytest.mark.parametrize(
+    'html',
+    (
+            EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT,
+            EXAMPLE_SINGLE_PPRUNE_POST,
+    ),
+    ids=['very_minimal', 'single_post'],
+)
+def test_post_serialised_node(html):
+    """A Post with a SerialisedNode behaves the same as one with a parsed node."""
+    args = (
+        datetime.datetime(2020, 1, 1, 5, 32, 14),
+        "https://www.pprune.org/rumours-news/638797-united-b777-engine-failure.html#post10994338",
+        'nicolai',
+    )
+    expected = thread_struct.Post(*args, parse_string(html, 'html.parser'), 10994338, [])
+    post = thread_struct.Post(*args, thread_struct.SerialisedNode(html), 10994338, [])
+    assert post.subject == expected.subject
+    assert post.text == expected.text
+    assert post.words == expected.words
+    assert post.text_stripped_without_quoted_message == expected.text_stripped_without_quoted_message
+    assert post.href_pairs() == expected.href_pairs()
+
+
 EXAMPLE_THREAD_POSTS_SINGLE = [
     (
         datetime.datetime(2020, 1, 1, 5, 32, 14),
@@ -719,6 +784,86 @@ def test_thread_posts_single():
     assert post
 
 
+def test_post_words_cached():
+    post = thread_struct.Post(
+        datetime.datetime(2020, 1, 1, 5, 32, 14),
+        "https://www.pprune.org/rumours-news/638797-united-b777-engine-failure.html#post10994338",
+        'nicolai',
+        parse_string(EXAMPLE_SINGLE_PPRUNE_POST_VERY_MINIMAL_TEXT, 'html.parser'),
+        10994338,  # Sequence number
+        [],  # liked_by_users
+    )
+    assert post.words == ['Example', 'AWST', 'message']
+    assert post.words is post.words
+    assert post.text_stripped is post.text_stripped
+    assert post.subject.strip() == 'United B777 engine failure'
+    # Changing the node has no effect until the cache is invalidated.
+    post.node = parse_string(EXAMPLE_SINGLE_PPRUNE_POST_MINIMAL_TEXT, 'html.parser')
+    assert post.words == ['Example', 'AWST', 'message']
+    assert post.subject.strip() == 'United B777 engine failure'
+    post.invalidate_cache()
+    expected = thread_struct.Post(
+        post.timestamp, post.permalink, post.user, post.node, post.sequence_num, post.liked_by_users
+    )
+    assert post.words == ['Minimal', 'text', 'in', 'this', 'post']
+    assert post.words_removed({'this'}, True) == ['minimal', 'text', 'in', 'post']
+    assert post.significant_words({'minimal'}) == ['text', 'in', 'this', 'post']
+    assert post.subject == expected.subject
+
+
+def test_post_invalidate_cache_not_cached():
+    post = thread_struct.Post(*EXAMPLE_THREAD_POSTS_SINGLE[0])
+    post.invalidate_cache()
+    assert post.words
+
+
+def test_post_prime_cache():
+    post = thread_struct.Post(*EXAMPLE_THREAD_POSTS_SINGLE[0])
+    post.prime_cache(text='\nPrimed  text\n', subject='Subject')
+    assert post.text_stripped == 'Primed  text'
+    assert post.words == ['Primed', 'text']
+    assert post.subject == 'Subject'
+    post.invalidate_cache()
+    assert post.words != ['Primed', 'text']
+
+
+@pytest.mark.parametrize('name', ('post_number', 'timestamp', 'no_such_attribute'))
+def test_post_prime_cache_not_cached_property(name):
+    post = thread_struct.Post(*EXAMPLE_THREAD_POSTS_SINGLE[0])
+    with pytest.raises(AttributeError):
+        post.prime_cache(**{name: 1})
+
+
+@pytest.mark.parametrize(
+    'words, expected_ids, expected_vocabulary',
+    (
+            ([], [], []),
+            (['word'], [0], ['word']),
+            (['Word', 'word', 'WORD'], [0, 1, 2], ['Word', 'word', 'WORD', 'word']),
+            (['WORD', 'Word', 'WORD'], [0, 2, 0], ['WORD', 'word', 'Word']),
+    ),
+)
+def test_vocabulary_encode(words, expected_ids, expected_vocabulary):
+    vocabulary = thread_struct.Vocabulary()
+    token_ids = vocabulary.encode(words)
+    assert list(token_ids) == expected_ids
+    assert vocabulary.decode(token_ids) == words
+    assert vocabulary.words == list(dict.fromkeys(expected_vocabulary))
+    for word in words:
+        token_id = vocabulary.get_id(word)
+        assert vocabulary.words[vocabulary.lower_ids[token_id]] == word.lower()
+        assert vocabulary.all_caps[token_id] == (word.upper() == word)
+
+
+def test_vocabulary_ids_where():
+    vocabulary = thread_struct.Vocabulary()
+    vocabulary.encode(['The', 'AAIB', 'report'])
+    assert vocabulary.words == ['The', 'the', 'AAIB', 'aaib', 'report']
+    assert vocabulary.ids_where(lambda w: w.lower() != 'the') == bytearray([0, 0, 1, 1, 1])
+    assert 'report' in vocabulary
+    assert vocabulary.get_id('missing') is None
+
+
 EXAMPLE_THREAD_POSTS_TWO = [
     (
         datetime.datetime(2020, 1, 1, 5, 32, 14),
@@ -833,3 +978,81 @@ def test_thread_get_post_ordinals_raises(posts, user, expected):
     with pytest.raises(KeyError) as err:
         thread.get_post_ordinals(user)
     assert err.value.args[0] == expected
+
+
+def _user(name):
+    return thread_struct.User(f'https://www.pprune.org/members/1-{name}', name)
+
+
+def _columns_thread():
+    """A thread of posts by users A, B, A, C with likes from B, D, D, A and B."""
+    thread = thread_struct.Thread()
+    for i, (user_name, timestamp, liked_by) in enumerate(
+            (
+                    ('A', datetime.datetime(2025, 6, 12, 20, 57), ['B', 'D']),
+                    ('B', None, []),
+                    ('A', datetime.datetime(2025, 6, 12, 21, 5, 30), ['D', 'A']),
+                    ('C', datetime.datetime(2025, 6, 13, 8, 0), ['B']),
+            )
+    ):
+        thread.add_post(
+            thread_struct.Post(
+                timestamp, f'https://www.pprune.org/#post{i}', _user(user_name), 'Text', 100 + i,
+                [_user(name) for name in liked_by],
+            )
+        )
+    return thread
+
+
+def test_thread_columns():
+    thread = _columns_thread()
+    columns = thread.columns()
+    assert len(columns) == 4
+    assert [user.name for user in columns.users] == ['A', 'B', 'C', 'D']
+    assert columns.poster_count == 3
+    assert list(columns.post_user_codes) == [0, 1, 0, 2]
+    assert list(columns.sequence_nums) == [100, 101, 102, 103]
+    assert list(columns.like_counts) == [2, 0, 2, 1]
+    assert list(columns.like_user_codes) == [1, 3, 3, 0, 1]
+    assert columns.timestamps[0] == np.datetime64('2025-06-12T20:57:00')
+    assert columns.timestamps[2] == np.datetime64('2025-06-12T21:05:30')
+    assert np.isnat(columns.timestamps[1])
+
+
+def test_thread_columns_aggregates():
+    columns = _columns_thread().columns()
+    assert list(columns.post_counts()) == [2, 1, 1]
+    assert list(columns.likes_received()) == [4, 0, 1]
+    assert list(columns.likes_given()) == [1, 2, 0, 2]
+    # Ties in post order.
+    assert list(columns.most_liked_post_ordinals()) == [0, 2, 3]
+    # B and D both liked two posts, B liked first.
+    assert [columns.users[code].name for code in columns.most_likes_given()] == ['B', 'D', 'A']
+
+
+def test_thread_columns_empty():
+    columns = thread_struct.Thread().columns()
+    assert len(columns) == 0
+    assert list(columns.post_counts()) == []
+    assert list(columns.likes_received()) == []
+    assert list(columns.most_liked_post_ordinals()) == []
+    assert list(columns.most_likes_given()) == []
+
+
+def test_thread_columns_cached():
+    thread = _columns_thread()
+    columns = thread.columns()
+    assert thread.columns() is columns
+    thread.add_post(
+        thread_struct.Post(
+            datetime.datetime(2025, 6, 13, 9, 0), 'https://www.pprune.org/#post4', _user('E'), 'Text', 50, [],
+        )
+    )
+    columns = thread.columns()
+    assert len(columns) == 5
+    # Users that posted are before users that only liked.
+    assert [user.name for user in columns.users] == ['A', 'B', 'C', 'E', 'D']
+    assert columns.poster_count == 4
+    thread.sort_by_sequence_number()
+    assert thread.columns() is not columns
+    assert list(thread.columns().sequence_nums) == [50, 100, 101, 102, 103]
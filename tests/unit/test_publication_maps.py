@@ -0,0 +1,92 @@
+import types
+
+import pytest
+from pprune import publication_maps
+
+
+class _ChainedPublicationMap(publication_maps.AirIndia171):
+    """Has a chain and a cycle of duplicate subjects."""
+    DUPLICATE_SUBJECT_MAP = {
+        'A': {'B', },
+        'B': {'C', },
+        'C': {'D', },
+        'X': {'Y', },
+        'Y': {'X', },
+    }
+
+
+@pytest.mark.parametrize(
+    'subject, expected',
+    (
+            ('A', {'B', 'C', 'D'}),
+            ('B', {'C', 'D'}),
+            ('D', set()),
+            ('X', {'Y'}),
+            ('Unknown', set()),
+    ),
+)
+def test_get_duplicate_subjects_closure(subject, expected):
+    publication_map = _ChainedPublicationMap()
+    assert publication_map.get_duplicate_subjects_closure(subject) == expected
+    assert publication_map.frozen().get_duplicate_subjects_closure(subject) == expected
+
+
+def test_get_duplicate_subjects_closure_ai171():
+    publication_map = publication_maps.AirIndia171()
+    assert publication_map.get_duplicate_subjects_closure('Fuel Cutoff Switches (detent)') == {
+        'Fuel (All)', 'Fuel Cutoff Switches',
+    }
+    assert publication_map.get_duplicate_subjects_closure('RAT (Deployment)') == {'RAT (All)'}
+
+
+def test_frozen_is_cached():
+    publication_map = publication_maps.AirIndia171()
+    frozen = publication_map.frozen()
+    assert isinstance(frozen, publication_maps.PublicationMap)
+    assert publication_map.frozen() is frozen
+    assert frozen.frozen() is frozen
+    assert frozen.get_uppercase_word_to_subject_map() is frozen.get_uppercase_word_to_subject_map()
+
+
+@pytest.mark.parametrize(
+    'method_name',
+    (
+            'get_title',
+            'get_introduction_in_html',
+            'get_lowercase_word_to_subject_map',
+            'get_uppercase_word_to_subject_map',
+            'get_phrase_lengths',
+            'get_specific_posts_to_subject_map',
+            'get_all_subject_titles',
+            'get_significant_posts_permalinks',
+            'get_set_of_words_required',
+            'get_number_of_top_authors',
+            'get_upvoted_post_count_limit',
+            'get_upvoted_post_text_limit',
+            'get_minimum_number_username_posts',
+    ),
+)
+def test_frozen_matches(method_name):
+    publication_map = publication_maps.AirIndia171()
+    assert getattr(publication_map.frozen(), method_name)() == getattr(publication_map, method_name)()
+
+
+def test_frozen_phrases_and_duplicates():
+    publication_map = publication_maps.AirIndia171()
+    frozen = publication_map.frozen()
+    for phrase_length in range(8):
+        assert frozen.get_phrases_to_subject_map(phrase_length) == publication_map.get_phrases_to_subject_map(
+            phrase_length
+        )
+    for subject in publication_map.get_all_subject_titles() | {'Unknown'}:
+        assert frozen.get_duplicate_subjects(subject) == publication_map.get_duplicate_subjects(subject)
+
+
+def test_frozen_is_read_only():
+    frozen = publication_maps.AirIndia171().frozen()
+    word_map = frozen.get_uppercase_word_to_subject_map()
+    assert isinstance(word_map, types.MappingProxyType)
+    with pytest.raises(TypeError):
+        word_map['NEW'] = 'New'
+    with pytest.raises(AttributeError):
+        frozen.get_all_subject_titles().add('New')
@@ -0,0 +1,55 @@
+import collections
+import random
+
+import pytest
+from pprune import analyse_thread
+
+
+def _zipf_stream(count, distinct, seed=1):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(range(distinct), weights=weights, k=count)
+
+
+def test_space_saving_capacity_error():
+    with pytest.raises(ValueError):
+        analyse_thread.SpaceSaving(0)
+
+
+def test_space_saving_exact_below_capacity():
+    stream = list('abracadabra')
+    summary = analyse_thread.SpaceSaving(10)
+    summary.update(stream)
+    assert summary.counts == collections.Counter(stream)
+    assert set(summary.errors.values()) == {0}
+    assert summary.total == len(stream)
+    assert summary.min_count() == 0
+
+
+@pytest.mark.parametrize('capacity', (1, 5, 20, 100))
+def test_space_saving_bounds(capacity):
+    stream = _zipf_stream(5_000, 500)
+    expected = collections.Counter(stream)
+    summary = analyse_thread.SpaceSaving(capacity)
+    summary.update(stream)
+    assert len(summary) == capacity
+    assert len(summary._heap) == capacity
+    assert summary.total == len(stream)
+    assert sum(summary.counts.values()) == len(stream)
+    min_count = summary.min_count()
+    assert min_count <= len(stream) / capacity
+    assert min_count == min(summary.counts.values())
+    for item, count in summary.counts.items():
+        assert count - summary.errors[item] <= expected[item] <= count
+    for item, count in expected.items():
+        if count > min_count:
+            assert item in summary.counts
+
+
+def test_space_saving_update_after_min_count():
+    summary = analyse_thread.SpaceSaving(2)
+    summary.update('aab')
+    assert summary.min_count() == 1
+    summary.update('ccc')
+    assert summary.counts == {'a': 2, 'c': 4}
+    assert summary.errors == {'a': 0, 'c': 1}